@@ -1,158 +1,933 @@
+import copy
+import hashlib
+import hmac
+import json
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+## Connection Pool Start ########################
+
+# Path of the database file, the INCOLLEGE_DB environment variable can point it elsewhere
+DATABASE_PATH = os.environ.get("INCOLLEGE_DB", "account.db")
+# Most connections that can be open at the same time, one per thread using the database
+POOL_SIZE = 8
+# Seconds a connection waits on a locked database before giving up
+BUSY_TIMEOUT = 5
+
+
+class ConnectionPool:
+    """Hands out SQLite connections, one per thread, with at most size of them open at once"""
+
+    def __init__(self, path=DATABASE_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.opened = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def open_connection(self):
+        """Open a new connection in WAL mode so readers never wait on the writer"""
+        connection = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def acquire(self):
+        """Returns the calling thread's connection, waiting for a free one if every connection is in use"""
+        if getattr(self.local, "depth", 0):
+            self.local.depth += 1
+            return self.local.connection
+
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_open = self.opened < self.size
+                if can_open:
+                    self.opened += 1
+            if can_open:
+                try:
+                    connection = self.open_connection()
+                except sqlite3.Error:
+                    with self.lock:
+                        self.opened -= 1
+                    raise
+            else:
+                connection = self.idle.get()
+
+        self.local.connection = connection
+        self.local.depth = 1
+        self.local.committed = []
+        return connection
+
+    def release(self):
+        """Give the calling thread's connection back once its outermost user is done with it"""
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            self.local.committed = []
+            self.idle.put(self.local.connection)
+            self.local.connection = None
+
+    @contextmanager
+    def connection(self):
+        """Borrow the calling thread's connection for the duration of a with block"""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release()
+
+    @contextmanager
+    def cursor(self):
+        """Yield a fresh cursor, committing when the outermost block succeeds and rolling back if it fails"""
+        committed = []
+        with self.connection() as connection:
+            outermost = self.local.depth == 1
+            cursor = connection.cursor()
+            try:
+                yield cursor
+                if outermost:
+                    connection.commit()
+                    committed, self.local.committed = self.local.committed, []
+            except BaseException:
+                if outermost:
+                    connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        # Callbacks run once the connection is back in the pool, so a callback waiting
+        # on a lock never keeps a connection from the thread holding that lock
+        for callback, args in committed:
+            callback(*args)
+
+    def after_commit(self, callback, *args):
+        """Call callback(*args) once the calling thread's transaction commits, or now if it has none"""
+        # Nothing is called if the transaction rolls back instead
+        if getattr(self.local, "depth", 0):
+            self.local.committed.append((callback, args))
+        else:
+            callback(*args)
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self.lock:
+                self.opened -= 1
+
+
+pool = ConnectionPool()
+
+
+def get_cursor():
+    """Returns a context manager with a cursor on a pooled connection, every helper goes through it"""
+    return pool.cursor()
+
+
+def after_commit(callback, *args):
+    """Call callback(*args) once the current transaction commits, for state kept outside the database"""
+    pool.after_commit(callback, *args)
+
+
+def begin_write(cursor):
+    """Take the write lock before the first read of a read-then-write transaction, on the caller's cursor"""
+    # sqlite3 only begins a transaction at the first write, so a read before it could
+    # miss rows another connection commits before that write
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+
+
+## Connection Pool End ########################
+
+
+## Profile Cache Start ########################
+
+# Most profiles kept in memory, the least recently used one is dropped first
+PROFILE_CACHE_SIZE = 256
+# username -> profile dict (or None when the user has no profile), oldest first
+profile_cache = OrderedDict()
+# username -> how many times their profile was invalidated, a profile read before an
+# invalidation is not cached after it
+profile_generations = {}
+profile_cache_lock = threading.Lock()
+
+## Profile Cache End ########################
+
+
+## Friend Graph Start ########################
+
+# username -> set of their friends, read from friendship the first time it is needed
+# and kept up to date by add_to_friend_list and delete_friend_from_list once their
+# transaction commits. Iterate over a set only while holding friend_graph_lock.
+friend_graph = None
+# Bumped by every committed friendship change, a graph read before one is not kept
+friend_graph_version = 0
+friend_graph_lock = threading.Lock()
+
+## Friend Graph End ########################
+
+
+## Authentication Start ########################
+
+# Passwords are stored as "pbkdf2_sha256$iterations$salt$hash". Raising the
+# iterations makes new hashes slower to crack, older ones are rehashed at login.
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_ITERATIONS = int(os.environ.get("INCOLLEGE_HASH_ITERATIONS", 600000))
+# Plaintext passwords found when upgrading the database are hashed with fewer
+# iterations so the upgrade stays quick, each is rehashed at its next login
+MIGRATION_HASH_ITERATIONS = 10000
+# Failed logins a username can make in a row, and seconds until they get one more
+LOGIN_BURST = 5
+LOGIN_REFILL_SECONDS = 30
+# Seconds a password that was just checked is trusted without hashing it again
+VERIFIED_LOGIN_SECONDS = 300
+# Most usernames the verified logins remember, and the size past which the login
+# limiter looks for usernames that are back to all their attempts
+LOGIN_CACHE_SIZE = 1024
+# Most usernames the login limiter remembers, past it the ones counted longest ago
+# are forgotten even if they are still throttled
+LOGIN_BUCKET_LIMIT = 64 * LOGIN_CACHE_SIZE
+
+# username -> (login attempts left, time they were counted), least recently counted first
+# A username that is not in it has all its attempts, so full buckets are dropped
+login_buckets = OrderedDict()
+# Size of login_buckets at which it is next swept for full buckets
+login_sweep_size = 0
+# username -> (keyed digest of their verified password, time it expires), oldest first
+verified_logins = OrderedDict()
+login_lock = threading.Lock()
+# The verified login digests are keyed with a secret that only lives in this process
+verified_login_key = os.urandom(32)
+# iterations -> hash of a random password, checked when a username does not exist
+dummy_hashes = {}
+
+
+def hash_password(password, iterations=None):
+    """Returns a new salted hash of password in the format stored in accounts"""
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def dummy_hash():
+    """Returns a hash that no password matches, so a missing username costs as much to check as a real one"""
+    iterations = PASSWORD_ITERATIONS
+    with login_lock:
+        stored = dummy_hashes.get(iterations)
+    if stored is None:
+        stored = hash_password(os.urandom(16).hex(), iterations)
+        with login_lock:
+            dummy_hashes[iterations] = stored
+    return stored
+
+
+def verify_password(password, stored):
+    """Returns True if password matches the stored hash, False otherwise"""
+    try:
+        scheme, iterations, salt, digest = stored.split("$")
+        attempt = hashlib.pbkdf2_hmac(
+            "sha256", password.encode(), bytes.fromhex(salt), int(iterations)
+        )
+    except (AttributeError, ValueError):
+        return False
+    return scheme == PASSWORD_SCHEME and hmac.compare_digest(attempt.hex(), digest)
+
+
+def login_tokens(username, now):
+    """Returns the login attempts username has left at now, the caller holds login_lock"""
+    tokens, counted = login_buckets.get(username, (LOGIN_BURST, now))
+    return min(LOGIN_BURST, tokens + (now - counted) / LOGIN_REFILL_SECONDS)
+
+
+def take_login_token(username):
+    """Returns True and uses up one attempt if username may try to log in, False if throttled"""
+    now = time.monotonic()
+    with login_lock:
+        tokens = login_tokens(username, now)
+        login_buckets.pop(username, None)
+        login_buckets[username] = (max(tokens - 1, 0), now)
+        forget_full_buckets(now)
+    return tokens >= 1
+
+
+def forget_full_buckets(now):
+    """Drop login buckets that are back to all their attempts, the caller holds login_lock"""
+    global login_sweep_size
+    # Buckets counted longest ago come first, any counted a full refill ago is full
+    refilled = now - LOGIN_BURST * LOGIN_REFILL_SECONDS
+    while login_buckets and next(iter(login_buckets.values()))[1] <= refilled:
+        login_buckets.popitem(last=False)
+
+    # Throttled usernames outlast a flood of others, the buckets are only swept for
+    # full ones each time they double, so a sweep costs O(1) per attempt
+    if len(login_buckets) > max(LOGIN_CACHE_SIZE, login_sweep_size):
+        for name in list(login_buckets):
+            if login_tokens(name, now) >= LOGIN_BURST:
+                del login_buckets[name]
+        login_sweep_size = 2 * len(login_buckets)
+    while len(login_buckets) > LOGIN_BUCKET_LIMIT:
+        login_buckets.popitem(last=False)
+
+
+def is_login_throttled(username):
+    """Returns True if username has no login attempts left for now"""
+    with login_lock:
+        return login_tokens(username, time.monotonic()) < 1
+
+
+def verified_digest(password):
+    """Returns the keyed digest a verified password is remembered by"""
+    return hmac.new(verified_login_key, password.encode(), "sha256").digest()
+
+
+def remember_login(username, password):
+    """Trust password for username for a while and give them back all their attempts"""
+    expires = time.monotonic() + VERIFIED_LOGIN_SECONDS
+    with login_lock:
+        login_buckets.pop(username, None)
+        verified_logins.pop(username, None)
+        verified_logins[username] = (verified_digest(password), expires)
+        while len(verified_logins) > LOGIN_CACHE_SIZE:
+            verified_logins.popitem(last=False)
+
+
+def recently_verified(username, password):
+    """Returns True if password was verified for username and has not expired yet"""
+    with login_lock:
+        entry = verified_logins.get(username)
+    if entry is None or entry[1] < time.monotonic():
+        return False
+    return hmac.compare_digest(entry[0], verified_digest(password))
+
 
-conn = sqlite3.connect("account.db")
-c = conn.cursor()
+def forget_login(username):
+    """Stop trusting the last verified password of username"""
+    with login_lock:
+        verified_logins.pop(username, None)
 
-# Create accounts table if it doesn't already exist
-c.execute(
-    """CREATE TABLE IF NOT EXISTS accounts (
 
-          user text ,
-          pass text,
-          first text,
-          last text,
-          university text,
-          major text,
-          tier int,
-          days int
+## Authentication End ########################
 
-          )"""
-)
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS jobs (
+def create_tables():
+    """Create the original (version 0) tables if they don't already exist"""
+    with get_cursor() as c:
+        # Create accounts table if it doesn't already exist
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS accounts (
 
-          title text,
-          description text,
-          employer text,
-          location text,
-          salary text,
-          first text,
-          last text
+                  user text ,
+                  pass text,
+                  first text,
+                  last text,
+                  university text,
+                  major text,
+                  tier int,
+                  days int
 
-          )"""
-)
+                  )"""
+        )
 
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS job_applications (
+                  title text,
+                  description text,
+                  employer text,
+                  location text,
+                  salary text,
+                  first text,
+                  last text
 
-          title text,
-          user text,
-          graduation text,
-          start text,
-          description text
+                  )"""
+        )
 
-          )"""
-)
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS job_applications (
 
+                  title text,
+                  user text,
+                  graduation text,
+                  start text,
+                  description text
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS jobs_saved (
+                  )"""
+        )
 
-          title text,
-          user text
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS jobs_saved (
 
-          )"""
-)
+                  title text,
+                  user text
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS friends (
+                  )"""
+        )
 
-          user text,
-          friend_user text 
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS friends (
 
-          )"""
-)
+                  user text,
+                  friend_user text 
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS friends_list (
+                  )"""
+        )
 
-          user text,
-          friend_user text 
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS friends_list (
 
-          )"""
-)
+                  user text,
+                  friend_user text 
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS profile (
+                  )"""
+        )
 
-          user text ,
-          university text,
-          major text,
-          title text,
-          about text
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS profile (
+
+                  user text ,
+                  university text,
+                  major text,
+                  title text,
+                  about text
+
+                  )"""
+        )
+
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS experience (
+
+                  user text,
+                  experienceId text,
+                  title text,
+                  employer text,
+                  date_started text,
+                  date_ended text,
+                  location text,
+                  description text
+
+                  )"""
+        )
+
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS education (
+
+                  user text ,
+                  school_name text,
+                  degree text,
+                  years_attended text
+
+                  )"""
+        )
+
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS message (
+
+                  message text ,
+                  sender text,
+                  receiver text
+
+                  )"""
+        )
+
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS message_notification (
+
+                  message text ,
+                  sender text,
+                  receiver text
+
+                  )"""
+        )
+
+        c.execute(
+            """CREATE TABLE IF NOT EXISTS notification (
+
+                  message text ,
+                  sender text,
+                  receiver text
+
+                  )"""
+        )
+
+
+## Schema Migrations Start ########################
+
+# create_tables makes the original (version 0) schema. Every change made to the
+# schema after that is a numbered migration below, and they are applied in order
+# on import. SQLite's user_version pragma remembers which version a database file
+# is at, so an existing account.db is upgraded in place the next time it is opened.
+
+# Current UTC time in SQL, to the millisecond, so timestamps sort as text
+TIMESTAMP = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Columns of each table at version 1: every table also gets an INTEGER PRIMARY KEY
+# and usernames are unique in accounts and profile
+V1_TABLES = {
+    "accounts": [
+        "user text UNIQUE",
+        "pass text",
+        "first text",
+        "last text",
+        "university text",
+        "major text",
+        "tier int",
+        "days int",
+    ],
+    "jobs": [
+        "title text",
+        "description text",
+        "employer text",
+        "location text",
+        "salary text",
+        "first text",
+        "last text",
+    ],
+    "job_applications": [
+        "title text",
+        "user text",
+        "graduation text",
+        "start text",
+        "description text",
+    ],
+    "jobs_saved": ["title text", "user text"],
+    "friends": ["user text", "friend_user text"],
+    "friends_list": ["user text", "friend_user text"],
+    "profile": [
+        "user text UNIQUE",
+        "university text",
+        "major text",
+        "title text",
+        "about text",
+    ],
+    "experience": [
+        "user text",
+        "experienceId text",
+        "title text",
+        "employer text",
+        "date_started text",
+        "date_ended text",
+        "location text",
+        "description text",
+    ],
+    "education": [
+        "user text",
+        "school_name text",
+        "degree text",
+        "years_attended text",
+    ],
+    "message": ["message text", "sender text", "receiver text"],
+    "message_notification": ["message text", "sender text", "receiver text"],
+    "notification": ["message text", "sender text", "receiver text"],
+}
+
+# Indexes on the columns the helpers below actually filter on
+V1_INDEXES = {
+    "idx_accounts_name": "accounts (first, last)",
+    "idx_accounts_last": "accounts (last)",
+    "idx_accounts_university": "accounts (university)",
+    "idx_accounts_major": "accounts (major)",
+    "idx_jobs_title": "jobs (title)",
+    "idx_jobs_poster": "jobs (first, last)",
+    "idx_job_applications_user": "job_applications (user, title)",
+    "idx_job_applications_title": "job_applications (title)",
+    "idx_jobs_saved_user": "jobs_saved (user, title)",
+    "idx_jobs_saved_title": "jobs_saved (title)",
+    "idx_friends_user": "friends (user, friend_user)",
+    "idx_friends_friend_user": "friends (friend_user)",
+    "idx_friends_list_user": "friends_list (user, friend_user)",
+    "idx_experience_user": "experience (user, experienceId)",
+    "idx_education_user": "education (user)",
+    "idx_message_receiver": "message (receiver, sender)",
+    "idx_message_notification_receiver": "message_notification (receiver)",
+    "idx_notification_receiver": "notification (receiver)",
+}
+
+
+def rebuild_table(cursor, table, columns):
+    """Recreate a table with the given column definitions and an INTEGER PRIMARY KEY, keeping its rows"""
+    # Rows that break a new UNIQUE constraint are dropped, the oldest one is kept
+    names = ", ".join(column.split()[0] for column in columns)
+    cursor.execute(
+        f"CREATE TABLE {table}_new (id INTEGER PRIMARY KEY, {', '.join(columns)})"
+    )
+    cursor.execute(
+        f"INSERT OR IGNORE INTO {table}_new ({names}) SELECT {names} FROM {table} ORDER BY rowid"
+    )
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
 
-          )"""
-)
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS experience (
+def migration_1(cursor):
+    """Add primary keys, unique usernames and lookup indexes to every table"""
+    for table, columns in V1_TABLES.items():
+        rebuild_table(cursor, table, columns)
+    for name, target in V1_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
 
-          user text,
-          experienceId text,
-          title text,
-          employer text,
-          date_started text,
-          date_ended text,
-          location text,
-          description text
 
-          )"""
-)
+def migration_2(cursor):
+    """Store broadcast notifications once and remember how far each user has read them"""
+    # AUTOINCREMENT keeps broadcast ids increasing, so a user's cursor never skips one
+    cursor.execute(
+        "CREATE TABLE broadcast (id INTEGER PRIMARY KEY AUTOINCREMENT, message text, sender text)"
+    )
+    cursor.execute("ALTER TABLE accounts ADD COLUMN last_broadcast int DEFAULT 0")
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS education (
 
-          user text ,
-          school_name text,
-          degree text,
-          years_attended text
+def migration_3(cursor):
+    """Index inboxes by (receiver, id) so they can be read a page at a time in id order"""
+    cursor.execute("CREATE INDEX idx_message_inbox ON message (receiver, id)")
+    cursor.execute("DROP INDEX IF EXISTS idx_notification_receiver")
+    cursor.execute("CREATE INDEX idx_notification_inbox ON notification (receiver, id)")
 
-          )"""
-)
 
+def migration_4(cursor):
+    """Timestamp messages and index them by (receiver, created_at)"""
+    # Messages sent before this migration get the time it ran
+    cursor.execute("ALTER TABLE message ADD COLUMN created_at text")
+    cursor.execute(f"UPDATE message SET created_at = {TIMESTAMP}")
+    cursor.execute(
+        "CREATE INDEX idx_message_received ON message (receiver, created_at)"
+    )
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS message (
 
-          message text ,
-          sender text,
-          receiver text
+def migration_5(cursor):
+    """Replace the message_notification copies of new messages with an unread counter per user"""
+    cursor.execute("ALTER TABLE accounts ADD COLUMN unread_messages int DEFAULT 0")
+    cursor.execute(
+        """UPDATE accounts SET unread_messages = (
+               SELECT COUNT(*) FROM message_notification
+               WHERE message_notification.receiver = accounts.user
+           )"""
+    )
+    cursor.execute("DROP TABLE message_notification")
+
+
+def migration_6(cursor):
+    """Group messages into one conversation per pair of users, with the latest message of each"""
+    # Every message shows up in the conversation of its sender and of its receiver
+    cursor.execute(
+        """CREATE TABLE conversation (
+               id INTEGER PRIMARY KEY,
+               user text,
+               counterpart text,
+               last_message_id int,
+               last_at text,
+               message_count int,
+               UNIQUE (user, counterpart)
+           )"""
+    )
+    cursor.execute(
+        """INSERT INTO conversation (user, counterpart, last_message_id, last_at, message_count)
+           SELECT pair.user, pair.counterpart, MAX(message.id), MAX(message.created_at), COUNT(*)
+           FROM (
+               SELECT receiver AS user, sender AS counterpart, id FROM message
+               UNION ALL
+               SELECT sender, receiver, id FROM message WHERE sender != receiver
+           ) AS pair
+           JOIN message ON message.id = pair.id
+           GROUP BY pair.user, pair.counterpart"""
+    )
+    cursor.execute(
+        "CREATE INDEX idx_conversation_recent ON conversation (user, last_at)"
+    )
+    # Both directions of a conversation, newest last, straight off an index
+    cursor.execute("DROP INDEX IF EXISTS idx_message_receiver")
+    cursor.execute(
+        "CREATE INDEX idx_message_thread ON message (receiver, sender, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX idx_message_sent ON message (sender, receiver, created_at)"
+    )
 
-          )"""
-)
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS message_notification (
+def migration_7(cursor):
+    """Index the text, sender and receiver of every message for full-text search"""
+    # The index reads its rows from the message table instead of keeping a copy
+    cursor.execute(
+        """CREATE VIRTUAL TABLE message_search USING fts5(
+               message, sender, receiver, content = 'message', content_rowid = 'id'
+           )"""
+    )
+    cursor.execute("INSERT INTO message_search (message_search) VALUES ('rebuild')")
+
+
+def migration_8(cursor):
+    """Keep each friendship and each friend request in one row, with no duplicates"""
+    # A friendship is stored once, with the two usernames in sorted order
+    cursor.execute(
+        """CREATE TABLE friendship (
+               user_a text,
+               user_b text,
+               PRIMARY KEY (user_a, user_b),
+               CHECK (user_a < user_b)
+           ) WITHOUT ROWID"""
+    )
+    cursor.execute(
+        """INSERT OR IGNORE INTO friendship (user_a, user_b)
+           SELECT MIN(user, friend_user), MAX(user, friend_user) FROM friends_list
+           WHERE user != friend_user"""
+    )
+    cursor.execute("CREATE INDEX idx_friendship_user_b ON friendship (user_b, user_a)")
+    cursor.execute("DROP TABLE friends_list")
+
+    cursor.execute(
+        """CREATE TABLE friend_request (
+               sender text,
+               receiver text,
+               PRIMARY KEY (sender, receiver)
+           ) WITHOUT ROWID"""
+    )
+    cursor.execute(
+        """INSERT OR IGNORE INTO friend_request (sender, receiver)
+           SELECT user, friend_user FROM friends"""
+    )
+    cursor.execute(
+        "CREATE INDEX idx_friend_request_receiver ON friend_request (receiver, sender)"
+    )
+    cursor.execute("DROP TABLE friends")
 
-          message text ,
-          sender text,
-          receiver text
 
-          )"""
-)
+def migration_9(cursor):
+    """Replace the plaintext passwords with salted hashes"""
+    cursor.execute(
+        "SELECT rowid, pass FROM accounts WHERE pass NOT LIKE :scheme",
+        {"scheme": PASSWORD_SCHEME + "$%"},
+    )
+    hashed = [
+        (hash_password(password or "", MIGRATION_HASH_ITERATIONS), rowid)
+        for rowid, password in cursor
+    ]
+    cursor.executemany("UPDATE accounts SET pass = ? WHERE rowid = ?", hashed)
+
+
+def migration_10(cursor):
+    """Key each job to the id of the account that posted it instead of the poster's name"""
+    cursor.execute("ALTER TABLE jobs ADD COLUMN owner_id int")
+    # Existing jobs only have the poster's name, the oldest account with it gets them
+    cursor.execute(
+        """UPDATE jobs SET owner_id = (
+               SELECT MIN(id) FROM accounts
+               WHERE accounts.first = jobs.first AND accounts.last = jobs.last
+           )"""
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_jobs_poster")
+    cursor.execute("CREATE INDEX idx_jobs_owner ON jobs (owner_id, id)")
+
+
+def migration_11(cursor):
+    """Point applications and saved jobs at the job's id, deleting a job deletes them too"""
+    # Rows for a title go to the oldest job with it, rows for deleted jobs are dropped
+    cursor.execute(
+        """CREATE TABLE job_applications_new (
+               id INTEGER PRIMARY KEY,
+               job_id int NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+               user text,
+               graduation text,
+               start text,
+               description text
+           )"""
+    )
+    cursor.execute(
+        """INSERT INTO job_applications_new (id, job_id, user, graduation, start, description)
+           SELECT job_applications.id, job.id,
+                  user, graduation, start, job_applications.description
+           FROM job_applications
+           JOIN (SELECT title, MIN(id) AS id FROM jobs GROUP BY title) AS job
+             ON job.title = job_applications.title"""
+    )
+    cursor.execute("DROP TABLE job_applications")
+    cursor.execute("ALTER TABLE job_applications_new RENAME TO job_applications")
+    cursor.execute(
+        "CREATE INDEX idx_job_applications_user ON job_applications (user, job_id)"
+    )
+    cursor.execute("CREATE INDEX idx_job_applications_job ON job_applications (job_id)")
+
+    cursor.execute(
+        """CREATE TABLE jobs_saved_new (
+               id INTEGER PRIMARY KEY,
+               job_id int NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+               user text
+           )"""
+    )
+    cursor.execute(
+        """INSERT INTO jobs_saved_new (id, job_id, user)
+           SELECT jobs_saved.id, job.id, user
+           FROM jobs_saved
+           JOIN (SELECT title, MIN(id) AS id FROM jobs GROUP BY title) AS job
+             ON job.title = jobs_saved.title"""
+    )
+    cursor.execute("DROP TABLE jobs_saved")
+    cursor.execute("ALTER TABLE jobs_saved_new RENAME TO jobs_saved")
+    cursor.execute("CREATE INDEX idx_jobs_saved_user ON jobs_saved (user, job_id)")
+    cursor.execute("CREATE INDEX idx_jobs_saved_job ON jobs_saved (job_id)")
+
+
+def migration_12(cursor):
+    """Remember the latest message each user has been told about, newer ones are unread"""
+    cursor.execute("ALTER TABLE accounts ADD COLUMN last_read_message int DEFAULT 0")
+    # The user's newest unread_messages messages are the unread ones
+    cursor.execute(
+        """UPDATE accounts SET last_read_message = COALESCE((
+               SELECT MAX(id) FROM (
+                   SELECT id, ROW_NUMBER() OVER (ORDER BY id DESC) AS position
+                   FROM message WHERE receiver = accounts.user
+               )
+               WHERE position > accounts.unread_messages
+           ), 0)"""
+    )
 
 
-c.execute(
-    """CREATE TABLE IF NOT EXISTS notification (
+def migration_13(cursor):
+    """Clear a job's owner when the account that posted it is deleted, so a new account can't take it over"""
+    # Account ids are reused once deleted, a dangling owner_id would point at the next signup
+    cursor.execute(
+        "ALTER TABLE jobs ADD COLUMN poster_id int REFERENCES accounts (id) ON DELETE SET NULL"
+    )
+    cursor.execute(
+        "UPDATE jobs SET poster_id = owner_id WHERE owner_id IN (SELECT id FROM accounts)"
+    )
+    cursor.execute("DROP INDEX idx_jobs_owner")
+    cursor.execute("ALTER TABLE jobs DROP COLUMN owner_id")
+    cursor.execute("ALTER TABLE jobs RENAME COLUMN poster_id TO owner_id")
+    cursor.execute("CREATE INDEX idx_jobs_owner ON jobs (owner_id, id)")
+
+
+def migration_14(cursor):
+    """Never reuse a message id, so a new message always lands above the read watermark"""
+    # AUTOINCREMENT keeps message ids increasing like broadcast ids, a reused id could
+    # fall at or below last_read_message and never be counted as unread or read
+    cursor.execute(
+        """CREATE TABLE message_new (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               message text,
+               sender text,
+               receiver text,
+               created_at text
+           )"""
+    )
+    cursor.execute(
+        """INSERT INTO message_new (id, message, sender, receiver, created_at)
+           SELECT id, message, sender, receiver, created_at FROM message"""
+    )
+    cursor.execute("DROP TABLE message")
+    cursor.execute("ALTER TABLE message_new RENAME TO message")
+    # Ids of messages already deleted may still be someone's watermark, start above them
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'message'")
+    cursor.execute(
+        """INSERT INTO sqlite_sequence (name, seq) SELECT 'message', MAX(
+               (SELECT COALESCE(MAX(id), 0) FROM message),
+               (SELECT COALESCE(MAX(last_read_message), 0) FROM accounts),
+               (SELECT COALESCE(MAX(last_message_id), 0) FROM conversation)
+           )"""
+    )
+    cursor.execute("CREATE INDEX idx_message_inbox ON message (receiver, id)")
+    cursor.execute(
+        "CREATE INDEX idx_message_received ON message (receiver, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX idx_message_thread ON message (receiver, sender, created_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX idx_message_sent ON message (sender, receiver, created_at)"
+    )
 
-          message text ,
-          sender text,
-          receiver text
 
-          )"""
-)
+def migration_15(cursor):
+    """Index accounts by university and major together for the classmate suggestions"""
+    cursor.execute(
+        "CREATE INDEX idx_accounts_university_major ON accounts (university, major)"
+    )
 
 
-def save_job_for_user(username, saved_job_title):
+# Append new migrations to the end of this list, never edit one that has shipped
+MIGRATIONS = [
+    migration_1,
+    migration_2,
+    migration_3,
+    migration_4,
+    migration_5,
+    migration_6,
+    migration_7,
+    migration_8,
+    migration_9,
+    migration_10,
+    migration_11,
+    migration_12,
+    migration_13,
+    migration_14,
+    migration_15,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(connection):
+    """Returns the schema version the database file is currently at"""
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection):
+    """Apply every pending migration in order, each in its own transaction, and return the new version"""
+    version = get_schema_version(connection)
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with connection:
+            connection.execute("BEGIN")
+            migration(connection.cursor())
+            connection.execute(f"PRAGMA user_version = {number}")
+    return get_schema_version(connection)
+
+
+def configure_database(path=DATABASE_PATH, size=POOL_SIZE):
+    """Point every helper at the database file at path and bring its schema up to date"""
+    global pool, friend_graph, friend_graph_version, login_sweep_size
+    pool.close()
+    pool = ConnectionPool(path, size)
+    with profile_cache_lock:
+        profile_cache.clear()
+    with friend_graph_lock:
+        friend_graph = None
+        friend_graph_version += 1
+    with login_lock:
+        login_buckets.clear()
+        login_sweep_size = 0
+        verified_logins.clear()
+    # Only a new or unmigrated file needs the version 0 tables, migrations drop some
+    with pool.connection() as connection:
+        version = get_schema_version(connection)
+    if version == 0:
+        create_tables()
+    with pool.connection() as connection:
+        return migrate(connection)
+
+
+configure_database()
+
+## Schema Migrations End ########################
+
+
+def save_job_for_user(username, job_id):
     """Returns True if the job was successfully saved, False otherwise"""
     try:
-        with conn:
-            # Insert username, password, first name, and last name into database
+        with get_cursor() as c:
+            # Insert the user and the id of the job they saved into database
             c.execute(
-                "INSERT INTO jobs_saved VALUES (:title, :user)",
-                {"title": saved_job_title, "user": username},
+                "INSERT INTO jobs_saved (job_id, user) VALUES (:job_id, :user)",
+                {"job_id": job_id, "user": username},
             )
         return True
     except sqlite3.Error as error:
@@ -161,41 +936,48 @@ def save_job_for_user(username, saved_job_title):
 
 
 def get_saved_jobs(username):
-    """Returns a list of all jobs saved by the user"""
+    """Returns a list of (id, title) for every job saved by the user, in the order they saved them"""
     try:
-        with conn:
-            c.execute("SELECT * FROM jobs_saved WHERE user = :user", {"user": username})
-            jobs = c.fetchall()
-            if jobs:
-                return [job[0] for job in jobs]
-            else:
-                return []
+        with get_cursor() as c:
+            c.execute(
+                "SELECT jobs.id, jobs.title FROM jobs_saved JOIN jobs ON jobs.id = jobs_saved.job_id WHERE jobs_saved.user = :user ORDER BY jobs_saved.id",
+                {"user": username},
+            )
+            return c.fetchall()
     except sqlite3.Error as error:
         print("Failed to get jobs from sqlite table:", error)
         return []
 
 
-def clean_saved_jobs_when_job_deleted(title):
-    """ "Return true if all the deleted jobs were successfully deleted from the saved jobs table"""
+def get_unsaved_jobs(username):
+    """Returns a list of (id, title) for every job the user has not saved, in the order they were posted"""
     try:
-        with conn:
-            # Delete the job with the provided title
-            c.execute("DELETE FROM jobs_saved WHERE title = ?", (title,))
-        return True
+        with get_cursor() as c:
+            # Anti-join: keep each job that has no saved row for this user
+            c.execute(
+                """SELECT id, title FROM jobs
+                   WHERE NOT EXISTS (
+                       SELECT 1 FROM jobs_saved
+                       WHERE jobs_saved.user = :user AND jobs_saved.job_id = jobs.id
+                   )
+                   ORDER BY id""",
+                {"user": username},
+            )
+            return c.fetchall()
     except sqlite3.Error as error:
-        print("Failed to delete job from the sqlite table:", error)
-        return False
+        print("Failed to get jobs from sqlite table:", error)
+        return []
 
 
-def delete_saved_job(username, saved_job_title):
+def delete_saved_job(username, job_id):
     """Returns True if the job was successfully deleted, False otherwise"""
     try:
-        with conn:
-            # Delete the job with the provided title
+        with get_cursor() as c:
+            # Delete the save of the job with the provided id
             c.execute(
-                "DELETE FROM jobs_saved WHERE title = ? AND user = ?",
+                "DELETE FROM jobs_saved WHERE job_id = ? AND user = ?",
                 (
-                    saved_job_title,
+                    job_id,
                     username,
                 ),
             )
@@ -208,10 +990,10 @@ def delete_saved_job(username, saved_job_title):
 def create_profile(username, university, major, title, about):
     """Returns True if the profile was successfully created, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Insert username, password, first name, and last name into database
             c.execute(
-                "INSERT INTO profile VALUES (:user, :university, :major, :title, :about)",
+                "INSERT INTO profile (user, university, major, title, about) VALUES (:user, :university, :major, :title, :about)",
                 {
                     "user": username,
                     "university": university,
@@ -220,6 +1002,7 @@ def create_profile(username, university, major, title, about):
                     "about": about,
                 },
             )
+            after_commit(invalidate_profile, username)
         return True
     except sqlite3.Error as error:
         print("Failed to add profile into sqlite table:", error)
@@ -228,59 +1011,118 @@ def create_profile(username, university, major, title, about):
 
 def get_profile(username):
     """Get the combined profile from profile, education, and experience tables"""
-    profile, education, experience = None, None, None
-    final_profile = {}
-    try:
-        with conn:
-            c.execute("SELECT * FROM profile WHERE user = :user", {"user": username})
-            profile = c.fetchone()
-            c.execute("SELECT * FROM education WHERE user = :user", {"user": username})
-            education = c.fetchone()
-            c.execute("SELECT * FROM experience WHERE user = :user", {"user": username})
-            jobs = c.fetchall()
-
-            if not profile and not education and not experience:
-                return None
+    """Profiles are served from a size bounded LRU cache, the profile writers invalidate it once they commit"""
+    with profile_cache_lock:
+        if username in profile_cache:
+            profile_cache.move_to_end(username)
+            return copy.deepcopy(profile_cache[username])
+        generation = profile_generations.get(username, 0)
 
-            if profile is not None:
-                final_profile["user"] = profile[0]
-                final_profile["university"] = profile[1]
-                final_profile["major"] = profile[2]
-                final_profile["title"] = profile[3]
-                final_profile["about"] = profile[4]
-            if education is not None:
-                final_profile["school_name"] = education[1]
-                final_profile["degree"] = education[2]
-                final_profile["years_attended"] = education[3]
-            if jobs is not None:
-                final_profile["experience"] = []
-                for job in jobs:
-                    final_profile["experience"].append(
-                        {
-                            "experienceId": job[1],
-                            "title": job[2],
-                            "employer": job[3],
-                            "date_started": job[4],
-                            "date_ended": job[5],
-                            "location": job[6],
-                            "description": job[7],
-                        }
-                    )
-            return final_profile
+    try:
+        final_profile = load_profile(username)
     except sqlite3.Error as error:
         print("Failed to get profile from sqlite table:", error)
         return None
 
+    with profile_cache_lock:
+        # A profile that was changed while it was being read could be stale already
+        if profile_generations.get(username, 0) == generation:
+            profile_cache[username] = final_profile
+            if len(profile_cache) > PROFILE_CACHE_SIZE:
+                profile_cache.popitem(last=False)
+    return copy.deepcopy(final_profile)
+
+
+def load_profile(username):
+    """Read the combined profile with a single query, returns None if the user has no profile or education"""
+    with get_cursor() as c:
+        # One row per experience with the profile and first education row repeated on each
+        # Starting from the username keeps a row even when the other tables have nothing
+        c.execute(
+            """SELECT profile.id, profile.user, profile.university, profile.major,
+                      profile.title, profile.about,
+                      education.id, education.school_name, education.degree,
+                      education.years_attended,
+                      experience.id, experience.experienceId, experience.title,
+                      experience.employer, experience.date_started, experience.date_ended,
+                      experience.location, experience.description
+               FROM (SELECT :user AS user) AS wanted
+               LEFT JOIN profile ON profile.user = wanted.user
+               LEFT JOIN education ON education.id = (
+                   SELECT id FROM education WHERE user = wanted.user ORDER BY id LIMIT 1
+               )
+               LEFT JOIN experience ON experience.user = wanted.user
+               ORDER BY experience.id""",
+            {"user": username},
+        )
+        rows = c.fetchall()
+
+    profile = rows[0]
+    if profile[0] is None and profile[6] is None:
+        return None
+
+    final_profile = {}
+    if profile[0] is not None:
+        final_profile["user"] = profile[1]
+        final_profile["university"] = profile[2]
+        final_profile["major"] = profile[3]
+        final_profile["title"] = profile[4]
+        final_profile["about"] = profile[5]
+    if profile[6] is not None:
+        final_profile["school_name"] = profile[7]
+        final_profile["degree"] = profile[8]
+        final_profile["years_attended"] = profile[9]
+    final_profile["experience"] = []
+    for job in rows:
+        if job[10] is not None:
+            final_profile["experience"].append(
+                {
+                    "experienceId": job[11],
+                    "title": job[12],
+                    "employer": job[13],
+                    "date_started": job[14],
+                    "date_ended": job[15],
+                    "location": job[16],
+                    "description": job[17],
+                }
+            )
+    return final_profile
+
+
+def invalidate_profile(username):
+    """Drop a user's cached profile so the next get_profile reads it again"""
+    with profile_cache_lock:
+        profile_cache.pop(username, None)
+        profile_generations[username] = profile_generations.get(username, 0) + 1
+
+
+def profiles_exist(usernames):
+    """Returns the set of the given usernames that have a profile, found with a single query"""
+    # get_profile counts a user as having a profile if they have a profile or an education row
+    try:
+        with get_cursor() as c:
+            c.execute(
+                """SELECT user FROM profile WHERE user IN (SELECT value FROM json_each(:users))
+                   UNION
+                   SELECT user FROM education WHERE user IN (SELECT value FROM json_each(:users))""",
+                {"users": json.dumps(list(usernames))},
+            )
+            return {row[0] for row in c.fetchall()}
+    except sqlite3.Error as error:
+        print("Failed to get profiles from sqlite table:", error)
+        return set()
+
 
 def update_profile(username, university, major, title, about):
     """Returns True if the profile was successfully updated, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Update the profile with the provided username
             c.execute(
                 "UPDATE profile SET university = ?, major = ?, title = ?, about = ? WHERE user = ?",
                 (university, major, title, about, username),
             )
+            after_commit(invalidate_profile, username)
         return True
     except sqlite3.Error as error:
         print("Failed to update profile from the sqlite table:", error)
@@ -291,9 +1133,10 @@ def delete_profile(username):
     """Returns True if the user was successfully deleted, False otherwise"""
     """Used to delete profiles that are currently made for testing purposes in our tests"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Delete the user with the provided username
             c.execute("DELETE FROM profile WHERE user = ?", (username,))
+            after_commit(invalidate_profile, username)
         return True
     except sqlite3.Error as error:
         print("Failed to delete profile from the sqlite table:", error)
@@ -305,10 +1148,10 @@ def create_experience(
 ):
     """Returns True if the experience was successfully created, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Insert username, password, first name, and last name into database
             c.execute(
-                "INSERT INTO experience VALUES (:user, :experienceId, :title, :employer, :date_started, :date_ended, :location, :description)",
+                "INSERT INTO experience (user, experienceId, title, employer, date_started, date_ended, location, description) VALUES (:user, :experienceId, :title, :employer, :date_started, :date_ended, :location, :description)",
                 {
                     "user": user,
                     "experienceId": experienceId,
@@ -320,6 +1163,7 @@ def create_experience(
                     "description": description,
                 },
             )
+            after_commit(invalidate_profile, user)
         return True
     except sqlite3.Error as error:
         print("Failed to add experience into sqlite table:", error)
@@ -331,7 +1175,7 @@ def update_experience(
 ):
     """Returns True if the experience was successfully updated, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Update the experience with the provided username
             c.execute(
                 "UPDATE experience SET title = ?, employer = ?, date_started = ?, date_ended = ?, location = ?, description = ? WHERE user = ? AND experienceId = ?",
@@ -346,6 +1190,7 @@ def update_experience(
                     experienceId,
                 ),
             )
+            after_commit(invalidate_profile, user)
         return True
     except sqlite3.Error as error:
         print("Failed to update experience from the sqlite table:", error)
@@ -356,9 +1201,10 @@ def delete_experience(username):
     """Returns True if the experience was successfully deleted, False otherwise"""
     """Used to delete the user profile's experiences that are currently made for testing purposes in our tests"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Delete the user with the provided username
             c.execute("DELETE FROM experience WHERE user = ?", (username,))
+            after_commit(invalidate_profile, username)
         return True
     except sqlite3.Error as error:
         print("Failed to delete experience from the sqlite table:", error)
@@ -368,10 +1214,10 @@ def delete_experience(username):
 def create_education(user, school_name, degree, years_attended):
     """Returns True if the education was successfully created, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Insert username, password, first name, and last name into database
             c.execute(
-                "INSERT INTO education VALUES (:user, :school_name, :degree, :years_attended)",
+                "INSERT INTO education (user, school_name, degree, years_attended) VALUES (:user, :school_name, :degree, :years_attended)",
                 {
                     "user": user,
                     "school_name": school_name,
@@ -379,6 +1225,7 @@ def create_education(user, school_name, degree, years_attended):
                     "years_attended": years_attended,
                 },
             )
+            after_commit(invalidate_profile, user)
         return True
     except sqlite3.Error as error:
         print("Failed to add education into sqlite table:", error)
@@ -388,12 +1235,13 @@ def create_education(user, school_name, degree, years_attended):
 def update_education(user, school_name, degree, years_attended):
     """ "Returns True if the education was successfully updated, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Update the education with the provided username
             c.execute(
                 "UPDATE education SET school_name = ?, degree = ?, years_attended = ? WHERE user = ?",
                 (school_name, degree, years_attended, user),
             )
+            after_commit(invalidate_profile, user)
         return True
     except sqlite3.Error as error:
         print("Failed to update education from the sqlite table:", error)
@@ -404,9 +1252,10 @@ def delete_education(username):
     """Returns True if the education was successfully deleted, False otherwise"""
     """Used to delete the user profile's education that are currently made for testing purposes in our tests"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Delete the user with the provided username
             c.execute("DELETE FROM education WHERE user = ?", (username,))
+            after_commit(invalidate_profile, username)
         return True
     except sqlite3.Error as error:
         print("Failed to delete education from the sqlite table:", error)
@@ -416,13 +1265,14 @@ def delete_education(username):
 def create_user(username, password, first, last, university, major, tier, days):
     """Returns True if the user was successfully created, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Insert username, password, first name, and last name into database
+            # New users start with every broadcast sent before they joined already read
             c.execute(
-                "INSERT INTO accounts VALUES (:user, :pass, :first, :last, :university, :major, :tier, :days)",
+                "INSERT INTO accounts (user, pass, first, last, university, major, tier, days, last_broadcast) VALUES (:user, :pass, :first, :last, :university, :major, :tier, :days, (SELECT COALESCE(MAX(id), 0) FROM broadcast))",
                 {
                     "user": username,
-                    "pass": password,
+                    "pass": hash_password(password),
                     "first": first,
                     "last": last,
                     "university": university,
@@ -440,8 +1290,11 @@ def create_user(username, password, first, last, university, major, tier, days):
 def get_user(username):
     """Returns the user information for a given username."""
     try:
-        with conn:
-            c.execute("SELECT * FROM accounts WHERE user = :user", {"user": username})
+        with get_cursor() as c:
+            c.execute(
+                "SELECT user, pass, first, last, university, major FROM accounts WHERE user = :user",
+                {"user": username},
+            )
             user = c.fetchone()
             if user is not None:
                 # User found, return it as a dictionary
@@ -461,11 +1314,38 @@ def get_user(username):
         return None
 
 
+class Session:
+    """The signed in user's account, read once when they log in or sign up"""
+
+    __slots__ = ("username", "first", "last", "tier")
+
+    def __init__(self, username, first, last, tier):
+        self.username = username
+        self.first = first
+        self.last = last
+        self.tier = tier
+
+
+def load_session(username):
+    """Returns a Session with the user's account, None if there is no such user"""
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "SELECT user, first, last, tier FROM accounts WHERE user = :user",
+                {"user": username},
+            )
+            account = c.fetchone()
+    except sqlite3.Error as error:
+        print("Failed to get user from sqlite table:", error)
+        return None
+    return Session(*account) if account else None
+
+
 ## EPIC #8 PT.1 Start ########################
 def get_days(username):
     """Returns the user information for a given username."""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
                 "SELECT days FROM accounts WHERE user = :user", {"user": username}
             )
@@ -483,7 +1363,7 @@ def get_days(username):
 def reset_days(username):
     """Returns the user information for a given username."""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
                 "UPDATE accounts SET days = 0 WHERE user = :user", {"user": username}
             )
@@ -498,7 +1378,7 @@ def reset_days(username):
 def update_days(username):
     """Returns the user information for a given username."""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
                 "UPDATE accounts SET days = days + 1 WHERE user = :user",
                 {"user": username},
@@ -517,29 +1397,51 @@ def update_days(username):
 def delete_user(username):
     """Returns True if the user was successfully deleted, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Delete the user with the provided username
             c.execute("DELETE FROM accounts WHERE user = ?", (username,))
+        forget_login(username)
         return True
     except sqlite3.Error as error:
         print("Failed to delete user from the sqlite table:", error)
         return False
 
 
+def existing_usernames(usernames):
+    """Returns the set of the given usernames that have an account, found with a single query"""
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "SELECT user FROM accounts WHERE user IN (SELECT value FROM json_each(:users))",
+                {"users": json.dumps(list(usernames))},
+            )
+            return {row[0] for row in c.fetchall()}
+    except sqlite3.Error as error:
+        print("Failed to get users from sqlite table:", error)
+        return set()
+
+
 def does_username_exist(username):
     """Returns True if the username already exists in the database, False otherwise"""
-    c.execute("SELECT * FROM accounts WHERE user=:user", {"user": username})
-    user_entry = c.fetchone()
+    with get_cursor() as c:
+        c.execute("SELECT 1 FROM accounts WHERE user=:user", {"user": username})
+        user_entry = c.fetchone()
     return user_entry is not None
 
 
-def create_job(title, description, employer, location, salary, first, last):
-    """Returns True if the user was successfully created, False otherwise"""
+def create_job(title, description, employer, location, salary, first, last, owner):
+    """Returns the new job's id if the job was successfully created, False otherwise"""
+    """owner is the poster's username, the job belongs to their account and no one else's"""
     try:
-        with conn:
-            # Insert username, password, first name, and last name into database
+        with get_cursor() as c:
+            # Insert the job and who posted it into database
             c.execute(
-                "INSERT INTO jobs VALUES (:title, :description, :employer, :location,:salary, :first, :last)",
+                """INSERT INTO jobs (title, description, employer, location, salary, first, last, owner_id)
+                   VALUES (
+                       :title, :description, :employer, :location, :salary, :first, :last,
+                       (SELECT id FROM accounts WHERE user = :owner)
+                   )
+                   RETURNING id""",
                 {
                     "title": title,
                     "description": description,
@@ -548,9 +1450,10 @@ def create_job(title, description, employer, location, salary, first, last):
                     "salary": salary,
                     "first": first,
                     "last": last,
+                    "owner": owner,
                 },
             )
-        return True
+            return c.fetchone()[0]
     except sqlite3.Error as error:
         print("Failed to add job into sqlite table:", error)
         return False
@@ -559,47 +1462,88 @@ def create_job(title, description, employer, location, salary, first, last):
 def get_all_job_titles():
     """Returns a list of all jobs"""
     try:
-        with conn:
-            c.execute("SELECT * FROM jobs")
+        with get_cursor() as c:
+            c.execute("SELECT title FROM jobs")
             return [job[0] for job in c.fetchall()]
     except sqlite3.Error as error:
         print("Failed to get jobs from sqlite table:", error)
         return []
 
 
-def get_job_list_posted_by_user(first, last):
-    """Returns a list of jobs posted by the user"""
+def get_job_list_posted_by_user(username):
+    """Returns a list of (id, title) for the jobs posted by the user"""
     try:
-        with conn:
-            # Insert username, password, first name, and last name into database
-            # return a list of job titles
+        with get_cursor() as c:
+            # return the jobs' ids and titles, oldest first
             c.execute(
-                "SELECT title FROM jobs WHERE first = ? AND last = ?", (first, last)
+                """SELECT jobs.id, jobs.title FROM accounts
+                   JOIN jobs ON jobs.owner_id = accounts.id
+                   WHERE accounts.user = ?
+                   ORDER BY jobs.id""",
+                (username,),
             )
-            return [job[0] for job in c.fetchall()]
+            return c.fetchall()
     except sqlite3.Error as error:
         print("Failed to get jobs from sqlite table:", error)
         return []
 
 
-def delete_job(title):
+def delete_job(job_id):
     """Returns True if the job was successfully deleted, False otherwise"""
+    """Its applications and saves are deleted with it by their foreign keys"""
     try:
-        with conn:
-            # Delete the job with the provided title
-            c.execute("DELETE FROM jobs WHERE title = ?", (title,))
+        with get_cursor() as c:
+            # Delete the job with the provided id
+            c.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
         return True
     except sqlite3.Error as error:
         print("Failed to delete job from the sqlite table:", error)
         return False
 
 
+# The id of the job, only when it was posted by owner or owner is None
+JOB_WITH_OWNER = """SELECT jobs.id FROM jobs
+                    LEFT JOIN accounts ON accounts.id = jobs.owner_id
+                    WHERE jobs.id = :job_id AND (:owner IS NULL OR accounts.user = :owner)"""
+
+
+def notify_applicants(cursor, job_id, message, owner=None):
+    """Send message to everyone who applied to the job, on the caller's cursor"""
+    """Returns the usernames notified, in the order they applied"""
+    cursor.execute(
+        f"""INSERT INTO notification (message, sender, receiver)
+            SELECT :message, 'System', user FROM job_applications
+            WHERE job_id IN ({JOB_WITH_OWNER})
+            ORDER BY id
+            RETURNING receiver""",
+        {"message": message, "job_id": job_id, "owner": owner},
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def retire_job(job_id, message, owner=None):
+    """Delete the job, only if owner posted it when given, and send message to its applicants"""
+    """Returns the usernames notified, None if nothing was changed because it failed"""
+    try:
+        with get_cursor() as c:
+            # Notify before deleting, the applications are deleted along with the job
+            notified = notify_applicants(c, job_id, message, owner)
+            c.execute(
+                f"DELETE FROM jobs WHERE id IN ({JOB_WITH_OWNER})",
+                {"job_id": job_id, "owner": owner},
+            )
+        return notified
+    except sqlite3.Error as error:
+        print("Failed to delete job from the sqlite table:", error)
+        return None
+
+
 def add_friend(username, friend_username):
     """Returns True if the friend was successfully added into the database, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
-                "INSERT INTO friends VALUES (:user, :friend_user)",
+                "INSERT OR IGNORE INTO friend_request (sender, receiver) VALUES (:user, :friend_user)",
                 {"user": username, "friend_user": friend_username},
             )
         return True
@@ -610,18 +1554,20 @@ def add_friend(username, friend_username):
 
 def search_name(firstname, lastname):
     """Returns True if the username already exists in the database, False otherwise"""
-    c.execute(
-        "SELECT * FROM accounts WHERE first=:first AND last=:last",
-        {"first": firstname, "last": lastname},
-    )
-    user_entry = c.fetchone()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT 1 FROM accounts WHERE first=:first AND last=:last",
+            {"first": firstname, "last": lastname},
+        )
+        user_entry = c.fetchone()
     return user_entry is not None
 
 
 def get_username_from_last_name(lastname):
     """Returns a list of usernames if found with the friend's last name in the database, an empty list otherwise"""
-    c.execute("SELECT user FROM accounts WHERE last=:last", {"last": lastname})
-    users = c.fetchall()
+    with get_cursor() as c:
+        c.execute("SELECT user FROM accounts WHERE last=:last", {"last": lastname})
+        users = c.fetchall()
     if users:
         return [user[0] for user in users]
     else:
@@ -630,11 +1576,12 @@ def get_username_from_last_name(lastname):
 
 def get_username_from_university(university):
     """Returns a list of username if found with the friend's university in the database, an empty list otherwise"""
-    c.execute(
-        "SELECT user FROM accounts WHERE university=:university",
-        {"university": university},
-    )
-    users = c.fetchall()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT user FROM accounts WHERE university=:university",
+            {"university": university},
+        )
+        users = c.fetchall()
     if users:
         return [user[0] for user in users]
     else:
@@ -643,8 +1590,9 @@ def get_username_from_university(university):
 
 def get_username_from_major(major):
     """Returns a list of username if found with the friend's major in the database, an empty list otherwise"""
-    c.execute("SELECT user FROM accounts WHERE major=:major", {"major": major})
-    users = c.fetchall()
+    with get_cursor() as c:
+        c.execute("SELECT user FROM accounts WHERE major=:major", {"major": major})
+        users = c.fetchall()
     if users:
         return [user[0] for user in users]
     else:
@@ -653,32 +1601,54 @@ def get_username_from_major(major):
 
 def get_first_name(username):
     """Returns True if the username already exists in the database, False otherwise"""
-    c.execute("SELECT * FROM accounts WHERE user=:user", {"user": username})
-    user_entry = c.fetchone()
-    return user_entry[2]
+    with get_cursor() as c:
+        c.execute("SELECT first FROM accounts WHERE user=:user", {"user": username})
+        user_entry = c.fetchone()
+    return user_entry[0]
 
 
 def get_last_name(username):
     """Returns True if the username already exists in the database, False otherwise"""
-    c.execute("SELECT * FROM accounts WHERE user=:user", {"user": username})
-    user_entry = c.fetchone()
-    return user_entry[3]
+    with get_cursor() as c:
+        c.execute("SELECT last FROM accounts WHERE user=:user", {"user": username})
+        user_entry = c.fetchone()
+    return user_entry[0]
 
 
 def check_login(username, password):
     """Returns True if the username and password match a user in the database, False otherwise"""
-    c.execute(
-        "SELECT * FROM accounts WHERE user=:user AND pass=:pass",
-        {"user": username, "pass": password},
-    )
-    accEntry = c.fetchone()
-    return accEntry is not None
+    """A username out of login attempts is refused without reading the database or hashing"""
+    """A username that does not exist is checked against a dummy hash, so it takes as long as a wrong password"""
+    if not take_login_token(username):
+        return False
+    if recently_verified(username, password):
+        remember_login(username, password)
+        return True
+
+    with get_cursor() as c:
+        c.execute("SELECT pass FROM accounts WHERE user=:user", {"user": username})
+        accEntry = c.fetchone()
+        if accEntry is None:
+            verify_password(password, dummy_hash())
+            return False
+        if not verify_password(password, accEntry[0]):
+            return False
+
+        # Hashes made with an older number of iterations are upgraded
+        if accEntry[0].split("$")[1] != str(PASSWORD_ITERATIONS):
+            c.execute(
+                "UPDATE accounts SET pass=:pass WHERE user=:user",
+                {"user": username, "pass": hash_password(password)},
+            )
+    remember_login(username, password)
+    return True
 
 
 def get_num_of_users():
     """Returns the number of users in the database"""
-    c.execute("SELECT COUNT(*) FROM accounts")
-    result = c.fetchone()
+    with get_cursor() as c:
+        c.execute("SELECT COUNT(*) FROM accounts")
+        result = c.fetchone()
     if result:
         return result[0]  # Extract the count from the result
     else:
@@ -687,8 +1657,9 @@ def get_num_of_users():
 
 def get_num_of_jobs():
     """Returns the number of users in the database"""
-    c.execute("SELECT COUNT(*) FROM jobs")
-    result = c.fetchone()
+    with get_cursor() as c:
+        c.execute("SELECT COUNT(*) FROM jobs")
+        result = c.fetchone()
     if result:
         return result[0]  # Extract the count from the result
     else:
@@ -697,11 +1668,12 @@ def get_num_of_jobs():
 
 def does_friend_request_match(username, friend_username):
     """Returns friend username if the username already exists in the friends, False otherwise"""
-    c.execute(
-        "SELECT * FROM friends WHERE user=:user AND friend_user=:friend_user",
-        {"user": friend_username, "friend_user": username},
-    )
-    user_entry = c.fetchone()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT 1 FROM friend_request WHERE sender=:user AND receiver=:friend_user",
+            {"user": friend_username, "friend_user": username},
+        )
+        user_entry = c.fetchone()
     if user_entry:
         return True
     else:
@@ -710,11 +1682,12 @@ def does_friend_request_match(username, friend_username):
 
 def pending_friend_request_list(username):
     """Returns friend username if the username already exists in the friends, False otherwise"""
-    c.execute(
-        "SELECT * FROM friends WHERE friend_user=:friend_user",
-        {"friend_user": username},
-    )
-    user_entry = c.fetchall()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT sender, receiver FROM friend_request WHERE receiver=:friend_user",
+            {"friend_user": username},
+        )
+        user_entry = c.fetchall()
 
     if user_entry:
         return user_entry
@@ -725,15 +1698,12 @@ def pending_friend_request_list(username):
 def add_to_friend_list(username, friend_username):
     """Returns True if the friend was successfully added into the database, False otherwise"""
     try:
-        with conn:
-            c.execute(
-                "INSERT INTO friends_list VALUES (:user, :friend_user)",
-                {"user": username, "friend_user": friend_username},
-            )
+        with get_cursor() as c:
             c.execute(
-                "INSERT INTO friends_list VALUES (:user, :friend_user)",
-                {"user": friend_username, "friend_user": username},
+                "INSERT OR IGNORE INTO friendship (user_a, user_b) VALUES (?, ?)",
+                friendship_key(username, friend_username),
             )
+            after_commit(link_friends, username, friend_username)
         return True
     except sqlite3.Error as error:
         print("Failed to add friend to the sqlite table:", error)
@@ -743,10 +1713,10 @@ def add_to_friend_list(username, friend_username):
 def delete_friend_request(username, friend_username):
     """Returns True if the friend was successfully deleted, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Delete the friend with the provided username
             c.execute(
-                "DELETE FROM friends WHERE user = ? AND friend_user = ?",
+                "DELETE FROM friend_request WHERE sender = ? AND receiver = ?",
                 (
                     friend_username,
                     username,
@@ -758,59 +1728,120 @@ def delete_friend_request(username, friend_username):
         return False
 
 
+def accept_friend(username, friend_username):
+    """Returns True if the friendship was saved and the requests between the two users deleted, False otherwise"""
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "INSERT OR IGNORE INTO friendship (user_a, user_b) VALUES (?, ?)",
+                friendship_key(username, friend_username),
+            )
+            # A request either of them sent the other is answered by the friendship
+            c.execute(
+                """DELETE FROM friend_request
+                   WHERE (sender = :friend_user AND receiver = :user)
+                      OR (sender = :user AND receiver = :friend_user)""",
+                {"user": username, "friend_user": friend_username},
+            )
+            after_commit(link_friends, username, friend_username)
+        return True
+    except sqlite3.Error as error:
+        print("Failed to add friend to the sqlite table:", error)
+        return False
+
+
 def list_of_friends(username):
     """Returns friend username if the username already exists in the friends, False otherwise"""
-    c.execute("SELECT * FROM friends_list WHERE user=:user", {"user": username})
-    user_entry = c.fetchall()
-
-    if user_entry:
-        return user_entry
+    """Rows are (username, friend) ordered by friend, read from the friend graph"""
+    friends = friends_of(username)
+    if friends:
+        return [(username, friend) for friend in sorted(friends)]
     else:
         return False
 
 
 def does_friend_match(username, friend_username):
     """Returns friend username if the username already exists in the friends, False otherwise"""
-    c.execute(
-        "SELECT * FROM friends_list WHERE user=:user AND friend_user=:friend_user",
-        {"user": username, "friend_user": friend_username},
-    )
-    user_entry = c.fetchone()
-    if user_entry:
-        return True
-    else:
-        return False
+    return friend_username in load_friend_graph().get(username, ())
 
 
 def delete_friend_from_list(username, friend_username):
     """Returns True if the friend was successfully deleted, False otherwise"""
     try:
-        with conn:
-            # Delete the friend with the provided username
-            c.execute(
-                "DELETE FROM friends_list WHERE user = ? AND friend_user = ?",
-                (
-                    friend_username,
-                    username,
-                ),
-            )
+        with get_cursor() as c:
+            # Delete the friendship with the provided username
             c.execute(
-                "DELETE FROM friends_list WHERE user = ? AND friend_user = ?",
-                (
-                    username,
-                    friend_username,
-                ),
+                "DELETE FROM friendship WHERE user_a = ? AND user_b = ?",
+                friendship_key(username, friend_username),
             )
+            after_commit(unlink_friends, username, friend_username)
         return True
     except sqlite3.Error as error:
         print("Failed to delete user from the sqlite table:", error)
         return False
 
 
+def friendship_key(username, friend_username):
+    """Returns the two usernames in the order the friendship table stores them"""
+    return min(username, friend_username), max(username, friend_username)
+
+
+def load_friend_graph():
+    """Returns the username -> set of friends graph, reading friendship the first time it is called"""
+    """The rows are read without holding friend_graph_lock, which is never held while waiting for a connection"""
+    global friend_graph
+    with friend_graph_lock:
+        if friend_graph is not None:
+            return friend_graph
+        version = friend_graph_version
+
+    graph = {}
+    with get_cursor() as c:
+        c.execute("SELECT user_a, user_b FROM friendship")
+        for user_a, user_b in c.fetchall():
+            graph.setdefault(user_a, set()).add(user_b)
+            graph.setdefault(user_b, set()).add(user_a)
+        # Rows read inside a transaction with uncommitted writes could still roll back
+        uncommitted = c.connection.in_transaction
+
+    with friend_graph_lock:
+        if friend_graph is None and not uncommitted and friend_graph_version == version:
+            friend_graph = graph
+        return graph if friend_graph is None else friend_graph
+
+
+def friends_of(username):
+    """Returns a copy of the set of the user's friends, taken from the friend graph"""
+    graph = load_friend_graph()
+    with friend_graph_lock:
+        return set(graph.get(username, ()))
+
+
+def link_friends(username, friend_username):
+    """Add a friendship that was just committed to the graph, if the graph has been read"""
+    global friend_graph_version
+    with friend_graph_lock:
+        friend_graph_version += 1
+        if friend_graph is not None:
+            friend_graph.setdefault(username, set()).add(friend_username)
+            friend_graph.setdefault(friend_username, set()).add(username)
+
+
+def unlink_friends(username, friend_username):
+    """Take a friendship whose deletion was just committed out of the graph, if the graph has been read"""
+    global friend_graph_version
+    with friend_graph_lock:
+        friend_graph_version += 1
+        if friend_graph is not None:
+            friend_graph.get(username, set()).discard(friend_username)
+            friend_graph.get(friend_username, set()).discard(username)
+
+
 def all_jobs_list(username):
-    """Returns all jobs"""
-    c.execute("SELECT * FROM jobs")
-    jobs = c.fetchall()
+    """Returns all jobs in the order they were posted"""
+    with get_cursor() as c:
+        c.execute("SELECT title FROM jobs ORDER BY id")
+        jobs = c.fetchall()
 
     if jobs:
         return [job[0] for job in jobs]
@@ -818,16 +1849,17 @@ def all_jobs_list(username):
         return []
 
 
-# Function gets the info of the job that matches the title searched
-def get_job(job_title):
-    """Returns the info of the job title you searched for, and returns False if no information on job title is saved"""
-    c.execute(
-        "SELECT * FROM jobs WHERE title=:title",
-        {
-            "title": job_title,
-        },
-    )
-    info = c.fetchone()
+# Function gets the info of the job that matches the id searched
+def get_job(job_id):
+    """Returns the info of the job id you searched for, and returns False if no job has that id"""
+    with get_cursor() as c:
+        c.execute(
+            "SELECT title, description, employer, location, salary, first, last FROM jobs WHERE id=:id",
+            {
+                "id": job_id,
+            },
+        )
+        info = c.fetchone()
 
     if info:
         return info
@@ -835,15 +1867,15 @@ def get_job(job_title):
         return False
 
 
-def create_application(username, job_title, graduation, start, description):
+def create_application(username, job_id, graduation, start, description):
     """Returns True if the application was successfully created, False otherwise"""
     try:
-        with conn:
-            # Insert username, password, first name, and last name into database
+        with get_cursor() as c:
+            # Insert the user's application to the job with the id into database
             c.execute(
-                "INSERT INTO job_applications VALUES (:title, :user,:graduation,:start,:description)",
+                "INSERT INTO job_applications (job_id, user, graduation, start, description) VALUES (:job_id, :user, :graduation, :start, :description)",
                 {
-                    "title": job_title,
+                    "job_id": job_id,
                     "user": username,
                     "graduation": graduation,
                     "start": start,
@@ -856,16 +1888,17 @@ def create_application(username, job_title, graduation, start, description):
         return False
 
 
-def search_application(username, job_title):
-    """Returns the info of the job title you searched for, and returns False if no information on job title is saved"""
-    c.execute(
-        "SELECT * FROM job_applications WHERE user=:user AND title=:title",
-        {
-            "user": username,
-            "title": job_title,
-        },
-    )
-    info = c.fetchone()
+def search_application(username, job_id):
+    """Returns True if the user applied to the job with the id, and returns False otherwise"""
+    with get_cursor() as c:
+        c.execute(
+            "SELECT 1 FROM job_applications WHERE user=:user AND job_id=:job_id",
+            {
+                "user": username,
+                "job_id": job_id,
+            },
+        )
+        info = c.fetchone()
 
     if info:
         return True
@@ -873,15 +1906,15 @@ def search_application(username, job_title):
         return False
 
 
-def delete_application(username, job_title):
+def delete_application(username, job_id):
     """Returns True if the application was successfully deleted, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
-                "DELETE FROM job_applications WHERE user = ? AND title = ?",
+                "DELETE FROM job_applications WHERE user = ? AND job_id = ?",
                 (
                     username,
-                    job_title,
+                    job_id,
                 ),
             )
         return True
@@ -890,13 +1923,16 @@ def delete_application(username, job_title):
         return False
 
 
-def user_made_job(first, last, job_title):
+def user_made_job(username, job_id):
     """checks if job belongs to user. If so, they can't apply for it"""
-    c.execute(
-        "SELECT * FROM jobs WHERE first=:first AND last=:last AND title=:title",
-        {"first": first, "last": last, "title": job_title},
-    )
-    info = c.fetchone()
+    with get_cursor() as c:
+        c.execute(
+            """SELECT 1 FROM accounts
+               JOIN jobs ON jobs.owner_id = accounts.id
+               WHERE accounts.user = :user AND jobs.id = :job_id""",
+            {"user": username, "job_id": job_id},
+        )
+        info = c.fetchone()
 
     if info:
         return True
@@ -906,13 +1942,14 @@ def user_made_job(first, last, job_title):
 
 def applied_jobs_list(username):
     """Returns the info of the job title you applied for, and returns False if no information on job title is saved"""
-    c.execute(
-        "SELECT * FROM job_applications WHERE user=:user",
-        {
-            "user": username,
-        },
-    )
-    jobs = c.fetchall()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT jobs.title FROM job_applications JOIN jobs ON jobs.id = job_applications.job_id WHERE job_applications.user=:user ORDER BY job_applications.id",
+            {
+                "user": username,
+            },
+        )
+        jobs = c.fetchall()
 
     if jobs:
         return [job[0] for job in jobs]
@@ -920,57 +1957,57 @@ def applied_jobs_list(username):
         return []
 
 
-def create_new_message(message, sender, receiver):
-    """Returns True if message was successfully created, False otherwise"""
+def get_job_board(username):
+    """Returns (id, title, applied, saved) for every job in the order they were posted, with the flags for the given user"""
     try:
-        with conn:
-            # Insert message, sender, receiver, and new into database
-            c.execute(
-                "INSERT INTO message_notification VALUES (:message, :sender, :receiver)",
-                {
-                    "message": message,
-                    "sender": sender,
-                    "receiver": receiver,
-                },
-            )
-        return True
+        jobs = get_page(JOB_BOARD_PAGE, {"user": username}, 0, -1)
+        return [(job[1], job[2], bool(job[3]), bool(job[4])) for job in jobs]
     except sqlite3.Error as error:
-        print("Failed to add new message into sqlite table:", error)
-        return False
+        print("Failed to get jobs from sqlite table:", error)
+        return []
 
 
-def get_new_message(receiver):
-    """Returns the info of the message you searched for, and returns False if the user has no messages for them inside of the message database"""
-    c.execute(
-        "SELECT * FROM message_notification WHERE receiver=:receiver",
-        {
-            "receiver": receiver,
-        },
+def mark_messages_read(cursor, username, unread):
+    """Take the unread messages the user was told about off their counter, on the caller's cursor"""
+    # Take away only what was read, a message sent meanwhile stays unread
+    cursor.execute(
+        """UPDATE accounts SET
+               unread_messages = unread_messages - :unread,
+               last_read_message = (
+                   SELECT COALESCE(MAX(id), 0) FROM message WHERE receiver = :user
+               )
+           WHERE user = :user""",
+        {"unread": unread, "user": username},
     )
-    info = c.fetchall()
 
-    if info:
-        return info
-    else:
-        return []
+
+def forget_unread_message(cursor, message_id, receiver):
+    """Take a deleted message off the receiver's unread counter if they were never told about it, on the caller's cursor"""
+    cursor.execute(
+        """UPDATE accounts SET unread_messages = MAX(unread_messages - 1, 0)
+           WHERE user = :receiver AND last_read_message < :id""",
+        {"id": message_id, "receiver": receiver},
+    )
 
 
-def remove_new_message(username, receiver, message):
-    """Returns True if the application was successfully deleted, False otherwise"""
+def read_unread_messages(username):
+    """Returns how many messages the user got since they last checked, and marks them as read"""
     try:
-        with conn:
+        with get_cursor() as c:
+            # No message can arrive between counting the unread ones and marking them read
+            begin_write(c)
             c.execute(
-                "DELETE FROM message_notification WHERE sender = ? AND receiver = ? AND message = ?",
-                (
-                    receiver,
-                    username,
-                    message,
-                ),
+                "SELECT unread_messages FROM accounts WHERE user = :user",
+                {"user": username},
             )
-        return True
+            row = c.fetchone()
+            unread = row[0] if row else 0
+            if unread:
+                mark_messages_read(c, username, unread)
+        return unread
     except sqlite3.Error as error:
-        print("Failed to delete new message from the sqlite table:", error)
-        return False
+        print("Failed to read unread messages from sqlite table:", error)
+        return 0
 
 
 ## EPIC #8 Pt.2 Start ########################
@@ -979,10 +2016,10 @@ def remove_new_message(username, receiver, message):
 def create_notification(message, sender, receiver):
     """Returns True if message was successfully created, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             # Insert message, sender, receiver, and new into database
             c.execute(
-                "INSERT INTO notification VALUES (:message, :sender, :receiver)",
+                "INSERT INTO notification (message, sender, receiver) VALUES (:message, :sender, :receiver)",
                 {
                     "message": message,
                     "sender": sender,
@@ -995,15 +2032,36 @@ def create_notification(message, sender, receiver):
         return False
 
 
+def create_broadcast(message, sender):
+    """Returns True if the broadcast notification was stored, False otherwise"""
+    """A broadcast is stored once no matter how many users will read it"""
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "INSERT INTO broadcast (message, sender) VALUES (:message, :sender)",
+                {"message": message, "sender": sender},
+            )
+        return True
+    except sqlite3.Error as error:
+        print("Failed to add broadcast into sqlite table:", error)
+        return False
+
+
 def get_notification(receiver):
-    """Returns the info of the message you searched for, and returns False if the user has no messages for them inside of the message database"""
-    c.execute(
-        "SELECT * FROM notification WHERE receiver=:receiver",
-        {
-            "receiver": receiver,
-        },
-    )
-    info = c.fetchall()
+    """Returns the user's own notifications followed by the broadcasts they haven't seen yet"""
+    """Each row is (message, sender, receiver, broadcast id), the broadcast id is None for the user's own notifications"""
+    with get_cursor() as c:
+        c.execute(
+            """SELECT message, sender, receiver, NULL FROM notification WHERE receiver = :receiver
+               UNION ALL
+               SELECT broadcast.message, broadcast.sender, accounts.user, broadcast.id
+               FROM accounts JOIN broadcast ON broadcast.id > accounts.last_broadcast
+               WHERE accounts.user = :receiver""",
+            {
+                "receiver": receiver,
+            },
+        )
+        info = c.fetchall()
 
     if info:
         return info
@@ -1014,7 +2072,7 @@ def get_notification(receiver):
 def remove_notification(username, receiver, message):
     """Returns True if the application was successfully deleted, False otherwise"""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
                 "DELETE FROM notification WHERE sender = ? AND receiver = ? AND message = ?",
                 (
@@ -1029,37 +2087,125 @@ def remove_notification(username, receiver, message):
         return False
 
 
-## EPIC #8 Pt.2 END ########################
+def take_notifications(cursor, receiver):
+    """Remove and return every pending notification of the user on the caller's cursor, errors are left to the caller"""
+    # The delete opens the transaction, no broadcast can slip in between the steps
+    cursor.execute(
+        "DELETE FROM notification WHERE receiver = :receiver RETURNING id, message, sender, receiver",
+        {"receiver": receiver},
+    )
+    own = sorted(cursor.fetchall())
+
+    cursor.execute(
+        """SELECT broadcast.message, broadcast.sender, accounts.user, broadcast.id
+           FROM accounts JOIN broadcast ON broadcast.id > accounts.last_broadcast
+           WHERE accounts.user = :receiver
+           ORDER BY broadcast.id""",
+        {"receiver": receiver},
+    )
+    broadcasts = cursor.fetchall()
 
+    # Move the user's broadcast cursor past everything returned
+    if broadcasts:
+        cursor.execute(
+            "UPDATE accounts SET last_broadcast = :id WHERE user = :receiver",
+            {"id": broadcasts[-1][3], "receiver": receiver},
+        )
+    return [(row[1], row[2], row[3], None) for row in own] + broadcasts
 
-def create_message(message, sender, receiver):
-    """Returns True if message was successfully created, False otherwise"""
+
+def drain_notifications(receiver):
+    """Returns every pending notification of the user, like get_notification, and removes them all in one transaction"""
     try:
-        with conn:
-            # Insert message, sender, receiver, and new into database
+        with get_cursor() as c:
+            return take_notifications(c, receiver)
+    except sqlite3.Error as error:
+        print("Failed to drain notifications from sqlite table:", error)
+        return []
+
+
+def get_login_summary(username):
+    """Returns what the login notifications need, read in one transaction"""
+    """The dictionary has days, has_profile, unread_messages and notifications, the unread messages and notifications are marked as read"""
+    try:
+        with get_cursor() as c:
+            begin_write(c)
             c.execute(
-                "INSERT INTO message VALUES (:message, :sender, :receiver)",
-                {
-                    "message": message,
-                    "sender": sender,
-                    "receiver": receiver,
-                },
+                """SELECT accounts.days, accounts.unread_messages,
+                          EXISTS (SELECT 1 FROM profile WHERE profile.user = wanted.user)
+                          OR EXISTS (SELECT 1 FROM education WHERE education.user = wanted.user)
+                   FROM (SELECT :user AS user) AS wanted
+                   LEFT JOIN accounts ON accounts.user = wanted.user""",
+                {"user": username},
             )
-        return True
+            days, unread, has_profile = c.fetchone()
+            if unread:
+                mark_messages_read(c, username, unread)
+            notifications = take_notifications(c, username)
+
+        return {
+            "days": days or 0,
+            "has_profile": bool(has_profile),
+            "unread_messages": unread or 0,
+            "notifications": notifications,
+        }
     except sqlite3.Error as error:
-        print("Failed to add message into sqlite table:", error)
-        return False
+        print("Failed to get login summary from sqlite table:", error)
+        return {
+            "days": 0,
+            "has_profile": False,
+            "unread_messages": 0,
+            "notifications": [],
+        }
 
 
-def get_message(receiver):
-    """Returns the info of the message you searched for, and returns False if the user has no messages for them inside of the message database"""
-    c.execute(
-        "SELECT * FROM message WHERE receiver=:receiver",
+## EPIC #8 Pt.2 END ########################
+
+
+def insert_message(cursor, message, sender, receiver):
+    """Send the message on the caller's cursor and return its id, errors are left to the caller"""
+    # Insert message, sender, receiver, and the time it was sent into database
+    cursor.execute(
+        f"INSERT INTO message (message, sender, receiver, created_at) VALUES (:message, :sender, :receiver, {TIMESTAMP}) RETURNING id, created_at",
         {
+            "message": message,
+            "sender": sender,
             "receiver": receiver,
         },
     )
-    info = c.fetchall()
+    message_id, created_at = cursor.fetchone()
+    record_message(cursor, sender, receiver, message_id, created_at)
+    index_message(cursor, message_id, message, sender, receiver)
+
+    # The receiver sees they have new messages the next time they log in
+    cursor.execute(
+        "UPDATE accounts SET unread_messages = unread_messages + 1 WHERE user = :receiver",
+        {"receiver": receiver},
+    )
+    return message_id
+
+
+def create_message(message, sender, receiver):
+    """Returns the id of the new message if it was successfully created, False otherwise"""
+    try:
+        with get_cursor() as c:
+            return insert_message(c, message, sender, receiver)
+    except sqlite3.Error as error:
+        print("Failed to add message into sqlite table:", error)
+        return False
+
+
+def get_message(receiver):
+    """Returns the info of the message you searched for, and returns False if the user has no messages for them inside of the message database"""
+    """Each row is (message, sender, receiver, id, created_at)"""
+    with get_cursor() as c:
+        c.execute(
+            "SELECT message, sender, receiver, id, created_at FROM message WHERE receiver=:receiver ORDER BY id",
+            {
+                "receiver": receiver,
+            },
+        )
+        info = c.fetchall()
 
     if info:
         return info
@@ -1067,34 +2213,83 @@ def get_message(receiver):
         return []
 
 
+def get_message_by_id(receiver, message_id):
+    """Returns (message, sender, receiver, id, created_at) if the receiver has a message with that id, None otherwise"""
+    with get_cursor() as c:
+        c.execute(
+            "SELECT message, sender, receiver, id, created_at FROM message WHERE id = :id AND receiver = :receiver",
+            {
+                "id": message_id,
+                "receiver": receiver,
+            },
+        )
+        return c.fetchone()
+
+
 def remove_message(username, receiver, message):
     """Returns True if message was successfully deleted, False otherwise"""
+    """Only the oldest matching message is deleted, use remove_message_by_id when the id is known"""
     try:
-        with conn:
+        with get_cursor() as c:
             c.execute(
-                "DELETE FROM message WHERE sender = ? AND receiver = ? AND message = ?",
+                """DELETE FROM message WHERE id = (
+                       SELECT id FROM message
+                       WHERE sender = ? AND receiver = ? AND message = ?
+                       ORDER BY id LIMIT 1
+                   ) RETURNING id, message, sender, receiver""",
                 (
                     receiver,
                     username,
                     message,
                 ),
             )
+            deleted = c.fetchone()
+            if deleted:
+                message_id, message, sender, receiver = deleted
+                forget_message(c, message_id, sender, receiver)
+                forget_unread_message(c, message_id, receiver)
+                unindex_message(c, message_id, message, sender, receiver)
         return True
     except sqlite3.Error as error:
         print("Failed to delete message from the sqlite table:", error)
         return False
 
 
+def remove_message_by_id(receiver, message_id):
+    """Returns True if the receiver's message with that id was deleted, False otherwise"""
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "DELETE FROM message WHERE id = :id AND receiver = :receiver RETURNING id, message, sender, receiver",
+                {
+                    "id": message_id,
+                    "receiver": receiver,
+                },
+            )
+            deleted = c.fetchone()
+            if deleted is None:
+                return False
+            message_id, message, sender, receiver = deleted
+            forget_message(c, message_id, sender, receiver)
+            forget_unread_message(c, message_id, receiver)
+            unindex_message(c, message_id, message, sender, receiver)
+            return True
+    except sqlite3.Error as error:
+        print("Failed to delete message from the sqlite table:", error)
+        return False
+
+
 def get_transaction(receiver, sender):
     """Returns where there was messaging between you and another person and returns False if no information is saved in messages. Sender in this case refers to the person the user is replying to, and receiver is the user looking into their inbox"""
-    c.execute(
-        "SELECT * FROM message WHERE receiver=:receiver AND sender=:sender",
-        {
-            "receiver": receiver,
-            "sender": sender,
-        },
-    )
-    info = c.fetchall()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT 1 FROM message WHERE receiver=:receiver AND sender=:sender LIMIT 1",
+            {
+                "receiver": receiver,
+                "sender": sender,
+            },
+        )
+        info = c.fetchone()
 
     if info:
         return True
@@ -1104,13 +2299,14 @@ def get_transaction(receiver, sender):
 
 def is_plus_tier(username):
     """Returns the tier value of the account. 1 if the user is a plus tier user, 0 if the user is a standard tier user, and False if neither"""
-    c.execute(
-        "SELECT tier FROM accounts WHERE user=:user",
-        {
-            "user": username,
-        },
-    )
-    info = c.fetchone()
+    with get_cursor() as c:
+        c.execute(
+            "SELECT tier FROM accounts WHERE user=:user",
+            {
+                "user": username,
+            },
+        )
+        info = c.fetchone()
 
     if info:
         return info[0]
@@ -1120,22 +2316,14 @@ def is_plus_tier(username):
 
 def is_friend(username, receiver):
     """Returns True if the username and receiver of the message are friends, False otherwise"""
-    c.execute(
-        "SELECT * FROM friends_list WHERE user=:user AND friend_user=:friend_user",
-        {"user": username, "friend_user": receiver},
-    )
-    user_entry = c.fetchone()
-
-    if user_entry:
-        return True
-    else:
-        return False
+    return receiver in load_friend_graph().get(username, ())
 
 
 def list_of_users(username):
     """Returns a list of all the users in the system currently, False otherwise"""
-    c.execute("SELECT user FROM accounts")
-    user_entry = c.fetchall()
+    with get_cursor() as c:
+        c.execute("SELECT user FROM accounts")
+        user_entry = c.fetchall()
 
     if user_entry:
         return user_entry
@@ -1143,15 +2331,494 @@ def list_of_users(username):
         return False
 
 
-def get_applicants_for_job(job_title):
-    """Returns list of users who applied for the given job title"""
+## Pagination Start ########################
+
+# The listings below are read with keyset pagination: each page is its own short
+# query for the rows whose id comes after the last one already seen, so a page costs
+# the same however far into a listing it is and no cursor is held open between pages.
+# Every page query selects the id first and takes the :after and :limit parameters.
+
+# Rows fetched per query by the iter_ helpers and shown per screen by the menus
+PAGE_SIZE = 20
+
+USERS_PAGE = "SELECT id, user FROM accounts WHERE id > :after ORDER BY id LIMIT :limit"
+
+JOB_BOARD_PAGE = """SELECT jobs.id, jobs.id, jobs.title,
+                        EXISTS (
+                            SELECT 1 FROM job_applications
+                            WHERE user = :user AND job_id = jobs.id
+                        ),
+                        EXISTS (
+                            SELECT 1 FROM jobs_saved
+                            WHERE user = :user AND job_id = jobs.id
+                        )
+                    FROM jobs
+                    WHERE jobs.id > :after
+                    ORDER BY jobs.id LIMIT :limit"""
+
+
+def get_page(query, params, after_id=0, page_size=PAGE_SIZE):
+    """Returns up to page_size rows of a page query whose id is greater than after_id, in id order"""
+    """A page_size of -1 returns every remaining row"""
+    with get_cursor() as c:
+        c.execute(query, {**params, "after": after_id, "limit": page_size})
+        return c.fetchall()
+
+
+def iter_rows(query, params, page_size=PAGE_SIZE):
+    """Yields the rows of a page query one at a time without their id, fetching a page whenever the last one runs out"""
+    after_id = 0
+    while True:
+        try:
+            page = get_page(query, params, after_id, page_size)
+        except sqlite3.Error as error:
+            print("Failed to read page from sqlite table:", error)
+            return
+        for row in page:
+            yield row[1:]
+        if len(page) < page_size:
+            return
+        after_id = page[-1][0]
+
+
+def iter_users(page_size=PAGE_SIZE):
+    """Yields (user,) for every user in the system, like the rows of list_of_users"""
+    return iter_rows(USERS_PAGE, {}, page_size)
+
+
+def iter_job_board(username, page_size=PAGE_SIZE):
+    """Yields the rows of get_job_board a page at a time"""
+    jobs = iter_rows(JOB_BOARD_PAGE, {"user": username}, page_size)
+    for job_id, title, applied, saved in jobs:
+        yield job_id, title, bool(applied), bool(saved)
+
+
+## Pagination End ########################
+
+
+## Conversations Start ########################
+
+# Each user has one conversation row per person they have messaged or been messaged
+# by, holding the id and time of the latest message and how many there are. The
+# rows are kept up to date as messages are sent and deleted, so listing someone's
+# conversations never has to group their whole message history.
+
+# Most recent messages shown for each conversation in the inbox
+THREAD_SIZE = 5
+
+
+def record_message(cursor, sender, receiver, message_id, created_at):
+    """Make the new message the latest one of the conversation on both sides, on the caller's cursor"""
+    sides = [(sender, receiver)]
+    if sender != receiver:
+        sides.append((receiver, sender))
+    cursor.executemany(
+        """INSERT INTO conversation (user, counterpart, last_message_id, last_at, message_count)
+           VALUES (?, ?, ?, ?, 1)
+           ON CONFLICT (user, counterpart) DO UPDATE SET
+               last_message_id = excluded.last_message_id,
+               last_at = excluded.last_at,
+               message_count = message_count + 1""",
+        [(user, counterpart, message_id, created_at) for user, counterpart in sides],
+    )
+
+
+def forget_message(cursor, message_id, sender, receiver):
+    """Take a deleted message out of the conversation on both sides, on the caller's cursor"""
+    # If it was the latest message, the one before it becomes the latest
+    cursor.execute(
+        """UPDATE conversation SET
+               message_count = message_count - 1,
+               (last_message_id, last_at) = (
+                   SELECT id, created_at FROM message
+                   WHERE (receiver = :sender AND sender = :receiver)
+                      OR (receiver = :receiver AND sender = :sender)
+                   ORDER BY created_at DESC, id DESC LIMIT 1
+               )
+           WHERE (user = :sender AND counterpart = :receiver)
+              OR (user = :receiver AND counterpart = :sender)""",
+        {"sender": sender, "receiver": receiver},
+    )
+    cursor.execute(
+        "DELETE FROM conversation WHERE message_count <= 0 AND user IN (:sender, :receiver)",
+        {"sender": sender, "receiver": receiver},
+    )
+
+
+def get_conversations(username, before=None, limit=PAGE_SIZE):
+    """Returns up to limit of the conversations the user has received messages in, most recently active first"""
+    """Each row is (counterpart, last_at, message_count, id), pass the last row's (last_at, id) as before for the next page"""
+    with get_cursor() as c:
+        c.execute(
+            """SELECT counterpart, last_at, message_count, id FROM conversation
+               WHERE user = :user AND (:at IS NULL OR (last_at, id) < (:at, :id))
+                 AND EXISTS (
+                     SELECT 1 FROM message
+                     WHERE receiver = :user AND sender = conversation.counterpart
+                 )
+               ORDER BY last_at DESC, id DESC LIMIT :limit""",
+            {
+                "user": username,
+                "at": before[0] if before else None,
+                "id": before[1] if before else None,
+                "limit": limit,
+            },
+        )
+        return c.fetchall()
+
+
+def get_thread_messages(username, counterparts, per_thread=THREAD_SIZE):
+    """Returns {counterpart: messages} with the per_thread most recent messages of each conversation, oldest first"""
+    """Messages are (message, sender, receiver, id, created_at) rows like get_message"""
+    threads = {counterpart: [] for counterpart in counterparts}
+    if not threads:
+        return threads
+
+    with get_cursor() as c:
+        # Each side of a conversation reads only its newest per_thread messages off
+        # its index, and the newest per_thread of those are looked up by id
+        c.execute(
+            """SELECT counterpart.value, message.message, message.sender,
+                      message.receiver, message.id, message.created_at
+               FROM json_each(:counterparts) AS counterpart
+               JOIN message ON message.id IN (
+                   SELECT id FROM (
+                       SELECT id, created_at FROM (
+                           SELECT id, created_at FROM message
+                           WHERE receiver = :user AND sender = counterpart.value
+                           ORDER BY created_at DESC, id DESC LIMIT :per_thread
+                       )
+                       UNION ALL
+                       SELECT id, created_at FROM (
+                           SELECT id, created_at FROM message
+                           WHERE sender = :user AND receiver = counterpart.value
+                             AND receiver != :user
+                           ORDER BY created_at DESC, id DESC LIMIT :per_thread
+                       )
+                   )
+                   ORDER BY created_at DESC, id DESC LIMIT :per_thread
+               )
+               ORDER BY counterpart.value, message.created_at, message.id""",
+            {
+                "user": username,
+                "counterparts": json.dumps(list(threads)),
+                "per_thread": per_thread,
+            },
+        )
+        for row in c.fetchall():
+            threads[row[0]].append(row[1:])
+    return threads
+
+
+def iter_threads(username, per_thread=THREAD_SIZE, page_size=PAGE_SIZE):
+    """Yields (counterpart, last_at, message_count, recent messages) for each conversation, most recently active first"""
+    """Conversations are read a page at a time, with one query for the recent messages of the whole page"""
+    before = None
+    while True:
+        try:
+            page = get_conversations(username, before, page_size)
+            threads = get_thread_messages(
+                username, [row[0] for row in page], per_thread
+            )
+        except sqlite3.Error as error:
+            print("Failed to read conversations from sqlite table:", error)
+            return
+        for counterpart, last_at, message_count, _ in page:
+            yield counterpart, last_at, message_count, threads[counterpart]
+        if len(page) < page_size:
+            return
+        before = page[-1][1], page[-1][3]
+
+
+## Conversations End ########################
+
+
+## Message Search Start ########################
+
+# message_search is an FTS5 index over the text, sender and receiver of every
+# message. It only stores the index, so it has to be told about each message as it
+# is created and, with the same values, as it is deleted.
+
+
+def index_message(cursor, message_id, message, sender, receiver):
+    """Add a new message to the search index, on the caller's cursor"""
+    cursor.execute(
+        "INSERT INTO message_search (rowid, message, sender, receiver) VALUES (?, ?, ?, ?)",
+        (message_id, message, sender, receiver),
+    )
+
+
+def unindex_message(cursor, message_id, message, sender, receiver):
+    """Take a deleted message out of the search index, on the caller's cursor"""
+    cursor.execute(
+        "INSERT INTO message_search (message_search, rowid, message, sender, receiver) VALUES ('delete', ?, ?, ?, ?)",
+        (message_id, message, sender, receiver),
+    )
+
+
+def quote_terms(text):
+    """Returns the words of text as quoted FTS5 strings, so punctuation is never read as query syntax"""
+    return ['"' + word + '"' for word in re.findall(r"\w+", text)]
+
+
+def search_messages(receiver, keywords, sender=None, limit=PAGE_SIZE):
+    """Returns up to limit of the receiver's messages containing every keyword, best match first"""
+    """Rows are (message, sender, receiver, id, created_at) like get_message, pass sender to only search their messages"""
+    # Usernames are matched word by word in the index and then compared exactly
+    columns = {"receiver": receiver, "message": keywords}
+    if sender:
+        columns["sender"] = sender
+    terms = {column: quote_terms(text) for column, text in columns.items()}
+    if not all(terms.values()):
+        return []
+    query = " AND ".join(
+        f"{column} : ({' '.join(words)})" for column, words in terms.items()
+    )
 
     try:
-        with conn:
-            c.execute("SELECT user FROM job_applications WHERE title = ?", (job_title,))
-            applicants = [row[0] for row in c.fetchall()]
-            return applicants
+        with get_cursor() as c:
+            c.execute(
+                """SELECT message.message, message.sender, message.receiver, message.id, message.created_at
+                   FROM message_search
+                   JOIN message ON message.id = message_search.rowid
+                   WHERE message_search MATCH :query
+                     AND message.receiver = :receiver
+                     AND (:sender IS NULL OR message.sender = :sender)
+                   ORDER BY bm25(message_search, 1.0, 0.0, 0.0), message.id DESC
+                   LIMIT :limit""",
+                {
+                    "query": query,
+                    "receiver": receiver,
+                    "sender": sender or None,
+                    "limit": limit,
+                },
+            )
+            return c.fetchall()
+    except sqlite3.Error as error:
+        print("Failed to search messages in sqlite table:", error)
+        return []
+
+
+## Message Search End ########################
+
+
+## Outbound Queue Start ########################
+
+# Messages sent through the outbox are written by a background thread, so the
+# sender's prompt returns straight away. The thread writes whatever has queued up
+# since its last write in one transaction per batch, which is what lets a message to
+# thousands of users go out in a handful of commits. A batch that cannot be written
+# is written one message at a time, and what is still locked out is queued again.
+
+# Most messages written in one transaction
+OUTBOX_BATCH_SIZE = 500
+# Times a locked batch is tried again, waiting twice as long before each try
+OUTBOX_RETRIES = 5
+# Seconds to wait before the first retry
+OUTBOX_RETRY_DELAY = 0.05
+
+
+class MessageQueue:
+    """Queues outgoing messages and delivers them in batches on a background thread"""
+
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE):
+        self.batch_size = batch_size
+        # Each entry is the list of (message, sender, receiver) of one send
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def send(self, message, sender, receivers):
+        """Queue the message for every receiver and return how many were queued, without waiting"""
+        sends = [(message, sender, receiver) for receiver in receivers]
+        if sends:
+            self.pending.put(sends)
+            self.start()
+        return len(sends)
+
+    def start(self):
+        """Start the background thread unless it is already running"""
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name="outbox", daemon=True
+                )
+                self.worker.start()
+
+    def run(self):
+        """Deliver everything queued so far, then wait for more"""
+        while True:
+            entries = [self.pending.get()]
+            while True:
+                try:
+                    entries.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                sends = [send for entry in entries for send in entry]
+                for start in range(0, len(sends), self.batch_size):
+                    undelivered = self.deliver(sends[start : start + self.batch_size])
+                    # Queued before task_done, so flush keeps waiting for them
+                    if undelivered:
+                        self.pending.put(undelivered)
+            finally:
+                for _ in entries:
+                    self.pending.task_done()
+
+    def write(self, batch):
+        """Write the batch in one transaction, trying again while the database is locked"""
+        for attempt in range(OUTBOX_RETRIES + 1):
+            try:
+                with get_cursor() as c:
+                    for message, sender, receiver in batch:
+                        insert_message(c, message, sender, receiver)
+                return
+            except sqlite3.OperationalError:
+                # The transaction was rolled back, so the whole batch can be tried again
+                if attempt == OUTBOX_RETRIES:
+                    raise
+                time.sleep(OUTBOX_RETRY_DELAY * 2**attempt)
+
+    def deliver(self, batch):
+        """Returns the sends of the batch that are not written yet, empty once they all are"""
+        try:
+            self.write(batch)
+            return []
+        except sqlite3.Error as error:
+            print("Failed to deliver queued messages:", error)
+
+        # One failing send rolls back the whole batch, so each send is written on its own
+        for index, send in enumerate(batch):
+            try:
+                self.write([send])
+            except sqlite3.OperationalError as error:
+                # Still locked out, the rest is tried again later instead of being lost
+                print("Failed to deliver queued messages, trying again later:", error)
+                return batch[index:]
+            except sqlite3.Error as error:
+                print("Failed to deliver a queued message:", error)
+        return []
+
+    def flush(self):
+        """Wait until every queued message has been delivered or given up on"""
+        self.pending.join()
+
+
+outbox = MessageQueue()
+
+
+def queue_message(message, sender, receivers):
+    """Returns the number of receivers the message was queued for, it is delivered in the background"""
+    return outbox.send(message, sender, receivers)
+
+
+def flush_outbox():
+    """Wait for every queued message to be written, call before exiting"""
+    outbox.flush()
+
+
+## Outbound Queue End ########################
 
+
+## Friend Suggestions Start ########################
+
+# People you may know are the friends of a user's friends, scored by how many
+# friends they have in common plus how many of university and major they share.
+# The friend graph already holds every user's friends, so only the candidates'
+# accounts are read from the database. Someone with no friends of friends gets
+# people from their university or major instead, read straight off those indexes.
+
+# Suggestions shown at once
+SUGGESTION_LIMIT = 10
+# Score of each friend in common and of each of university and major in common
+MUTUAL_FRIEND_WEIGHT = 2
+SHARED_ATTRIBUTE_WEIGHT = 1
+
+
+def suggest_friends(username, limit=SUGGESTION_LIMIT):
+    """Returns up to limit of (username, first, last, mutual friends, shared attributes), best first"""
+    """Shared attributes names the columns in common, ("university", "major") when both are"""
+    friends = friends_of(username)
+
+    # Count the friends each friend of a friend has in common with the user
+    mutual = {}
+    for friend in friends:
+        for candidate in friends_of(friend):
+            mutual[candidate] = mutual.get(candidate, 0) + 1
+
+    try:
+        with get_cursor() as c:
+            # People the user already asked to connect with are not suggested again
+            c.execute(
+                "SELECT receiver FROM friend_request WHERE sender = :user",
+                {"user": username},
+            )
+            skip = friends | {row[0] for row in c.fetchall()} | {username}
+            for user in skip:
+                mutual.pop(user, None)
+
+            c.execute(
+                "SELECT university, major FROM accounts WHERE user = :user",
+                {"user": username},
+            )
+            university, major = c.fetchone() or (None, None)
+
+            c.execute(
+                """SELECT user, first, last, university, major FROM accounts
+                   WHERE user IN (SELECT value FROM json_each(:users))""",
+                {"users": json.dumps(list(mutual))},
+            )
+            accounts = c.fetchall()
+
+            # Fill up with classmates when the friends of friends run short, the
+            # ones sharing both university and major first. Each group is a LIMITed
+            # read off its own index, so no more classmates are read than are needed
+            classmates = {}
+            for condition in (
+                "university = :university AND major = :major",
+                "university = :university",
+                "major = :major",
+            ):
+                if len(accounts) + len(classmates) >= limit:
+                    break
+                c.execute(
+                    f"""SELECT user, first, last, university, major FROM accounts
+                        WHERE {condition} ORDER BY id LIMIT :limit""",
+                    {
+                        "university": university,
+                        "major": major,
+                        "limit": limit + len(skip) + len(accounts) + len(classmates),
+                    },
+                )
+                for row in c.fetchall():
+                    if row[0] not in skip and row[0] not in mutual:
+                        classmates.setdefault(row[0], row)
+            accounts += classmates.values()
     except sqlite3.Error as error:
-        print("Failed to get applicants:", error)
+        print("Failed to get friend suggestions from sqlite table:", error)
         return []
+
+    suggestions = {}
+    for user, first, last, their_university, their_major in accounts:
+        if user in skip or user in suggestions:
+            continue
+        shared = tuple(
+            name
+            for name, mine, theirs in (
+                ("university", university, their_university),
+                ("major", major, their_major),
+            )
+            if mine is not None and mine == theirs
+        )
+        score = (
+            mutual.get(user, 0) * MUTUAL_FRIEND_WEIGHT
+            + len(shared) * SHARED_ATTRIBUTE_WEIGHT
+        )
+        suggestions[user] = (score, (user, first, last, mutual.get(user, 0), shared))
+
+    ranked = sorted(suggestions.values(), key=lambda item: (-item[0], item[1][0]))
+    return [suggestion for _, suggestion in ranked[:limit]]
+
+
+## Friend Suggestions End ########################
@@ -1,5 +1,6 @@
 # Imports /////////////////////////////////////////////////////////////////
 # importing Packages needed to run the program
+import itertools
 import shutil
 import string
 import sys
@@ -9,8 +10,6 @@ from database_helper import *
 
 # Major Global Variables /////////////////////////////////////////////////////////////////
 
-# this will make the login attempts be unlimited and make it easier for testing for unlimited attempts right now
-LOGIN_NUM_LIMIT = 1000000000
 # Number of users, or accounts, that can be made in this project
 USER_NUM_LIMIT = 10
 
@@ -41,6 +40,7 @@ INBOX_OPTIONS = {
     "a": "Reply",
     "b": "Delete",
     "c": "Go Back",
+    "d": "Search",
 }
 
 # Python "Set" Data type for Job_Options: this is a quick variable to reference when printing out the job options
@@ -68,7 +68,8 @@ FRIEND_OPTIONS = {
     "a": "Find by last name",
     "b": "Find by university",
     "c": "Find by major",
-    "d": "Go back",
+    "d": "People you may know",
+    "e": "Go back",
 }
 
 # Python "Set" Data type for Friend Request: this is a quick variable to reference when printing out the friend request options
@@ -154,12 +155,10 @@ LANGUAGES = {"a": "English", "b": "Spanish"}
 
 # Minor Global Variables /////////////////////////////////////////////////////////////////
 
-# Login limit should start at false
-limit_login = False
-# Login attempts should start at zero
-login_attempts = 0
 # User should be signed out at start
 signed_in = False
+# Account of the signed in user, loaded once when they log in or sign up
+session = None
 # Language should not be specified yet before settings
 language = ""
 # Email is shut off by default
@@ -207,19 +206,31 @@ def login():
     # If you succeed in logging in, then you're signed in under that username
     if check_login(username, password):
         print("You have successfully logged in")
-        global signed_in
+        global signed_in, session
         signed_in = True
+        session = load_session(username)
 
         return username
 
     # If you fail, you can try to log in again
-    # If you fail too many times, then you could be locked out (not implemented yet)
+    # If you fail too many times, logins for that username are paused for a while
     else:
-        print("Incorrect username / password, please try again")
+        if is_login_throttled(username):
+            print("Too many failed login attempts, please try again later")
+        else:
+            print("Incorrect username / password, please try again")
         if try_again():
             return login()
 
 
+# Function that returns the account of the user a screen is showing
+def get_session(username):
+    """Returns the signed in user's Session, or reads the account of any other username"""
+    if session is not None and session.username == username:
+        return session
+    return load_session(username)
+
+
 # Function for signing up for a new account
 def signup():
     """Signup a new user if the username is not already taken and password meets requirements"""
@@ -283,8 +294,9 @@ def signup():
     if create_user(username, password, firstname, lastname, university, major, tier, 0):
         print("Signup successful!")
         notify_new_user(username, firstname, lastname)
-        global signed_in
+        global signed_in, session
         signed_in = True
+        session = load_session(username)
         language = "English"
         email = 1
         SMS = 1
@@ -340,8 +352,11 @@ def validate_password(input_p):
 
 # Function that are a series of notifications for the user upon login
 def notifications_on_login(username):
+    # Everything the notifications need is read in one go when the session starts
+    summary = get_login_summary(username)
+
     # prints a notification if more than 7 days has passed since they applied for a job
-    days = get_days(username)
+    days = summary["days"]
 
     print("\n")
 
@@ -352,28 +367,27 @@ def notifications_on_login(username):
 
     print("\n")
     # prints a notification if the user hasn't created a profile
-    if get_profile(username) is None:
+    if not summary["has_profile"]:
         print("Don't forget to create a profile!")
         print("\n")
     # helper function to check user's inbox to print out a notification if needed
-    new_message_check(username)
+    new_message_check(username, summary["unread_messages"])
     print("\n")
-    new_notification(username)
+    new_notification(username, summary["notifications"])
     print("\n")
 
 
-def new_notification(username):
+def new_notification(username, new_messages=None):
     """Check if user has new messages"""
 
-    new_messages = get_notification(username)
+    # Take every pending notification at once, they won't be shown again
+    if new_messages is None:
+        new_messages = drain_notifications(username)
 
     # If new messages are found for the user, then message user after log in
-    # Delete them from the new message messages table
-    if new_messages:
-        for messages in new_messages:
-            print(messages[0])
-            print("\n")
-            remove_notification(username, messages[1], messages[0])
+    for messages in new_messages:
+        print(messages[0])
+        print("\n")
 
 
 ## EPIC #8 Pt.1 End ########################
@@ -381,12 +395,30 @@ def new_notification(username):
 
 # Function that acts as the main menu.
 def choose_features(username):
-    """Display features and get user's choice"""
+    """Run a signed in session, from the login notifications until the user leaves"""
     draw_line(message="NOTIFICATIONS")
     # First, it outputs a series of notifications if specific conditions are met
+    # This happens once per session, not every time the user is back at the menu
     notifications_on_login(username)
 
-    # Then, it displays a menu full of choices that the user can select
+    # Then, it keeps showing screens, starting from the feature menu
+    run_screens(main_menu, username)
+
+
+# Function designed to show screens one after another until one of them ends the session
+# A screen returns the next screen to show (main_menu to go back to the features)
+# instead of calling it, so the stack stays the same size however long the session is
+def run_screens(screen, username=None):
+    """Call screen(username), then whatever screen it returns, until one returns nothing"""
+    # Screens return None (or logout's 0) when the user chooses not to go back
+    while screen:
+        screen = screen(username)
+
+
+# Function designed to display the features and take the user to the one they chose
+def main_menu(username):
+    """Display features and get user's choice"""
+    # Display a menu full of choices that the user can select
     draw_line(message="Features")
     print(f"Hi {username}! What would you like do?\n")
 
@@ -394,18 +426,17 @@ def choose_features(username):
     for key, value in FEATURES.items():
         print(f"{key}. {value}")
 
-    # prompt user to select a feature
+    # prompt user to select a feature until they pick one that exists
     feature_choice = input(f"Choose one of {list(FEATURES.keys())}: ").strip().lower()
-
-    # If input matches feature, then go to proper feature
-    if feature_choice in FEATURES:
-        print(f"You selected {FEATURES[feature_choice]}")
-        feature_direct(feature_choice, username)
-
-    # else repeat this function again for a proper feature input
-    else:
+    while feature_choice not in FEATURES:
         print("Feature ID not identied. Please try again")
-        return choose_features(username)
+        feature_choice = (
+            input(f"Choose one of {list(FEATURES.keys())}: ").strip().lower()
+        )
+
+    # Go to the proper feature, which returns the screen to show next
+    print(f"You selected {FEATURES[feature_choice]}")
+    return feature_direct(feature_choice, username)
 
 
 # Function designed to direct user to the proper feature
@@ -413,23 +444,23 @@ def choose_features(username):
 def feature_direct(feature_choice, username):
     """Direct user to the feature they chose"""
     if feature_choice == "a":
-        job_search(username)
+        return job_search(username)
     elif feature_choice == "b":
-        friend_search(username)
+        return friend_search(username)
     elif feature_choice == "c":
-        learn_skill(username)
+        return learn_skill(username)
     elif feature_choice == "d":
-        choose_navigation_link()
+        return choose_navigation_link()
     elif feature_choice == "e":
-        show_network(username)
+        return show_network(username)
     elif feature_choice == "f":
-        check_friend_request(username)
+        return check_friend_request(username)
     elif feature_choice == "g":
-        display_profile_navigation(username)
+        return display_profile_navigation(username)
     elif feature_choice == "h":
-        messenger(username)
+        return messenger(username)
     elif feature_choice == "i":
-        logout(username)
+        return logout(username)
 
 
 #### EPIC 7 CHANGES START ###############################
@@ -437,16 +468,15 @@ def feature_direct(feature_choice, username):
 
 # Checks if a new message is in the user's inbox
 # Function is called from the choose_features function
-def new_message_check(username):
+def new_message_check(username, unread=None):
     """Check if user has new messages"""
-    new_messages = get_new_message(username)
+    # Read the user's unread counter and mark those messages as read
+    if unread is None:
+        unread = read_unread_messages(username)
 
     # If new messages are found for the user, then message user after log in
-    # Delete them from the new message messages table
-    if new_messages:
+    if unread:
         print("You have messages waiting for you!\n")
-        for messages in new_messages:
-            remove_new_message(username, messages[1], messages[0])
 
 
 # Function designed for messenging people and receiving messages
@@ -466,21 +496,21 @@ def messenger(username):
 
     # If user enters a, then go to inbox.
     if messenger_choice == "a":
-        inbox(username)
+        return inbox(username)
 
     # Else if the user enters b, then go to send message
     elif messenger_choice == "b":
-        send_message(username)
+        return send_message(username)
 
     # Else if the user enters c, then prompt user to go back or quit
     elif messenger_choice == "c":
         if go_back():
-            return choose_features(username)
+            return main_menu
 
     # Else prompt the user to go back or quit
     else:
         if go_back():
-            return choose_features(username)
+            return main_menu
 
 
 # Function designed to send messages for the standard user
@@ -543,26 +573,25 @@ def standard_messenger(username):
             # Inform user that message has been sent
             if is_friend(username, receiver):
                 create_message(message, username, receiver)
-                create_new_message(message, username, receiver)
                 print("\nMessage sent!\n")
-                choose_features(username)
+                return main_menu
 
             # If receiver is not found, inform user that they are not friends
             # Send user back to feature select
             else:
                 print("\nI'm sorry, you are not friends with that person.\n")
-                choose_features(username)
+                return main_menu
 
         # If you selects no, or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
 
     # If receiver is not found, inform user that the person doesn't exist
     # Send user back to feature select
     else:
         print("The user doesn't exist, please try again")
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to send messages for the plus users
@@ -580,59 +609,72 @@ def plus_messenger(username):
     if check_users == "y":
         # Print user list text
         draw_line(message="User List")
-        # Check the friend list of the user
-        user_list = list_of_users(username)
+        # Print the user list a page at a time
+        user_list = iter_users()
+        shown = print_paged(
+            user_list,
+            lambda name: print(name[0]),
+            "\nHere's a list of every user in the system:\n",
+        )
 
-        # If friend list is empty, inform user that there are no users
-        # Send user back to feature select
-        if user_list is False:
+        # If there are no users, inform user and send them back to feature select
+        if not shown:
             print(
                 "There are no users in the system to message! Returning to main menu \n"
             )
-            choose_features(username)
-
-        # Else print user list
-        else:
-            print("\nHere's a list of every user in the system:\n")
-            for i, name in enumerate(user_list):
-                print(name[0])
+            return main_menu
 
     print("\n")
-    # Prompt user for the user they want to send a message to
-    receiver = input("Please enter the username of who you wish to send a message to: ")
-
-    # Check if the receiver is an existing user
-    # If so, proceed with message
-    if get_user(receiver) is not None:
+    # Prompt user for the users they want to send a message to
+    names = input(
+        "Please enter the usernames of who you wish to send a message to, separated by commas: "
+    )
+    receivers = list(dict.fromkeys(name.strip() for name in names.split(",")))
+    receivers = [name for name in receivers if name]
+
+    # Check which of the receivers are existing users
+    # If any are, proceed with message
+    existing = existing_usernames(receivers)
+    missing = [name for name in receivers if name not in existing]
+    receivers = [name for name in receivers if name in existing]
+    if missing:
+        print(f"These users don't exist and will be skipped: {', '.join(missing)}")
+
+    if receivers:
         # Ask user for message
         message = input("Enter your message: ")
 
+        # Name a single receiver, count several
+        if len(receivers) == 1:
+            recipients = receivers[0]
+        else:
+            recipients = f"{len(receivers)} users"
+
         # Prompt user to confirm message
         confirm = (
             input(
-                f"\nAre you sure you want to send this message to {receiver}? (y/n): "
+                f"\nAre you sure you want to send this message to {recipients}? (y/n): "
             )
             .strip()
             .lower()
         )
 
-        # If user selects yes, send message to user
-        # Add message as new message to the message notification table
+        # If user selects yes, queue the message for every receiver and carry on
+        # Delivering the message also counts it as unread for the receiver
         if confirm == "y":
-            create_message(message, username, receiver)
-            create_new_message(message, username, receiver)
+            queue_message(message, username, receivers)
             print("\nMessage sent!\n")
-            choose_features(username)
+            return main_menu
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
 
-    # If receiver is not found, inform user that the person doesn't exist
+    # If no receiver is found, inform user that the person doesn't exist
     else:
         print("The user doesn't exist, please try again")
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to send messages by interpreting what user they are
@@ -641,15 +683,16 @@ def send_message(username):
     draw_line(message="SEND MESSAGE")
 
     # See which tier the user is in
-    tier = is_plus_tier(username)
+    account = get_session(username)
+    tier = account.tier if account else 0
 
     # If user is in tier 1, call the plus messenger function
     if tier == 1:
-        plus_messenger(username)
+        return plus_messenger(username)
 
     # else call the standard messenger function
     else:
-        standard_messenger(username)
+        return standard_messenger(username)
 
 
 # Function designed to allow user to view their inbox
@@ -657,20 +700,18 @@ def inbox(username):
     """Function that allows user to view inbox"""
     draw_line(message="INBOX")
 
-    # Get inbox text
-    inbox_collection = get_message(username)
+    # Print the inbox one conversation per person, newest conversation first
+    # Each conversation shows its latest messages with the ids to reply or delete by
+    inbox_collection = iter_threads(username)
+    shown = print_paged(inbox_collection, print_thread, "You have messages: \n")
 
     # If inbox is empty, print out a message
-    if not inbox_collection:
+    if not shown:
         print("Your inbox is empty")
-        choose_features(username)
+        return main_menu
 
-    # If inbox is not empty, print out the messages
+    # If inbox is not empty, ask the user what to do with them
     else:
-        print("You have messages: \n")
-        for message in inbox_collection:
-            print(f"From {message[1]}: {message[0]}\n")
-
         # Ask user what they would like to do with the messages
         print("\nWhat would you like to do with these messages?")
         for key, value in INBOX_OPTIONS.items():
@@ -681,21 +722,79 @@ def inbox(username):
 
         # If option a, reply to message
         if inbox_choice == "a":
-            reply_message(username)
+            return reply_message(username)
 
         # Else if option r, delete the message
         elif inbox_choice == "b":
-            delete_message(username)
+            return delete_message(username)
 
         # Else if option b, prompt return to the main menu or quit
         elif inbox_choice == "c":
             if go_back():
-                choose_features(username)
+                return main_menu
+
+        # Else if option d, search the messages
+        elif inbox_choice == "d":
+            return search_inbox(username)
 
         # Else go back to the main menu
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
+
+
+# Function designed to print one message from the inbox
+def print_message(message):
+    """Print the message id, when it was sent, who sent it and the message"""
+    print(f"#{message[3]} ({message[4][:16]}) From {message[1]}: {message[0]}\n")
+
+
+# Function designed to print one conversation from the inbox
+def print_thread(thread):
+    """Print who the conversation is with, how many messages it has and its latest messages"""
+    counterpart, last_at, message_count, messages = thread
+    print(f"Conversation with {counterpart} ({message_count} message(s)):\n")
+    if message_count > len(messages):
+        print(f"... {message_count - len(messages)} earlier message(s)\n")
+    for message in messages:
+        print_message(message)
+
+
+# Function designed to allow user to search their messages
+def search_inbox(username):
+    """Function that allows user to search their messages by keyword and sender"""
+    draw_line(message="SEARCH MESSAGES")
+
+    # Prompt user for what to search for and who it should be from
+    keywords = input("\nPlease enter the words to search for: ")
+    sender = input(
+        "Please enter the username of the sender, or leave blank for anyone: "
+    ).strip()
+
+    # Print the best matches first
+    results = search_messages(username, keywords, sender or None)
+    if results:
+        print(f"\nFound {len(results)} matching message(s):\n")
+        for message in results:
+            print_message(message)
+
+    # If nothing matches, inform user
+    else:
+        print("\nNo messages matched your search.\n")
+
+    if go_back():
+        return main_menu
+
+
+# Function designed to find the message in the user's inbox with the id they enter
+def find_message(username, prompt):
+    """Returns the message with the id the user entered, None if they have no such message"""
+    message_id = input(prompt).strip().lstrip("#")
+
+    # Only look up ids that are whole numbers
+    if message_id.isdigit():
+        return get_message_by_id(username, int(message_id))
+    return None
 
 
 # Function designed to allow user to reply to messages
@@ -703,11 +802,16 @@ def reply_message(username):
     """Function that allows user to reply to messages"""
     draw_line(message="REPLY MESSAGE")
 
-    # prompt user for user they wish to address
-    receiver = input("\nPlease enter the name of the user you wish to reply to: ")
+    # prompt user for the message they wish to reply to
+    original = find_message(
+        username, "\nPlease enter the ID of the message you wish to reply to: "
+    )
+
+    # Check that the message exists and was sent to this user
+    if original is not None:
+        # Reply to whoever sent the message
+        receiver = original[1]
 
-    # Check if the receiver is an existing user and that they've messaged each other
-    if get_transaction(username, receiver):
         # Prompt user for message
         reply = input("\nPlease enter your reply: ")
 
@@ -721,25 +825,22 @@ def reply_message(username):
         )
 
         # If user selects yes, then send relpy to the user
-        # Add message as new message to the message notification table
+        # Sending the message also counts it as unread for the receiver
         if confirm == "y":
             create_message(reply, username, receiver)
-            create_new_message(reply, username, receiver)
             print("\nMessage sent!\n")
-            choose_features(username)
+            return main_menu
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             print("\n")
             if go_back():
-                choose_features(username)
+                return main_menu
 
-    # If receiver is not found, inform user that the person doesn't exist
+    # If the message is not found, inform user that they can't reply to it
     else:
-        print(
-            "\nThe user doesn't exist, or hasn't sent a message for replying. Please try again."
-        )
-        choose_features(username)
+        print("\nYou have no message with that ID for replying. Please try again.")
+        return main_menu
 
 
 # Function designed to allow user to delete messages
@@ -747,40 +848,42 @@ def delete_message(username):
     """Function that allows user to delete messages"""
     draw_line(message="DELETE MESSAGE")
 
-    # Prompt user for user they wish to address
-    receiver = input(
-        "\nPlease enter the name of the user you wish to delete a message from: "
+    # Prompt user for the message they wish to delete
+    message = find_message(
+        username, "\nPlease enter the ID of the message you wish to delete: "
     )
 
-    # Prompt user to enter the message they wish to delete
-    message = input("\nPlease enter the message you wish to delete: ")
+    # If the user has no message with that id, inform user that the message doesn't exist
+    if message is None:
+        print("\nMessage not found. Please try again.\n")
+        return main_menu
 
     # Confirm if user wishes to delete this message
     confirm = (
         input(
-            f"\nAre you sure you want to delete this message from {receiver}? (y/n): "
+            f"\nAre you sure you want to delete this message from {message[1]}? (y/n): "
         )
         .strip()
         .lower()
     )
 
-    # If user selects yes, then delete the message after a check
+    # If user selects yes, then delete the message by its id
     if confirm == "y":
-        # If the message can be deleted, delete the message from the message notification table
-        if remove_message(username, receiver, message):
+        # If the message can be deleted, delete the message from the message table
+        if remove_message_by_id(username, message[3]):
             print("\nMessage deleted!\n")
-            choose_features(username)
+            return main_menu
 
         # If the message can't be deleted, inform user that the message doesn't exist
         else:
             print("\nMessage not found. Please try again.\n")
-            choose_features(username)
+            return main_menu
 
     # If you select no or other options, then prompt user to go back to feature select
     else:
         print("\n")
         if go_back():
-            choose_features(username)
+            return main_menu
 
     #### EPIC 7 CHANGES END ###############################
 
@@ -796,29 +899,22 @@ def notify_applied_jobs(student_id):
 
 
 def notify_new_user(username, firstname, lastname):
+    """Notify every user that a new user has joined"""
+
     message = f"{firstname} {lastname} has joined InCollege"
-    allusers = list_of_users(username)
-    for i, name in enumerate(allusers):
-        create_notification(message, "System", name[0])
+    create_broadcast(message, "System")
 
 
 def notify_new_job(username, new_job_title):
-    """Notify userx that a new job has been posted"""
+    """Notify every user that a new job has been posted"""
 
     message = f"A new job for {new_job_title} has been posted"
-    allusers = list_of_users(username)
-    for i, name in enumerate(allusers):
-        create_notification(message, "System", name[0])
-
+    create_broadcast(message, "System")
 
-def notify_deleted_applied_job(username, deleted_job_title):
-    """Notify user that a job they applied to was deleted"""
 
-    message = f"A job you applied for, {deleted_job_title}, has been deleted"
-    userlist = get_applicants_for_job(deleted_job_title)
-    for i, name in enumerate(userlist):
-        print(name)
-        create_notification(message, "System", name)
+def deleted_job_message(deleted_job_title):
+    """Notification sent to the applicants of a deleted job"""
+    return f"A job you applied for, {deleted_job_title}, has been deleted"
 
 
 ## EPIC #8 Pt.2 END ########################
@@ -840,31 +936,31 @@ def job_search(username):
 
     # If feature a is chosen, then post job
     if feature_choice == "a":
-        job_posting(username)
+        return job_posting(username)
 
     # Else if feature b is chosen, then list all jobs by default
     elif feature_choice == "b":
-        job_select(username)
+        return job_select(username)
 
     # Else if feature c is chosen, then go to special job listings for viewing
     elif feature_choice == "c":
-        job_listing(username)
+        return job_listing(username)
 
     # Else if feature d is chosen, then delete a job
     elif feature_choice == "d":
-        job_delete(username)
+        return job_delete(username)
 
     # Else if feature e is chosen, then save the job
     elif feature_choice == "e":
-        save_job(username)
+        return save_job(username)
 
     # Else if feature e is chosen, then prompt to go back to feature select
     elif feature_choice == "f":
         if go_back():
-            choose_features(username)
+            return main_menu
     else:
         print("Invalid input. Please try again.")
-        choose_features(username)
+        return main_menu
 
 
 # Function to post a job
@@ -876,6 +972,12 @@ def job_posting(username):
     if reached_job_limit(db_num_jobs):
         return None
 
+    # The job is posted under the account's name, so the account has to exist
+    account = get_session(username)
+    if account is None:
+        print("\nYour account could not be found. Please try again later.\n")
+        return main_menu
+
     # Print job posting line
     draw_line(message="JOB_POSTING")
 
@@ -894,8 +996,9 @@ def job_posting(username):
         job_employer,
         job_location,
         job_salary,
-        get_first_name(username),
-        get_last_name(username),
+        account.first,
+        account.last,
+        username,
     )
 
     # Inform user that the job has been created
@@ -904,7 +1007,25 @@ def job_posting(username):
     )
     notify_new_job(username, job_title)
     # Go back to feature select by default
-    choose_features(username)
+    return main_menu
+
+
+# Function designed to read the id of a job the user picked from a list
+def read_job_id(prompt):
+    """Returns the job id the user entered, None if it isn't a job id"""
+    job_id = input(prompt).strip().lstrip("#")
+
+    # Only whole numbers can be job ids
+    if job_id.isdigit():
+        return int(job_id)
+    return None
+
+
+# Function designed to print a list of (id, title) jobs
+def print_job_list(jobs):
+    """Print one line per job, with the id the user picks it by"""
+    for job_id, title in jobs:
+        print(f"#{job_id} - {title}")
 
 
 # Function designed to delete a job
@@ -912,12 +1033,9 @@ def job_delete(username):
     """Job delete page"""
     draw_line(message="JOB DELETE")
     print("Here are the jobs you posted that you can delete:\n")
-    jobs = get_job_list_posted_by_user(
-        get_first_name(username), get_last_name(username)
-    )
+    jobs = dict(get_job_list_posted_by_user(username))
     if jobs:
-        for idx, job in enumerate(jobs):
-            print(f"{idx + 1} - {job}")
+        print_job_list(jobs.items())
     else:
         print("You have not posted any jobs yet. So you can't delete any jobs.")
 
@@ -925,14 +1043,20 @@ def job_delete(username):
     if jobs:
         delete_job_confirmation = input("Would you like to delete a job? y/n: ").lower()
         if delete_job_confirmation == "y":
-            delete_job_title = input("Please enter the job title you want to delete: ")
-            if delete_job_title in jobs:
-                delete_job(delete_job_title)
-                clean_saved_jobs_when_job_deleted(delete_job_title)
-                notify_deleted_applied_job(username, delete_job_title)
-                print("Job deleted successfully!")
+            delete_job_id = read_job_id(
+                "Please enter the ID of the job you want to delete: "
+            )
+            if delete_job_id in jobs:
+                # Delete the user's job and notify its applicants in one transaction
+                retired = retire_job(
+                    delete_job_id, deleted_job_message(jobs[delete_job_id]), username
+                )
+                if retired is not None:
+                    print("Job deleted successfully!")
+                else:
+                    print("The job could not be deleted, please try again.")
             else:
-                print("You don't have a job with that title.")
+                print("You don't have a job with that ID.")
         elif delete_job_confirmation == "n":
             print("You have chosen not to delete a job.")
         else:
@@ -940,33 +1064,28 @@ def job_delete(username):
 
     # Go back to feature select by default
     if go_back():
-        choose_features(username)
+        return main_menu
 
 
 def save_job(username):
     """Save/unsave a job page"""
     draw_line(message="SAVE/UNSAVE JOB FOR LATER")
     print("Here are the jobs you can save for later:\n")
-    jobs = [
-        unsaved_job
-        for unsaved_job in all_jobs_list(username)
-        if unsaved_job not in get_saved_jobs(username)
-    ]
+    jobs = dict(get_unsaved_jobs(username))
     if jobs:
-        for idx, job in enumerate(jobs):
-            print(f"{idx + 1} - {job}")
+        print_job_list(jobs.items())
     else:
         print("There are no jobs you can save for later.")
 
     # Prompt user to select a job to save
     save_job_confirmation = input("Would you like to save a job? y/n: ").lower()
     if save_job_confirmation == "y":
-        save_job_title = input("Please enter the job title you want to save: ")
-        if save_job_title in jobs:
-            save_job_for_user(username, save_job_title)
+        save_job_id = read_job_id("Please enter the ID of the job you want to save: ")
+        if save_job_id in jobs:
+            save_job_for_user(username, save_job_id)
             print("Job saved successfully!")
         else:
-            print("We don't have a job with that title.")
+            print("We don't have a job with that ID.")
     elif save_job_confirmation == "n":
         print("You have chosen not to save a job.")
     else:
@@ -974,18 +1093,19 @@ def save_job(username):
 
     unsave_job_confirmation = input("\nWould you like to unsave a job? y/n: ").lower()
     if unsave_job_confirmation == "y":
-        saved_jobs = get_saved_jobs(username)
+        saved_jobs = dict(get_saved_jobs(username))
         if saved_jobs:
             print("Here are the jobs you can unsave:")
-            for idx, job in enumerate(saved_jobs):
-                print(f"{idx + 1} - {job}")
+            print_job_list(saved_jobs.items())
             print("\n")
-            unsave_job_title = input("Please enter the job title you want to unsave: ")
-            if unsave_job_title in get_saved_jobs(username):
-                delete_saved_job(username, unsave_job_title)
+            unsave_job_id = read_job_id(
+                "Please enter the ID of the job you want to unsave: "
+            )
+            if unsave_job_id in saved_jobs:
+                delete_saved_job(username, unsave_job_id)
                 print("Job unsaved successfully!")
             else:
-                print("We don't have a job with that title.")
+                print("We don't have a job with that ID.")
         else:
             print("There are no jobs you can unsave.")
     elif unsave_job_confirmation == "n":
@@ -995,7 +1115,7 @@ def save_job(username):
 
     # Go back to feature select by default
     if go_back():
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to let user decide on how to view jobs
@@ -1014,32 +1134,32 @@ def job_listing(username):
 
     # If feature a is chosen, then list all jobs by default
     if feature_choice == "a":
-        list_all_jobs(username)
+        return list_all_jobs(username)
 
     # Else if feature b is chosen, then list all jobs the user applied to
     elif feature_choice == "b":
-        list_applied_jobs(username)
+        return list_applied_jobs(username)
 
     # Else if feature c is chosen, then list all jobs the user did NOT applied to
     elif feature_choice == "c":
-        list_unapplied_jobs(username)
+        return list_unapplied_jobs(username)
 
     # Else if feature d is chosen, then list all jobs that the user has saved
     elif feature_choice == "d":
-        show_saved_jobs(username)
+        return show_saved_jobs(username)
 
     elif feature_choice == "e":
-        show_unsaved_jobs(username)
+        return show_unsaved_jobs(username)
 
     # Else if feature e is chosen, then prompt user to go back to feature select or quit
     elif feature_choice == "f":
         if go_back():
-            choose_features(username)
+            return main_menu
 
     # Else, prompt user to go back to feature select or quit
     else:
         if go_back():
-            choose_features(username)
+            return main_menu
 
 
 def show_saved_jobs(username):
@@ -1049,35 +1169,29 @@ def show_saved_jobs(username):
     saved_jobs = get_saved_jobs(username)
     if saved_jobs:
         print("Here are the jobs you saved for later:\n")
-        for idx, job in enumerate(saved_jobs):
-            print(f"{idx + 1} - {job}")
+        print_job_list(saved_jobs)
     else:
         print("There are no jobs you saved for later.")
 
     # Go back to feature select by default
     if go_back():
-        choose_features(username)
+        return main_menu
 
 
 def show_unsaved_jobs(username):
     """show unsaved jobs page"""
     draw_line(message="SHOW_UNSAVED_JOBS")
 
-    unsaved_jobs = [
-        unsaved_job
-        for unsaved_job in all_jobs_list(username)
-        if unsaved_job not in get_saved_jobs(username)
-    ]
+    unsaved_jobs = get_unsaved_jobs(username)
     if unsaved_jobs:
         print("Here are the jobs you have not saved for later:\n")
-        for idx, job in enumerate(unsaved_jobs):
-            print(f"{idx + 1} - {job}")
+        print_job_list(unsaved_jobs)
     else:
         print("You have saved all the jobs")
 
     # Go back to feature select by default
     if go_back():
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to list all available jobs
@@ -1085,19 +1199,12 @@ def list_all_jobs(username):
     """job selection page"""
     draw_line(message="LIST_ALL_JOBS")
 
-    # Get all jobs from database
-    all_jobs = all_jobs_list(username)
-    applied_jobs = applied_jobs_list(username)
-
-    # Print all jobs and prompt user if they wish to apply to any of the jobs listed
-    if all_jobs:
-        print("\nHere are all jobs available:\n")
-        for job in all_jobs:
-            if job in applied_jobs:
-                print(f"[Applied] {job}")
-            else:
-                print(f"[] {job}")
+    # Print all jobs a page at a time, flagged with the ones the user applied to
+    job_board = iter_job_board(username)
+    shown = print_paged(job_board, print_job, "\nHere are all jobs available:\n")
 
+    # Prompt user if they wish to apply to any of the jobs listed
+    if shown:
         print("\n")
 
         view_info = input(
@@ -1106,17 +1213,17 @@ def list_all_jobs(username):
 
         # If user selects yes, have them search for the job
         if view_info == "y":
-            apply_for_job(username)
+            return apply_for_job(username)
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
 
     # Else, inform user that there are no jobs listed
     else:
         print("\nThere are no jobs opening on inCollege.")
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to list all jobs the user has applied to
@@ -1139,100 +1246,78 @@ def list_applied_jobs(username):
             "You have already applied to these jobs, and cannot resend an application.\n"
         )
         if go_back():
-            choose_features(username)
+            return main_menu
 
     # Else, inform user that there are no jobs listed
     else:
         print("\nThere are no jobs you've applied for.")
-        choose_features(username)
+        return main_menu
 
 
 # Function designed to list all jobs the user has NOT applied to
 def list_unapplied_jobs(username):
     """job selection page"""
     draw_line(message="LIST_UNAPPLIED_JOBS")
-    # Get all job applciations the user has made from the database
-    applied_jobs = applied_jobs_list(username)
-
-    # If there is atleast one job the user has applied to...
-    if applied_jobs:
-        # Make a set containing the titles of all jobs the user has applied to
-        s = set(applied_jobs)
-
-        # Get all jobs from the database
-        # Keep only the titles of the jobs that the user has not applied to
-        unapplied_jobs = [job for job in all_jobs_list(username) if job not in s]
-
-        # If there are job titles that the user hasn't applied to...
-        # Print them and prompt user if they wish to apply to any of the jobs listed
-        if unapplied_jobs:
-            print("\nListing all jobs you have NOT applied for:\n")
+    # Get all jobs from the database
+    # Keep only the titles of the jobs that the user has not applied to
+    unapplied_jobs = [job for job in get_job_board(username) if not job[2]]
 
-            for job in unapplied_jobs:
-                print(f"[] {job}")
-
-            print("\n")
-
-            view_info = input(
-                "Do you want to apply to any of the jobs on this list? y/n?: "
-            ).lower()
-
-            # If user selects yes, have them search for the job
-            if view_info == "y":
-                apply_for_job(username)
-
-            # If you select no or other options, then prompt user to go back to feature select
-            else:
-                if go_back():
-                    choose_features(username)
-
-        # Else, inform user that there are no jobs listed
-        else:
-            print("\nThere are no jobs you have NOT applied for.")
-            choose_features(username)
-
-    # Else, if there are no job applications, then the user has not applied to any jobs.
-    # This means all of the jobs are unapplied: and the user can apply to any of them
-    else:
-        all_jobs = all_jobs_list(username)
+    # If there are job titles that the user hasn't applied to...
+    # Print them and prompt user if they wish to apply to any of the jobs listed
+    if unapplied_jobs:
         print("\nListing all jobs you have NOT applied for:\n")
-        for job in all_jobs:
-            if job in applied_jobs:
-                print(f"[Applied] {job}")
-            else:
-                print(f"[] {job}")
+        print_job_board(unapplied_jobs)
 
         print("\n")
+
         view_info = input(
             "Do you want to apply to any of the jobs on this list? y/n?: "
         ).lower()
 
         # If user selects yes, have them search for the job
         if view_info == "y":
-            apply_for_job(username)
+            return apply_for_job(username)
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
+
+    # Else, inform user that there are no jobs listed
+    else:
+        print("\nThere are no jobs you have NOT applied for.")
+        return main_menu
+
+
+# Function designed to print the jobs from get_job_board, marking the ones applied to or saved
+def print_job_board(job_board):
+    """Print one line per job"""
+    for job in job_board:
+        print_job(job)
+
+
+# Function designed to print one (id, title, applied, saved) row of the job board
+def print_job(job):
+    """Print the job id and title, marked if the user applied to it and if they saved it"""
+    job_id, title, applied, saved = job
+    saved_mark = " [Saved]" if saved else ""
+    if applied:
+        print(f"#{job_id} [Applied] {title}{saved_mark}")
+    else:
+        print(f"#{job_id} [] {title}{saved_mark}")
 
 
 # Function designed to select a job to apply (list all available jobs by default)
 def job_select(username):
     """job selection page"""
     draw_line(message="JOB_SELECT")
-    # Get all jobs from database
-    all_jobs = all_jobs_list(username)
-    applied_jobs = applied_jobs_list(username)
+    # Get all jobs from database, already flagged with the ones the user applied to
+    job_board = get_job_board(username)
 
     # Print all jobs and prompt user if they wish to apply to any of the jobs listed
-    if all_jobs:
+    if job_board:
         print("\nHere are all jobs available:\n")
-        for job in all_jobs:
-            if job in applied_jobs:
-                print(f"[Applied] {job}")
-            else:
-                print(f"[] {job}")
+        print_job_board(job_board)
 
         print("\n")
         view_info = input(
@@ -1241,28 +1326,28 @@ def job_select(username):
 
         # If user selects yes, have them search for the job
         if view_info == "y":
-            apply_for_job(username)
+            return apply_for_job(username)
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
     # Else, upon a failed search, inform the user that no account has that last name
     else:
         print("\nThere are no jobs opening on inCollege.")
-        choose_features(username)
+        return main_menu
 
 
-# Function designed to search for a job title, then confirm their selectiom
+# Function designed to search for a job id, then confirm their selectiom
 def apply_for_job(username):
     draw_line(message="JOB_CONFIRM")
-    """Promopt the user to search by job title , inform them, and ask for confirmation"""
-    job_title = input("\nEnter the title of the job you want to apply for: ")
+    """Promopt the user to search by job id , inform them, and ask for confirmation"""
+    job_id = read_job_id("\nEnter the ID of the job you want to apply for: ")
 
-    # Check if the job title exist
-    job_info = get_job(job_title)
+    # Check if the job id exist
+    job_info = get_job(job_id) if job_id is not None else False
 
-    # If the job title exists, inform the user about the job
+    # If the job id exists, inform the user about the job
     if job_info:
         print("\nThis is the current job information for this title:")
         print(f"\nTitle: {job_info[0]}")
@@ -1279,27 +1364,25 @@ def apply_for_job(username):
 
         # If user selects yes, peform the send application function
         if confirm_apply == "y":
-            send_application(username, job_title)
+            return send_application(username, job_id)
 
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
 
     # Else, inform the user that the user does not exist, then repeat job select
     else:
-        print("There is no job with that title, please try again.")
-        job_select(username)
+        print("There is no job with that ID, please try again.")
+        return job_select
 
 
 # Function designed to store and sav application
-def send_application(username, job_title):
+def send_application(username, job_id):
     # First, check and see if the user has already applied to this job
-    application_check = search_application(username, job_title)
+    application_check = search_application(username, job_id)
     # Second, check and see if the user had posted this job
-    origin_check = user_made_job(
-        get_first_name(username), get_last_name(username), job_title
-    )
+    origin_check = user_made_job(username, job_id)
 
     # If the user has applied to this job, inform them that they have already applied
     # Nothing happens, and they are sent to the feature select
@@ -1307,12 +1390,12 @@ def send_application(username, job_title):
         print(
             "\nYou have already applied to this job, and cannot resend an application."
         )
-        choose_features(username)
+        return main_menu
 
     # If user created this job, inform them that they can't apply to a job they created
     elif origin_check is True:
         print("\nYou can't hire yourself for a job you posted!")
-        choose_features(username)
+        return main_menu
 
     # If the user has not applied to this job, and they don't own it, then send the application
     elif application_check is False:
@@ -1331,7 +1414,7 @@ def send_application(username, job_title):
         # Take user's information and save as an application
         print("\n")
         verify_apply = create_application(
-            username, job_title, graduation, start, description
+            username, job_id, graduation, start, description
         )
 
         # If the user's application saves successfully, inform them that their application has been sent
@@ -1340,7 +1423,7 @@ def send_application(username, job_title):
             # num_days_since_applied resets to 0 upon the application being saved successfully
             # as to reset the 7 day timer for the notificaiton
             reset_days(username)
-            choose_features(username)
+            return main_menu
 
 
 # Function that helps you search for friends
@@ -1360,16 +1443,18 @@ def friend_search(username):
     # User can also go back instead of searching
     if feature_choice == "a":
         last_name_search(username)
-        choose_features(username)
+        return main_menu
     if feature_choice == "b":
         university_search(username)
-        choose_features(username)
+        return main_menu
     if feature_choice == "c":
         major_search(username)
-        choose_features(username)
+        return main_menu
     elif feature_choice == "d":
+        return friend_suggestions(username)
+    elif feature_choice == "e":
         if go_back():
-            choose_features(username)
+            return main_menu
 
 
 # Function designed to search the name of someone you knoe
@@ -1423,7 +1508,7 @@ def last_name_search(username):
         # If you select no or other options, then prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
     # Else, upon a failed search, inform the user that no account has that last name
     else:
         print(
@@ -1459,13 +1544,53 @@ def university_search(username):
         # Else, prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
 
     # Else, inform the user that no student is associated with this university
     else:
         print(f"\nThere are no users that attend {friend_university} on inCollege.")
 
 
+# Function that suggests people the user may know
+def friend_suggestions(username):
+    """people you may know page"""
+    draw_line(message="PEOPLE_YOU_MAY_KNOW")
+
+    # Friends of friends come first, then people from the same university or major
+    suggestions = suggest_friends(username)
+
+    # If there is anyone to suggest, show why they were suggested
+    if suggestions:
+        print("\nPeople you may know:\n")
+        for friend_username, first, last, mutual, shared in suggestions:
+            reasons = []
+            if mutual:
+                reasons.append(f"{mutual} mutual friend(s)")
+            if shared:
+                reasons.append(f"same {' and '.join(shared)}")
+            print(f"{first} {last} ({friend_username}) - {', '.join(reasons)}")
+
+        # Prompt user to send friend request
+        choice = input(
+            "\nDo you want to request to connect with someone from this list? y/n?: "
+        ).lower()
+
+        # If yes, then send frend request
+        if choice == "y":
+            send_friend_request(username)
+            return main_menu
+
+        # Else, prompt user to go back to feature select
+        else:
+            if go_back():
+                return main_menu
+
+    # Else, inform the user that there is no one to suggest yet
+    else:
+        print("\nThere is no one to suggest yet, try searching for friends instead.")
+        return main_menu
+
+
 # Function that searches for students based off major
 def major_search(username):
     """major search page"""
@@ -1496,7 +1621,7 @@ def major_search(username):
         # Else, prompt user to go back to feature select
         else:
             if go_back():
-                choose_features(username)
+                return main_menu
     # Else, inform the user that no student is associated with this major
     else:
         print(
@@ -1540,18 +1665,18 @@ def learn_skill(username):
 
     # If the user chooses a skill, then go to that skill's page (not implemented yet)
     if skill_choice.isdigit() and 1 <= int(skill_choice) <= len(SKILLS):
-        single_skill(username, int(skill_choice))
+        return single_skill(username, int(skill_choice))
 
     # Else if skill choic is 6, prompt user to go back to feature select
     elif skill_choice.isdigit() and int(skill_choice) == 6:
         print("Not picking to learn a new skill?")
         if go_back():
-            choose_features(username)
+            return main_menu
 
     # Else, inform the user that the input is invalid
     else:
         print("Invalid input, please try again")
-        learn_skill(username)
+        return learn_skill
 
 
 # Function that prints the skills learned
@@ -1564,7 +1689,7 @@ def single_skill(username, skill_choice):
 
     # Prompt the option to go back to feature select
     if go_back():
-        learn_skill(username)
+        return learn_skill
 
 
 # Function that determines if you want to sign in or login
@@ -1579,7 +1704,7 @@ def options(input_d):
 
 
 # Function that controls navigation link feature
-def choose_navigation_link():
+def choose_navigation_link(username=None):
     """Display navigation links and get user's choice"""
     draw_line(message="Navigation Links")
     print("What link would you like to go to?")
@@ -1593,30 +1718,30 @@ def choose_navigation_link():
     # If the user chooses a link, then go to that link
     if navigation_link_choice in NAVIGATION_LINKS_GROUP:
         print(f"You selected {NAVIGATION_LINKS_GROUP[navigation_link_choice]}")
-        navigation_link_direct(navigation_link_choice)
+        return navigation_link_direct(navigation_link_choice)
     # Else, inform the user that the input is invalid then try again
     else:
         print("Link not identfied. Please try again")
-        return choose_navigation_link()
+        return choose_navigation_link
 
 
 # Function that directs user to correct navigation link feature
-def navigation_link_direct(navigation_link_choice, username="test"):
+def navigation_link_direct(navigation_link_choice):
     """Direct user to the naviagation link they chose"""
     if navigation_link_choice == "a":
-        choose_useful_links()
+        return choose_useful_links()
     elif navigation_link_choice == "b":
-        choose_incollege_important_links()
+        return choose_incollege_important_links()
     elif navigation_link_choice == "c":
         if go_back():
             if signed_in == True:
-                choose_features(username)
+                return main_menu
             else:
-                links_or_login()
+                return links_or_login
 
 
 # Function that selects the useful links
-def choose_useful_links():
+def choose_useful_links(username=None):
     """Display useful links and get user's choice"""
     draw_line(message="Useful Links")
     print("What link would you like to go to?")
@@ -1631,58 +1756,58 @@ def choose_useful_links():
     # If the user chooses a link, then go to that link
     if useful_link_choice in USEFUL_LINKS_GROUP:
         print(f"You selected {USEFUL_LINKS_GROUP[useful_link_choice]}")
-        useful_link_direct(useful_link_choice)
+        return useful_link_direct(useful_link_choice)
 
     # Else, inform the user that the input is invalid then try again
     else:
         print("Link not identfied. Please try again")
-        return choose_useful_links()
+        return choose_useful_links
 
 
 # Function that directs user to correct useful link feature
 def useful_link_direct(useful_link_choice):
     """Direct user to the useful link they chose"""
     if useful_link_choice == "a":
-        general()
+        return general()
     elif useful_link_choice == "b":
-        browse_incollege()
+        return browse_incollege()
     elif useful_link_choice == "c":
-        business_solutions()
+        return business_solutions()
     elif useful_link_choice == "d":
-        directories()
+        return directories()
     elif useful_link_choice == "e":
         if go_back():
-            choose_navigation_link()
+            return choose_navigation_link
 
 
 # Function that selects the incollege important links
 def important_link_direct(important_link_choice):
     """Direct user to the useful link they chose"""
     if important_link_choice == "a":
-        copyright_notice()
+        return copyright_notice()
     elif important_link_choice == "b":
-        about_important()
+        return about_important()
     elif important_link_choice == "c":
-        accessibility()
+        return accessibility()
     elif important_link_choice == "d":
-        user_agreement()
+        return user_agreement()
     elif important_link_choice == "e":
-        privacy_policy()
+        return privacy_policy()
     elif important_link_choice == "f":
-        cookie_policy()
+        return cookie_policy()
     elif important_link_choice == "g":
-        copyright_policy()
+        return copyright_policy()
     elif important_link_choice == "h":
-        brand_policy()
+        return brand_policy()
     elif important_link_choice == "i":
-        languages()
+        return languages()
     elif important_link_choice == "j":
         if go_back():
-            choose_navigation_link()
+            return choose_navigation_link
 
 
 # Function that selects the incollege important links
-def choose_incollege_important_links():
+def choose_incollege_important_links(username=None):
     draw_line(message="InCollege Important Links")
     print("What link would you like to go to?")
     for key, value in INCOLLEGE_IMPORTANT_LINKS_GROUP.items():
@@ -1698,12 +1823,12 @@ def choose_incollege_important_links():
     # If the user chooses a link, then go to that link
     if important_link_choice in INCOLLEGE_IMPORTANT_LINKS_GROUP:
         print(f"You selected {INCOLLEGE_IMPORTANT_LINKS_GROUP[important_link_choice]}")
-        important_link_direct(important_link_choice)
+        return important_link_direct(important_link_choice)
 
     # Else, inform the user that the input is invalid then try again
     else:
         print("Link not identified. Please try again")
-        return choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the copyright notice
@@ -1715,7 +1840,7 @@ def copyright_notice():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the accesibility information
@@ -1732,7 +1857,7 @@ def accessibility():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the user agreement information
@@ -1745,7 +1870,7 @@ def user_agreement():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the privacy policy information
@@ -1760,12 +1885,12 @@ def privacy_policy():
 
     # If the user chooses a guest control, then go to that guest control
     if option == "a":
-        guest_controls()
+        return guest_controls()
 
     # Else, prompt the user to return to the main menu or quit
     else:
         if go_back():
-            choose_incollege_important_links()
+            return choose_incollege_important_links
 
 
 # Function that prints the cookie policy information
@@ -1778,7 +1903,7 @@ def cookie_policy():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the copyright policy information
@@ -1791,7 +1916,7 @@ def copyright_policy():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function that prints the brand policy information
@@ -1804,7 +1929,7 @@ def brand_policy():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function to choose guess controls and how you'll turn it on and off
@@ -1823,7 +1948,7 @@ def guest_controls():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function designed to turn guest controls on or off
@@ -1878,7 +2003,7 @@ def languages():
 
     # Prompt the user to return to the main menu or quit
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Function designed to check friend request
@@ -1888,7 +2013,7 @@ def check_friend_request(username):
     friend_request = pending_friend_request_list(username)
     if friend_request is False:
         print("You have no friend requests!")
-        choose_features(username)
+        return main_menu
     else:
         print("You have a pending friend request from:")
         for i, name in enumerate(friend_request):
@@ -1904,20 +2029,20 @@ def check_friend_request(username):
         # If option a, accept the friend request
         if friend_request_choice == "a":
             accept_friend_request(username)
-            choose_features(username)
+            return main_menu
         # Else if option r, reject the friend request
         if friend_request_choice == "r":
             reject_friend_request(username)
-            choose_features(username)
+            return main_menu
         # Else if option b, prompt return to the main menu or quit
         elif friend_request_choice == "b":
             if go_back():
-                choose_features(username)
+                return main_menu
 
         # Else inform user of invalid input and try again
         else:
             print("Character not identified. Please try again")
-            return check_friend_request(username)
+            return check_friend_request
 
 
 # funciton designed to accept friend request
@@ -1926,10 +2051,9 @@ def accept_friend_request(username):
     friend_user = input("Which user would you like to add?")
     user_exists = does_friend_request_match(username, friend_user)
 
-    # If user exists, add friend to friend table
+    # If user exists, add friend to friend table and clear the requests between them
     if user_exists:
-        add_to_friend_list(username, friend_user)
-        delete_friend_request(username, friend_user)
+        accept_friend(username, friend_user)
         print("Friend Added!")
 
     # Else inform user that user doesn't exist and try again
@@ -1966,7 +2090,7 @@ def show_network(username):
     # Send user back to feature select
     if friend_list is False:
         print("You have no friends!")
-        choose_features(username)
+        return main_menu
 
     # Else print friend list
     else:
@@ -1984,17 +2108,17 @@ def show_network(username):
         # if yes, prompt user to enter username to remove and go back to feature select
         if choice == "y":
             delete_friend(username)
-            choose_features(username)
+            return main_menu
 
         # else if no, prompt user to return to feature select
         elif choice == "n":
             if go_back():
-                choose_features(username)
+                return main_menu
 
         # else inform user of invalid input and try again
         else:
             print("Character not identified. Please try again")
-            return show_network(username)
+            return show_network
 
 
 # Function designed to delete a person from friends list
@@ -2025,11 +2149,11 @@ def about_important():
 
     # Prompt user to return to feature select
     if go_back():
-        choose_incollege_important_links()
+        return choose_incollege_important_links
 
 
 # Functioned designed to select general links
-def general():
+def general(username=None):
     """Display general links and get user's choice"""
     draw_line(message="General")
     print("What link would you like to go to?")
@@ -2055,7 +2179,7 @@ def general():
         # Else inform user of invalid input and repeat this functio
         else:
             print("Link not identfied. Please try again")
-            return general()
+            return general
 
     # Else if you are signed in, display the signed in general choices
     else:
@@ -2075,7 +2199,7 @@ def general():
         # Else inform user of invalid input and repeat this function
         else:
             print("Link not identfied. Please try again")
-            return general()
+            return general
 
 
 # Function designed to direct user to the correct general link they've choosen
@@ -2085,20 +2209,20 @@ def non_signed_in_general_direct(general_link_choice):
     if general_link_choice == "a":
         main_helper()
     elif general_link_choice == "b":
-        help_center()
+        return help_center()
     elif general_link_choice == "c":
-        about()
+        return about()
     elif general_link_choice == "d":
-        press()
+        return press()
     elif general_link_choice == "e":
-        blog()
+        return blog()
     elif general_link_choice == "f":
-        careers()
+        return careers()
     elif general_link_choice == "g":
-        developers()
+        return developers()
     elif general_link_choice == "h":
         if go_back():
-            choose_useful_links()
+            return choose_useful_links
 
 
 # Function designed to direct user to the correct general link they've choosen
@@ -2106,20 +2230,20 @@ def non_signed_in_general_direct(general_link_choice):
 def signed_in_general_direct(general_link_choice):
     """Direct user to the general link they chose if signed in"""
     if general_link_choice == "a":
-        help_center()
+        return help_center()
     elif general_link_choice == "b":
-        about()
+        return about()
     elif general_link_choice == "c":
-        press()
+        return press()
     elif general_link_choice == "d":
-        blog()
+        return blog()
     elif general_link_choice == "e":
-        careers()
+        return careers()
     elif general_link_choice == "f":
-        developers()
+        return developers()
     elif general_link_choice == "g":
         if go_back():
-            choose_useful_links()
+            return choose_useful_links
 
 
 # Function designed to display help center page
@@ -2131,7 +2255,7 @@ def help_center():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Function designed to display about page
@@ -2145,7 +2269,7 @@ def about():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Funtion designed to display press page
@@ -2157,7 +2281,7 @@ def press():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Function designed to display blog page
@@ -2170,7 +2294,7 @@ def blog():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Function designed to display careers page
@@ -2183,7 +2307,7 @@ def careers():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Function designed to display developers page
@@ -2196,7 +2320,7 @@ def developers():
 
     # Ask user if they want to go back to general links or log out
     if go_back():
-        general()
+        return general
 
 
 # Function designed to display developers page
@@ -2209,7 +2333,7 @@ def browse_incollege():
 
     # Ask user if they want to go back to useful links or log out
     if go_back():
-        choose_useful_links()
+        return choose_useful_links
 
 
 # Function designed to display business solutions page
@@ -2222,7 +2346,7 @@ def business_solutions():
 
     # Ask user if they want to go back to useful links or log out
     if go_back():
-        choose_useful_links()
+        return choose_useful_links
 
 
 # Function designed to display directories page
@@ -2235,7 +2359,7 @@ def directories():
 
     # Ask user if they want to go back to useful links or log out
     if go_back():
-        choose_useful_links()
+        return choose_useful_links
 
 
 # Function designed to display profile navigation and choose profile to view
@@ -2253,20 +2377,20 @@ def display_profile_navigation(username):
 
     # If user selects option to create their profile, go to create user profile
     if feature_choice == "a":
-        create_user_profile(username)
+        return create_user_profile(username)
 
     # If user selects option to view their profile, go to display user profile
     if feature_choice == "b":
-        display_user_profile(username)
+        return display_user_profile(username)
 
     # If user selects option to view a friend's profile, go to display friend profile
     elif feature_choice == "c":
-        display_friend_profile(username)
+        return display_friend_profile(username)
 
     # If user wants to go back, ask if they want to go back to feature select or log out
     elif feature_choice == "d":
         if go_back():
-            choose_features(username)
+            return main_menu
 
 
 # Function designed to create user's profile
@@ -2297,9 +2421,9 @@ def create_user_profile(username):
         else:
             print("Error creating profile")
             if go_back():
-                display_profile_navigation(username)
+                return display_profile_navigation
             else:
-                create_user_profile(username)
+                return create_user_profile
 
         # If education is created succesfully, inform the user
         if create_education(username, university, degree, years_attended):
@@ -2309,9 +2433,9 @@ def create_user_profile(username):
         else:
             print("Error creating education")
             if go_back():
-                display_profile_navigation(username)
+                return display_profile_navigation
             else:
-                create_user_profile(username)
+                return create_user_profile
 
         # inform user that they'll be adding experience
         print("Let's add some experience!")
@@ -2372,9 +2496,9 @@ def create_user_profile(username):
             else:
                 print("Error creating experience")
                 if go_back():
-                    display_profile_navigation(username)
+                    return display_profile_navigation
                 else:
-                    create_user_profile(username)
+                    return create_user_profile
 
     # If user already has profile, the ddisplay profile navigation
     else:
@@ -2397,9 +2521,9 @@ def create_user_profile(username):
         else:
             print("Error updating profile")
             if go_back():
-                display_profile_navigation(username)
+                return display_profile_navigation
             else:
-                create_user_profile(username)
+                return create_user_profile
 
         # If update education is successful, inform user
         if update_education(username, university, degree, years_attended):
@@ -2409,9 +2533,9 @@ def create_user_profile(username):
         else:
             print("Error updating education")
             if go_back():
-                display_profile_navigation(username)
+                return display_profile_navigation
             else:
-                create_user_profile(username)
+                return create_user_profile
 
         # Inform user that experience will be updated experience
         print("Let's update some experience!")
@@ -2472,12 +2596,12 @@ def create_user_profile(username):
             else:
                 print("Error updating experience")
                 if go_back():
-                    display_profile_navigation(username)
+                    return display_profile_navigation
                 # else:
                 #     create_user_profile(username)
 
     # Go to display choice function to direct user to profile display (for themselves)
-    display_choice(username)
+    return display_choice(username)
     # else:
     #     create_user_profile(username)
 
@@ -2495,14 +2619,12 @@ def display_choice(username):
 
         # If user wants to see their own profile, display the user's profile
         if user_input == "Y":
-            display_user_profile(username)
-            break
+            return display_user_profile(username)
 
         # Else if user doesn't want to see their own profile, go back to the profile navigation
         elif user_input == "N":
             if go_back():
-                display_profile_navigation(username)
-                break
+                return display_profile_navigation
 
         # Else, display error message and prompt user to try again
         else:
@@ -2511,16 +2633,18 @@ def display_choice(username):
 
 # Function designed to display user's profile
 def display_user_profile(username):
-    first = get_first_name(username)
-    last = get_last_name(username)
+    account = get_session(username)
     draw_line(message="PROFILE")
-    print(f"Here's {first} {last}'s profile:")
+    if account is None:
+        print("\nYour account could not be found. Please try again later.\n")
+        return display_profile_navigation
+    print(f"Here's {account.first} {account.last}'s profile:")
     if user_profile := get_profile(username):
         print_profile_only(user_profile)
     else:
         print("You have no profile. Please create one!")
     if go_back():
-        display_profile_navigation(username)
+        return display_profile_navigation
     # else:
     #     display_user_profile(username)
 
@@ -2571,16 +2695,20 @@ def display_friend_profile(username):
     # If friend list is empty, display message showing they have no friends
     if friend_list is False:
         print("You have no friends!")
-        display_profile_navigation(username)
+        return display_profile_navigation
 
     # Else If friend list is not empty, display friend list
     else:
         print("Here's a list of your friends:")
-        for i, name in enumerate(friend_list):
-            if len(name) > 1 and not get_profile(name[1]):
-                print(f"{name[1]}")
+        friends = [name[-1] for name in friend_list]
+
+        # Look up which friends have a profile all at once instead of one by one
+        friends_with_profile = profiles_exist(friends)
+        for friend in friends:
+            if friend in friends_with_profile:
+                print(f"{friend} - PROFILE")
             else:
-                print(f"{name[0]} - PROFILE")
+                print(f"{friend}")
 
         # Ask user to select a friend to view their profile
         choice = input(
@@ -2595,48 +2723,49 @@ def display_friend_profile(username):
             # If user exist, display friend profile and go back to feature select
             if user_exists:
                 display_user_friend_profile(friend_name)
-                choose_features(username)
+                return main_menu
 
             # Else if user does not exist, inform user that friend doesn't exist
             # Then repeat this function
             else:
                 print("Username does not exist in friend requests. Try again!")
-                display_friend_profile(username)
+                return display_friend_profile
 
         # Else if user chooses not to view friend profile, Prompt user to go back to feature select
         elif choice == "n":
             if go_back():
-                choose_features(username)
+                return main_menu
 
         # Else if user enters invalid input, prompt user to try again
         # Repeat this function if this occurs
         else:
             print("Character not identified. Please try again")
-            return display_friend_profile(username)
+            return display_friend_profile
 
 
 # Function designed to prompt user to log out of their account
 def logout(username):
     """Ask user if they want to log out"""
-    decision = input("Do you want to log out (Y / N)? ").strip().upper()
-
-    # if user selects yes, log out
-    if decision == "Y":
-        # using the global variable num_days_since_applied
-        # each login counts as a day that has passed since they last applied
-        update_days(username)
-        global num_days_since_applied
-        num_days_since_applied = get_days(username)
-        return 0
-
-    # Else if user selects no, return to feature select
-    elif decision == "N":
-        choose_features(username)
-
-    # Else if user selects anything else, display error message and prompt user to try again
-    else:
-        print("Invalid input, please try again")
-        logout(username)
+    while True:
+        decision = input("Do you want to log out (Y / N)? ").strip().upper()
+
+        # if user selects yes, log out
+        if decision == "Y":
+            # using the global variable num_days_since_applied
+            # each login counts as a day that has passed since they last applied
+            update_days(username)
+            global num_days_since_applied, session
+            num_days_since_applied = get_days(username)
+            session = None
+            return 0
+
+        # Else if user selects no, return to feature select
+        elif decision == "N":
+            return main_menu
+
+        # Else if user selects anything else, display error message and prompt user to try again
+        else:
+            print("Invalid input, please try again")
 
 
 # Function designed to determine if user would like to sign up or log in
@@ -2663,57 +2792,60 @@ def main_entry():
 # Function that ask if user wants to log out or go to feature select menu
 def go_back():
     """Ask user if they want to go back to the previous page"""
-    decision = input("Do you want to go back (Y / N)? ").strip().upper()
-
-    # if user wants to go back, return True
-    if decision == "Y":
-        return True
-
-    # else if user wants to log out, return False
-    elif decision == "N":
-        return False
-
-    # else, inform user of invalid input and repeat this function
-    else:
-        print("Invalid input, please try again")
-        return go_back()
-
+    while True:
+        decision = input("Do you want to go back (Y / N)? ").strip().upper()
 
-# Function that determines login attempt limit has been reached
-def change_limit_login():
-    """Determine if the user has exceeded the number of login attempts"""
-    global limit_login
-    global login_attempts
+        # if user wants to go back, return True
+        if decision == "Y":
+            return True
 
-    # If the number of login attempts is greater than the limit, return True
-    if login_attempts > LOGIN_NUM_LIMIT:
-        limit_login = True
+        # else if user wants to log out, return False
+        elif decision == "N":
+            return False
 
-    # Else, increment log in attempy by 1
-    else:
-        login_attempts += 1
+        # else, inform user of invalid input and ask again
+        else:
+            print("Invalid input, please try again")
+
+
+# Function that prints rows a page at a time, asking before showing the next page
+def print_paged(rows, print_row, header):
+    """Print the header and then the rows PAGE_SIZE at a time, returns the number of rows printed"""
+    # rows can be one of the iter_ generators, so only the pages shown are ever fetched
+    rows = iter(rows)
+    page = list(itertools.islice(rows, PAGE_SIZE))
+    shown = 0
+
+    # Print nothing, not even the header, if there are no rows
+    if page:
+        print(header)
+
+    while page:
+        for row in page:
+            print_row(row)
+        shown += len(page)
+
+        # Only ask about the next page if there is one
+        page = list(itertools.islice(rows, PAGE_SIZE))
+        if page:
+            more = input("\nDo you want to see more (Y / N)? ").strip().upper()
+            if more != "Y":
+                break
 
-    # return limit login regardless of condition/limit-cap
-    return limit_login
+    return shown
 
 
-# Function that is used when user fails log in and counts the number of login attempts
+# Function that is used when user fails log in
 def try_again():
-    """Ask user if they want to try to login again after failed attempt. Currently the user has unlimited attempts to try again"""
+    """Ask user if they want to try to login again after failed attempt. Too many failed attempts are throttled by check_login"""
 
     # Prompt user to try again
     decision = input("Do you want to try again (Y / N)? ").strip().upper()
-    limit = change_limit_login()
 
     # If user says yes, try again
-    if decision == "Y" and limit == False:
+    if decision == "Y":
         return True
 
-    # If user says yes, but runs out of attempts, end the program
-    elif decision == "Y" and limit == True:
-        print("Ran out of attempts! Try again later")
-        return False
-
     # If user says no, end the program
     elif decision == "N":
         return False
@@ -2721,7 +2853,7 @@ def try_again():
     # If user inputs invalid input, try again
     else:
         print("Invalid input, please try again")
-        try_again()
+        return try_again()
 
 
 # HELPERS for printing the headers of each section
@@ -2755,14 +2887,14 @@ def web_opening():
 
 
 # Function that prompts user to use navigation links or head to login page
-def links_or_login():
+def links_or_login(username=None):
     """Prompts user to either use the navigation links or to login page"""
     links_prompt = input(
         "Do you want to navigate and explore InCollege while logged out (Y/N)? "
     )
 
     if links_prompt == "y" or links_prompt == "Y":
-        choose_navigation_link()
+        return choose_navigation_link()
 
 
 # Main Function/Driver helper, which decides the first steps of the program
@@ -2794,8 +2926,14 @@ def main():
     """Main function that controls the flow of the program"""
 
     web_opening()
-    links_or_login()
-    main_helper()
+    run_screens(links_or_login)
+
+    # main_helper ends by exiting the program, so the messages still waiting in
+    # the outbox are written on the way out
+    try:
+        main_helper()
+    finally:
+        flush_outbox()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,14 @@
+import sqlite3
+import sys
+from contextlib import contextmanager
 from unittest.mock import Mock, patch
 
+import database_helper
 from main import *
 
+# Hash passwords with a low cost so creating test users stays fast
+database_helper.PASSWORD_ITERATIONS = 1000
+
 # will connect to database, use these values for testing
 # username: testuser
 # password: ValidPass1!
@@ -497,6 +504,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -506,6 +514,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -515,6 +524,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -524,6 +534,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -533,6 +544,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -542,6 +554,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -551,6 +564,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -560,6 +574,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
     create_job(
         title="a",
@@ -569,6 +584,7 @@ def test_create_job_pass(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     monkeypatch.setattr("builtins.input", create_job_pass_input)
@@ -583,8 +599,9 @@ def test_create_job_pass(monkeypatch, capsys):
         "\nJob created: Thank You for posting. We hope you'll find great employees!\n"
         in captured.out
     )
-    assert delete_job("a") is True
-    assert delete_job("Software Engineer") is True
+    for job in get_job_board("testuser"):
+        if job[1] in ("a", "Software Engineer"):
+            assert delete_job(job[0]) is True
 
 
 "------------------ EPIC #3 ---------------------------------------------------"
@@ -2115,19 +2132,24 @@ def mock_signup_helper(prompt):
 # to ten job listings
 
 
+def newest_job_id():
+    # Mocks pick a job by its id, the job a test just created is the newest one
+    return str(get_job_board("testuser")[-1][0])
+
+
 def mock_job_delete_success(prompt):
     # Mock input for a user deleting a job posting
     if "Would you like to delete a job? y/n: " in prompt:
         return "y"
-    if "Please enter the job title you want to delete: " in prompt:
-        return "a"
+    if "Please enter the ID of the job you want to delete: " in prompt:
+        return newest_job_id()
     if "Do you want to go back (Y / N)? " in prompt:
         return "N"
 
 
 def test_job_delete_success(monkeypatch, capsys):
     # Creatjng a job listing for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2135,6 +2157,7 @@ def test_job_delete_success(monkeypatch, capsys):
         salary="e",
         first="Test",
         last="User",
+        owner="testuser",
     )
 
     # Mock user input for job_delete function
@@ -2148,7 +2171,7 @@ def test_job_delete_success(monkeypatch, capsys):
 
     # Assert that the job listing the user has chosen is deleted
     assert "Here are the jobs you posted that you can delete:\n" in captured.out
-    assert "1 - a" in captured.out
+    assert f"#{job_a} - a" in captured.out
     assert "Job deleted successfully!" in captured.out
 
 
@@ -2157,8 +2180,8 @@ def mock_job_delete_notification(prompt):
     if "Would you like to delete a job? y/n: " in prompt:
         return "y"
 
-    elif "Please enter the job title you want to delete: " in prompt:
-        return "a"
+    elif "Please enter the ID of the job you want to delete: " in prompt:
+        return newest_job_id()
 
     elif "Do you want to go back (Y / N)? " in prompt:
         return "n"
@@ -2191,10 +2214,11 @@ def test_job_delete_notification(monkeypatch, capsys):
     monkeypatch.setattr("builtins.input", mock_job_creation_V2)
 
     job_posting("test")
+    job_a = get_job_list_posted_by_user("test")[-1][0]
 
     create_application(
         username="testuser",
-        job_title="a",
+        job_id=job_a,
         graduation="b",
         start="c",
         description="d",
@@ -2218,7 +2242,7 @@ def test_job_delete_notification(monkeypatch, capsys):
     assert "A job you applied for, a, has been deleted" in captured.out
 
     delete_user("test")
-    delete_application(username="testuser", job_title="a")
+    delete_application(username="testuser", job_id=job_a)
 
 
 # Testing that the job_search function can now be called from the top level menu is tested
@@ -2282,7 +2306,7 @@ def mock_view_all_jobs(prompt):
 
 def test_view_all_jobs(monkeypatch, capsys):
     # Creatjng job listings and a test application for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2290,8 +2314,9 @@ def test_view_all_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
-    create_job(
+    job_b = create_job(
         title="b",
         description="b",
         employer="c",
@@ -2299,8 +2324,9 @@ def test_view_all_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
-    create_job(
+    job_c = create_job(
         title="c",
         description="b",
         employer="c",
@@ -2308,11 +2334,12 @@ def test_view_all_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     create_application(
         username="testuser",
-        job_title="c",
+        job_id=job_c,
         graduation="b",
         start="c",
         description="d",
@@ -2353,21 +2380,18 @@ def test_view_all_jobs(monkeypatch, capsys):
     assert "[Applied] c" in captured.out
 
     # Calling delete_job functions for test clean up
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
-    delete_job("b")
-    clean_saved_jobs_when_job_deleted("b")
-    delete_job("c")
-    clean_saved_jobs_when_job_deleted("c")
+    delete_job(job_a)
+    delete_job(job_b)
+    delete_job(job_c)
 
     delete_user("testuser")
-    delete_application("testuser", "c")
+    delete_application("testuser", job_c)
 
 
 def mock_job_information(prompt):
     # Mocks input for a user looking up the job they want to apply for and declining to apply
-    if "\nEnter the title of the job you want to apply for: " in prompt:
-        return "a"
+    if "\nEnter the ID of the job you want to apply for: " in prompt:
+        return newest_job_id()
     if "Confirm this job and send the application? y/n?: " in prompt:
         return "n"
     if "Do you want to go back (Y / N)? " in prompt:
@@ -2376,7 +2400,7 @@ def mock_job_information(prompt):
 
 def test_job_information(monkeypatch, capsys):
     # Creatjng job listing for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2384,6 +2408,7 @@ def test_job_information(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     # Mock user input for testing apply_for_job feature
@@ -2404,14 +2429,13 @@ def test_job_information(monkeypatch, capsys):
     assert "Salary: e" in captured.out
 
     # Calling delete_job functions for test clean up
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
+    delete_job(job_a)
 
 
 def mock_job_application_success(prompt):
     # Mocks input for a user looking up the job they want to apply for and applying for it
-    if "\nEnter the title of the job you want to apply for: " in prompt:
-        return "a"
+    if "\nEnter the ID of the job you want to apply for: " in prompt:
+        return newest_job_id()
     if "Confirm this job and send the application? y/n?: " in prompt:
         return "y"
     if "Please enter your predicted graduation date(mm/dd/yyyy): " in prompt:
@@ -2428,8 +2452,8 @@ def mock_job_application_success(prompt):
 
 def mock_job_application_fail(prompt):
     # Mocks input for a user looking up the job but failing to apply for the job
-    if "\nEnter the title of the job you want to apply for: " in prompt:
-        return "a"
+    if "\nEnter the ID of the job you want to apply for: " in prompt:
+        return newest_job_id()
     if "Confirm this job and send the application? y/n?: " in prompt:
         return "y"
     if "Choose one of ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']: " in prompt:
@@ -2442,7 +2466,7 @@ def test_job_application_success(monkeypatch, capsys):
     create_user("testuser", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
 
     # Creatjng job listing for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2450,6 +2474,7 @@ def test_job_application_success(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     # Mock user input for testing apply_for_job feature
@@ -2470,9 +2495,8 @@ def test_job_application_success(monkeypatch, capsys):
     )
 
     # Calling delete_job functions for test clean up
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
-    delete_application("testuser", "a")
+    delete_job(job_a)
+    delete_application("testuser", job_a)
     delete_user("testuser")
 
     print("Captured Output:", captured.out)
@@ -2482,7 +2506,7 @@ def test_job_application_fail_V1(monkeypatch, capsys):
     create_user("testuser", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
 
     # Creatjng job listing and application for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2490,11 +2514,12 @@ def test_job_application_fail_V1(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     create_application(
         username="testuser",
-        job_title="a",
+        job_id=job_a,
         graduation="b",
         start="c",
         description="d",
@@ -2515,15 +2540,19 @@ def test_job_application_fail_V1(monkeypatch, capsys):
     )
 
     # Calling delete_job functions for test clean up
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
-    delete_application("testuser", "a")
+    delete_job(job_a)
+    delete_application("testuser", job_a)
     delete_user("testuser")
 
 
 def test_job_application_fail_V2(monkeypatch, capsys):
-    # Creatjng job listing for the test
-    create_job(
+    monkeypatch.setattr("builtins.input", mock_signup_helper)
+
+    # Call the signup function
+    signup()
+
+    # Creatjng job listing posted by the new user for the test
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2531,13 +2560,9 @@ def test_job_application_fail_V2(monkeypatch, capsys):
         salary="e",
         first="Test",
         last="User",
+        owner="mockuser",
     )
 
-    monkeypatch.setattr("builtins.input", mock_signup_helper)
-
-    # Call the signup function
-    signup()
-
     # Mock user input for testing apply_for_job feature
     monkeypatch.setattr("builtins.input", mock_job_application_fail)
 
@@ -2551,10 +2576,9 @@ def test_job_application_fail_V2(monkeypatch, capsys):
     assert "\nYou can't hire yourself for a job you posted!" in captured.out
 
     # Calling delete_job functions for test clean up
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
+    delete_job(job_a)
     assert delete_user("mockuser") is True
-    delete_application("mockuser", "a")
+    delete_application("mockuser", job_a)
 
 
 def mock_display_applied_jobs(prompt):
@@ -2565,7 +2589,7 @@ def mock_display_applied_jobs(prompt):
 
 def test_display_applied_jobs(monkeypatch, capsys):
     # Creatjng job listings and a test application for the test
-    create_job(
+    job_a = create_job(
         title="a",
         description="b",
         employer="c",
@@ -2573,11 +2597,12 @@ def test_display_applied_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     create_application(
         username="testuser",
-        job_title="a",
+        job_id=job_a,
         graduation="b",
         start="c",
         description="d",
@@ -2598,15 +2623,14 @@ def test_display_applied_jobs(monkeypatch, capsys):
     assert "\nListing all jobs you've applied for:\n" in captured.out
     assert "[Applied] a" in captured.out
 
-    delete_job("a")
-    clean_saved_jobs_when_job_deleted("a")
-    delete_application("testuser", "a")
+    delete_job(job_a)
+    delete_application("testuser", job_a)
     delete_user("testuser")
 
 
 def test_display_not_applied_jobs(monkeypatch, capsys):
     # Creatjng job listings for the test
-    create_job(
+    job_e = create_job(
         title="e",
         description="b",
         employer="c",
@@ -2614,6 +2638,7 @@ def test_display_not_applied_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     # Mock user input for testing list_unapplied_jobs
@@ -2629,27 +2654,26 @@ def test_display_not_applied_jobs(monkeypatch, capsys):
     assert "\nListing all jobs you have NOT applied for:\n" in captured.out
     assert "[] e" in captured.out
 
-    delete_job("e")
-    clean_saved_jobs_when_job_deleted("e")
+    delete_job(job_e)
 
 
 def mock_save_unsave_jobs(prompt):
     # Mocks input for a user saving and unsaving jobs
     if "Would you like to save a job? y/n: " in prompt:
         return "y"
-    if "Please enter the job title you want to save: " in prompt:
-        return "f"
+    if "Please enter the ID of the job you want to save: " in prompt:
+        return newest_job_id()
     if "\nWould you like to unsave a job? y/n: " in prompt:
         return "y"
-    if "Please enter the job title you want to unsave: " in prompt:
-        return "f"
+    if "Please enter the ID of the job you want to unsave: " in prompt:
+        return newest_job_id()
     if "Do you want to go back (Y / N)? " in prompt:
         return "N"
 
 
 def test_save_unsave_jobs(monkeypatch, capsys):
     # Creatjng job listings for the test
-    create_job(
+    job_f = create_job(
         title="f",
         description="b",
         employer="c",
@@ -2657,6 +2681,7 @@ def test_save_unsave_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     # Mock user input for testing save_job
@@ -2669,17 +2694,26 @@ def test_save_unsave_jobs(monkeypatch, capsys):
     captured = capsys.readouterr()
 
     # Asserts that the system saves and unsaves jobs in the system
-    assert "1 - f" in captured.out
+    assert f"#{job_f} - f" in captured.out
     assert "Job saved successfully!" in captured.out
     assert "Job unsaved successfully!" in captured.out
 
-    delete_job("f")
-    clean_saved_jobs_when_job_deleted("f")
+    delete_job(job_f)
 
 
 def test_display_saved_jobs(monkeypatch, capsys):
     # Creatjng saved job  for the test
-    save_job_for_user(username="testuser", saved_job_title="g")
+    job_g = create_job(
+        title="g",
+        description="b",
+        employer="c",
+        location="d",
+        salary="e",
+        first="f",
+        last="g",
+        owner="jobposter",
+    )
+    save_job_for_user(username="testuser", job_id=job_g)
 
     # Mock user input for testing show_saved_jobs and job_select feature
     monkeypatch.setattr("builtins.input", mock_display_applied_jobs)
@@ -2692,15 +2726,14 @@ def test_display_saved_jobs(monkeypatch, capsys):
 
     # Asserts that the system displays all of the saved jobs in the system
     assert "Here are the jobs you saved for later:\n" in captured.out
-    assert "1 - g" in captured.out
+    assert f"#{job_g} - g" in captured.out
 
-    delete_job("g")
-    clean_saved_jobs_when_job_deleted("g")
+    delete_job(job_g)
 
 
 def test_display_unsaved_jobs(monkeypatch, capsys):
     # Creatjng job listings for the test
-    create_job(
+    job_h = create_job(
         title="h",
         description="b",
         employer="c",
@@ -2708,6 +2741,7 @@ def test_display_unsaved_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     # Mock user input for testing show_unsaved_jobs and job_select feature
@@ -2723,10 +2757,9 @@ def test_display_unsaved_jobs(monkeypatch, capsys):
 
     # Asserts that the system displays all of the unsaved jobs in the system
     assert "Here are the jobs you have not saved for later:\n" in captured.out
-    assert "1 - h" in captured.out
+    assert f"#{job_h} - h" in captured.out
 
-    delete_job("h")
-    clean_saved_jobs_when_job_deleted("h")
+    delete_job(job_h)
 
 
 def mock_display_applied_saved_jobs(prompt):
@@ -2737,7 +2770,7 @@ def mock_display_applied_saved_jobs(prompt):
 
 def test_display_applied_saved_jobs(monkeypatch, capsys):
     # Creatjng job listings, a test application, and saved job for the test
-    create_job(
+    job_i = create_job(
         title="i",
         description="b",
         employer="c",
@@ -2745,9 +2778,10 @@ def test_display_applied_saved_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
-    create_job(
+    job_j = create_job(
         title="j",
         description="b",
         employer="c",
@@ -2755,17 +2789,18 @@ def test_display_applied_saved_jobs(monkeypatch, capsys):
         salary="e",
         first="f",
         last="g",
+        owner="jobposter",
     )
 
     create_application(
         username="testuser",
-        job_title="i",
+        job_id=job_i,
         graduation="b",
         start="c",
         description="d",
     )
 
-    save_job_for_user(username="testuser", saved_job_title="j")
+    save_job_for_user(username="testuser", job_id=job_j)
 
     # Mock user input for testing logout
     monkeypatch.setattr("builtins.input", mock_display_applied_saved_jobs)
@@ -2798,12 +2833,10 @@ def test_display_applied_saved_jobs(monkeypatch, capsys):
     captured = capsys.readouterr()
 
     assert "Here are the jobs you saved for later:\n" in captured.out
-    assert "1 - j" in captured.out
+    assert f"#{job_j} - j" in captured.out
 
-    delete_job("i")
-    clean_saved_jobs_when_job_deleted("i")
-    delete_job("j")
-    clean_saved_jobs_when_job_deleted("j")
+    delete_job(job_i)
+    delete_job(job_j)
 
 
 "-----------------------------EPIC 7 Tests------------------------------------------"
@@ -2991,7 +3024,6 @@ def test_free_tier_messaging_with_friends(monkeypatch, capsys):
 def test_new_message_notification(monkeypatch, capsys):
     create_user("mockuser", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
     create_user("mockuser2", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
-    create_new_message("Hello!", "mockuser", "mockuser2")
     create_message("Hello!", "mockuser", "mockuser2")
 
     new_message_check("mockuser2")
@@ -3000,6 +3032,10 @@ def test_new_message_notification(monkeypatch, capsys):
     captured = capsys.readouterr()
     assert "You have messages waiting for you!\n" in captured.out
 
+    # The check marks the messages as read
+    new_message_check("mockuser2")
+    assert "You have messages waiting for you!\n" not in capsys.readouterr().out
+
     assert delete_user("mockuser") is True
     assert delete_user("mockuser2") is True
     assert remove_message("mockuser", "mockuser2", "Hello!") is True
@@ -3019,7 +3055,7 @@ def test_empty_inbox(monkeypatch, capsys):
 
 
 def mock_test_non_empty_inbox(prompt):
-    if "\nChoose one of ['a', 'b', 'c']:" in prompt:
+    if "\nChoose one of ['a', 'b', 'c', 'd']:" in prompt:
         return "c"
     elif "Do you want to go back (Y / N)? " in prompt:
         return "Y"
@@ -3039,6 +3075,7 @@ def test_non_empty_inbox(monkeypatch, capsys):
     captured = capsys.readouterr()
     assert "You have messages: \n" in captured.out
     assert "From mockuser: Hello!\n" in captured.out
+    assert f"#{get_message('mockuser2')[0][3]} (" in captured.out
     assert "\nWhat would you like to do with these messages?" in captured.out
     assert "a. Reply" in captured.out
     assert "b. Delete" in captured.out
@@ -3050,8 +3087,8 @@ def test_non_empty_inbox(monkeypatch, capsys):
 
 
 def mock_test_reply_message_standard(prompt):
-    if "\nPlease enter the name of the user you wish to reply to: " in prompt:
-        return "mockuser"
+    if "\nPlease enter the ID of the message you wish to reply to: " in prompt:
+        return str(get_message("mockuser2")[-1][3])
     if "\nPlease enter your reply: " in prompt:
         return "Hello! How are you?"
     if "\nAre you sure you want to send this message to mockuser? (y/n): " in prompt:
@@ -3063,8 +3100,8 @@ def mock_test_reply_message_standard(prompt):
 
 
 def mock_test_reply_message_plus(prompt):
-    if "\nPlease enter the name of the user you wish to reply to: " in prompt:
-        return "mockuser2"
+    if "\nPlease enter the ID of the message you wish to reply to: " in prompt:
+        return str(get_message("mockuser")[-1][3])
     if "\nPlease enter your reply: " in prompt:
         return "Hello! How are you?"
     if "\nAre you sure you want to send this message to mockuser2? (y/n): " in prompt:
@@ -3117,7 +3154,7 @@ def mock_test_plus_messenger(prompt):
         in prompt
     ):
         return "y"
-    if "Please enter the username of who you wish to send a message to: " in prompt:
+    if "Please enter the usernames of who you wish to send a message to" in prompt:
         return "mockuser2"
     if "Enter your message: " in prompt:
         return "Hello! How are you?"
@@ -3146,6 +3183,7 @@ def test_plus_messenger(monkeypatch, capsys):
     assert "mockuser3" in captured.out
     assert "\nMessage sent!\n" in captured.out
 
+    flush_outbox()
     assert delete_user("mockuser") is True
     assert delete_user("mockuser2") is True
     assert delete_user("mockuser3") is True
@@ -3338,7 +3376,6 @@ def test_no_profile_notification(monkeypatch, capsys):
 def test_message_notification(monkeypatch, capsys):
     create_user("mockuser", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
     create_user("mockuser2", "ValidPass1!", "Mock", "User", "USF", "CS", 0, 0)
-    create_new_message("Hello!", "mockuser", "mockuser2")
     create_message("Hello!", "mockuser", "mockuser2")
 
     # Use monkeypatch to constantly log out the user
@@ -3381,10 +3418,11 @@ def test_num_applications_notification(monkeypatch, capsys):
     monkeypatch.setattr("builtins.input", mock_job_creation_V2)
 
     job_posting("test")
+    job_id = get_job_list_posted_by_user("test")[-1][0]
 
     create_application(
         username="testuser5",
-        job_title="a",
+        job_id=job_id,
         graduation="b",
         start="c",
         description="d",
@@ -3393,8 +3431,8 @@ def test_num_applications_notification(monkeypatch, capsys):
     # Mock user input for create_job function
     monkeypatch.setattr("builtins.input", mock_quit_from_jobs_input_V1)
 
-    # Capture the output after setting up the scenario and searching for jobs
-    captured_before_search = capsys.readouterr()
+    # Discard the output of setting up the scenario
+    capsys.readouterr()
     job_search("testuser5")
 
     # Capture the output after searching for jobs
@@ -3404,8 +3442,8 @@ def test_num_applications_notification(monkeypatch, capsys):
 
     delete_user("test")
     delete_user("testuser5")
-    delete_application("testuser5", "a")
-    delete_job("a")
+    delete_application("testuser5", job_id)
+    delete_job(job_id)
 
 
 def test_notify_new_job(monkeypatch, capsys):
@@ -3416,7 +3454,7 @@ def test_notify_new_job(monkeypatch, capsys):
     create_user("job_poster", "ValidPass1!", "Job", "Poster", "USF", "CS", 0, 0)
 
     # post a job
-    create_job(
+    job_id = create_job(
         title="test job",
         description="test job description",
         employer="test employer",
@@ -3424,6 +3462,7 @@ def test_notify_new_job(monkeypatch, capsys):
         salary="test salary",
         first="Job",
         last="Poster",
+        owner="job_poster",
     )
     notify_new_job("job_poster", "test job")
     notifications_on_login("job_applicant")
@@ -3436,7 +3475,7 @@ def test_notify_new_job(monkeypatch, capsys):
     # clean up
     assert delete_user("job_applicant") is True
     assert delete_user("job_poster") is True
-    delete_job("test job") is True
+    delete_job(job_id) is True
 
 
 def test_notify_deleted_applied_job(monkeypatch, capsys):
@@ -3447,7 +3486,7 @@ def test_notify_deleted_applied_job(monkeypatch, capsys):
     create_user("job_poster", "ValidPass1!", "Job", "Poster", "USF", "CS", 0, 0)
 
     # post a job
-    create_job(
+    job_id = create_job(
         title="test job",
         description="test job description",
         employer="test employer",
@@ -3455,19 +3494,20 @@ def test_notify_deleted_applied_job(monkeypatch, capsys):
         salary="test salary",
         first="Job",
         last="Poster",
+        owner="job_poster",
     )
 
     # create an application
     create_application(
         username="job_applicant",
-        job_title="test job",
+        job_id=job_id,
         graduation="May 2024",
         start="August 2024",
         description="overqualified",
     )
 
-    delete_job("test job")
-    notify_deleted_applied_job("job_poster", "test job")
+    # Applicants are notified in the same transaction that deletes the job
+    retire_job(job_id, deleted_job_message("test job"))
     notifications_on_login("job_applicant")
 
     # Capture the printed output
@@ -3478,7 +3518,7 @@ def test_notify_deleted_applied_job(monkeypatch, capsys):
     # clean up
     assert delete_user("job_applicant") is True
     assert delete_user("job_poster") is True
-    assert delete_application("job_applicant", "test job") is True
+    assert delete_application("job_applicant", job_id) is True
 
 
 def test_notify_new_user(monkeypatch, capsys):
@@ -3500,3 +3540,1688 @@ def test_notify_new_user(monkeypatch, capsys):
     # clean up
     assert delete_user("user1") is True
     assert delete_user("user2") is True
+
+
+########### Database Schema ###################################################
+
+# The version 0 schema that an old account.db was created with
+LEGACY_SCHEMA = {
+    "accounts": "user text, pass text, first text, last text, university text, major text, tier int, days int",
+    "jobs": "title text, description text, employer text, location text, salary text, first text, last text",
+    "job_applications": "title text, user text, graduation text, start text, description text",
+    "jobs_saved": "title text, user text",
+    "friends": "user text, friend_user text",
+    "friends_list": "user text, friend_user text",
+    "profile": "user text, university text, major text, title text, about text",
+    "experience": "user text, experienceId text, title text, employer text, date_started text, date_ended text, location text, description text",
+    "education": "user text, school_name text, degree text, years_attended text",
+    "message": "message text, sender text, receiver text",
+    "message_notification": "message text, sender text, receiver text",
+    "notification": "message text, sender text, receiver text",
+}
+
+
+def create_legacy_database(path):
+    """Create a database file with the version 0 schema and a few rows in it"""
+    legacy = sqlite3.connect(path)
+    for table, columns in LEGACY_SCHEMA.items():
+        legacy.execute(f"CREATE TABLE {table} ({columns})")
+    for _ in range(2):
+        legacy.execute(
+            "INSERT INTO accounts VALUES ('olduser', 'ValidPass1!', 'Old', 'User', 'USF', 'CS', 0, 0)"
+        )
+    legacy.execute("INSERT INTO message VALUES ('Hello!', 'olduser', 'olduser')")
+    legacy.commit()
+    return legacy
+
+
+def test_database_is_at_latest_schema_version():
+    with pool.connection() as connection:
+        assert get_schema_version(connection) == SCHEMA_VERSION
+
+
+def test_migrate_legacy_database(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+
+    # The upgrade happens in place and keeps the existing rows
+    assert migrate(legacy) == SCHEMA_VERSION
+    assert legacy.execute("SELECT COUNT(*) FROM message").fetchone()[0] == 1
+
+    # Duplicate usernames collapse into one account
+    assert legacy.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] == 1
+
+    # Running the migrations again is a no-op
+    assert migrate(legacy) == SCHEMA_VERSION
+    legacy.close()
+
+
+def test_duplicate_username_rejected():
+    assert create_user("uniqueuser", "ValidPass1!", "U", "U", "USF", "CS", 0, 0)
+    assert not create_user("uniqueuser", "ValidPass1!", "U", "U", "USF", "CS", 0, 0)
+    assert delete_user("uniqueuser") is True
+
+
+def test_lookups_use_indexes():
+    queries = [
+        "SELECT 1 FROM accounts WHERE user = 'a' AND pass = 'b'",
+        "SELECT 1 FROM accounts WHERE first = 'a' AND last = 'b'",
+        "SELECT user_a FROM friendship WHERE user_b = 'a'",
+        "SELECT sender FROM friend_request WHERE receiver = 'a'",
+        "SELECT message FROM message WHERE receiver = 'a'",
+        "SELECT message FROM message WHERE receiver = 'a' ORDER BY created_at",
+        "SELECT message FROM notification WHERE receiver = 'a'",
+        "SELECT title FROM jobs WHERE title = 'a'",
+        "SELECT title FROM jobs WHERE owner_id = 1 ORDER BY id",
+    ]
+    with get_cursor() as c:
+        for query in queries:
+            plan = str(c.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
+            assert "USING" in plan and "INDEX" in plan, query
+
+
+########### Connection Pool ###################################################
+
+
+def test_connections_use_wal_mode():
+    with get_cursor() as c:
+        assert c.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_each_thread_gets_its_own_connection():
+    import threading
+
+    seen = []
+
+    def borrow():
+        with pool.connection() as connection:
+            seen.append(connection)
+
+    with pool.connection() as connection:
+        # The same thread keeps getting the same connection
+        with pool.connection() as nested:
+            assert nested is connection
+
+        # Another thread gets a different one while this thread holds it
+        worker = threading.Thread(target=borrow)
+        worker.start()
+        worker.join()
+
+    assert seen[0] is not connection
+
+
+def test_nested_cursors_share_one_transaction():
+    try:
+        with get_cursor() as c:
+            c.execute(
+                "INSERT INTO notification (message, sender, receiver) VALUES ('x', 'System', 'pooluser')"
+            )
+            with get_cursor() as nested:
+                nested.execute(
+                    "INSERT INTO notification (message, sender, receiver) VALUES ('y', 'System', 'pooluser')"
+                )
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+
+    # The inner block did not commit on its own, so both inserts were rolled back
+    assert get_notification("pooluser") == []
+
+
+def test_configure_database_path(tmp_path):
+    try:
+        assert configure_database(tmp_path / "other.db") == SCHEMA_VERSION
+        assert create_user("pathuser", "ValidPass1!", "P", "U", "USF", "CS", 0, 0)
+        assert (tmp_path / "other.db").exists()
+    finally:
+        configure_database()
+
+    assert get_user("pathuser") is None
+
+
+########### Notification Fan-out ##############################################
+
+
+def count_rows(table):
+    with get_cursor() as c:
+        return c.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_broadcast_is_stored_once(monkeypatch, capsys):
+    create_user("reader1", "ValidPass1!", "Reader", "One", "USF", "CS", 0, 0)
+    create_user("reader2", "ValidPass1!", "Reader", "Two", "USF", "CS", 0, 0)
+    notifications_before = count_rows("notification")
+    broadcasts_before = count_rows("broadcast")
+
+    notify_new_job("reader1", "broadcast job")
+
+    # One row for the event, none per user
+    assert count_rows("broadcast") == broadcasts_before + 1
+    assert count_rows("notification") == notifications_before
+
+    # Both users see it once at login
+    for username in ["reader1", "reader2"]:
+        new_notification(username)
+        captured = capsys.readouterr()
+        assert "A new job for broadcast job has been posted" in captured.out
+        assert get_notification(username) == []
+
+    assert delete_user("reader1") is True
+    assert delete_user("reader2") is True
+
+
+def test_new_user_skips_older_broadcasts():
+    create_broadcast("Sent before you joined", "System")
+    create_user("latecomer", "ValidPass1!", "Late", "Comer", "USF", "CS", 0, 0)
+
+    assert get_notification("latecomer") == []
+
+    assert delete_user("latecomer") is True
+
+
+########### Profile Cache #####################################################
+
+
+def test_get_profile_is_cached_and_invalidated():
+    create_profile("cacheuser", "USF", "CS", "Student", "About")
+    create_education("cacheuser", "USF", "BS", "4")
+    create_experience(
+        "cacheuser", 0, "Intern", "Boeing", "2020", "2021", "Tampa", "Blog"
+    )
+
+    profile = get_profile("cacheuser")
+    assert profile["title"] == "Student"
+    assert profile["degree"] == "BS"
+    assert [job["title"] for job in profile["experience"]] == ["Intern"]
+
+    # A second read comes from the cache without touching the database
+    with patch("database_helper.load_profile") as load:
+        assert get_profile("cacheuser") == profile
+        load.assert_not_called()
+
+    # Changing the profile drops the cached copy
+    update_profile("cacheuser", "USF", "CS", "Graduate", "About")
+    assert get_profile("cacheuser")["title"] == "Graduate"
+    update_experience("cacheuser", 0, "Engineer", "Boeing", "2020", "", "Tampa", "")
+    assert get_profile("cacheuser")["experience"][0]["title"] == "Engineer"
+
+    delete_profile("cacheuser")
+    delete_education("cacheuser")
+    delete_experience("cacheuser")
+    assert get_profile("cacheuser") is None
+
+
+def test_profile_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr("database_helper.PROFILE_CACHE_SIZE", 2)
+    for username in ["bounded1", "bounded2", "bounded3"]:
+        get_profile(username)
+
+    assert "bounded1" not in profile_cache
+    assert len(profile_cache) <= 2
+
+
+def test_profile_changed_during_a_read_is_not_cached(monkeypatch):
+    create_profile("racer", "USF", "CS", "Student", "About")
+    load_profile = database_helper.load_profile
+
+    # The profile is updated after the read loaded it but before it was cached
+    def load_then_update(username):
+        profile = load_profile(username)
+        update_profile(username, "USF", "CS", "Graduate", "About")
+        return profile
+
+    monkeypatch.setattr("database_helper.load_profile", load_then_update)
+    assert get_profile("racer")["title"] == "Student"
+    monkeypatch.setattr("database_helper.load_profile", load_profile)
+
+    assert "racer" not in profile_cache
+    assert get_profile("racer")["title"] == "Graduate"
+
+    # Writers only drop the cached copy once their transaction commits
+    with database_helper.get_cursor():
+        update_profile("racer", "USF", "CS", "Alumni", "About")
+        assert "racer" in profile_cache
+    assert "racer" not in profile_cache
+    assert get_profile("racer")["title"] == "Alumni"
+
+    delete_profile("racer")
+
+
+def test_profiles_exist():
+    create_profile("haspro", "USF", "CS", "Student", "About")
+    create_education("hasedu", "USF", "BS", "4")
+
+    assert profiles_exist(["haspro", "hasedu", "nopro"]) == {"haspro", "hasedu"}
+    assert profiles_exist([]) == set()
+
+    delete_profile("haspro")
+    delete_education("hasedu")
+
+
+def test_display_friend_profile_marks_profiles(monkeypatch, capsys):
+    create_user("lister", "ValidPass1!", "List", "Er", "USF", "CS", 0, 0)
+    add_to_friend_list("lister", "withprofile")
+    add_to_friend_list("lister", "withoutprofile")
+    create_profile("withprofile", "USF", "CS", "Student", "About")
+
+    get_profile_mock = Mock()
+    monkeypatch.setattr("main.get_profile", get_profile_mock)
+    input_values = ["n", "n"]
+    monkeypatch.setattr("builtins.input", lambda x: input_values.pop(0))
+    display_friend_profile("lister")
+
+    captured = capsys.readouterr()
+    assert "withprofile - PROFILE" in captured.out
+    assert "withoutprofile - PROFILE" not in captured.out
+    assert "withoutprofile" in captured.out
+
+    # Presence comes from the batched lookup, not one get_profile per friend
+    get_profile_mock.assert_not_called()
+
+    delete_friend_from_list("lister", "withprofile")
+    delete_friend_from_list("lister", "withoutprofile")
+    delete_profile("withprofile")
+    assert delete_user("lister") is True
+
+
+########### Job Listings ######################################################
+
+
+def test_saved_and_unsaved_jobs():
+    jobs = {
+        title: create_job(title, "b", "c", "d", "e", "f", "g", "jobposter")
+        for title in ["saved job", "other job"]
+    }
+    save_job_for_user("jobsaver", jobs["saved job"])
+
+    assert get_saved_jobs("jobsaver") == [(jobs["saved job"], "saved job")]
+    unsaved = get_unsaved_jobs("jobsaver")
+    assert (jobs["other job"], "other job") in unsaved
+    assert (jobs["saved job"], "saved job") not in unsaved
+
+    delete_saved_job("jobsaver", jobs["saved job"])
+    for job_id in jobs.values():
+        delete_job(job_id)
+
+
+def test_saved_jobs_keep_save_order():
+    jobs = {
+        title: create_job(title, "b", "c", "d", "e", "f", "g", "jobposter")
+        for title in ["save order b", "save order a"]
+    }
+    save_job_for_user("ordersaver", jobs["save order a"])
+    save_job_for_user("ordersaver", jobs["save order b"])
+
+    assert get_saved_jobs("ordersaver") == [
+        (jobs["save order a"], "save order a"),
+        (jobs["save order b"], "save order b"),
+    ]
+
+    for job_id in jobs.values():
+        delete_job(job_id)
+
+
+def test_job_board_flags(capsys):
+    jobs = {
+        title: create_job(title, "b", "c", "d", "e", "f", "g", "jobposter")
+        for title in ["board applied", "board saved", "board plain"]
+    }
+    create_application("boarduser", jobs["board applied"], "b", "c", "d")
+    save_job_for_user("boarduser", jobs["board saved"])
+
+    board = {job[0]: job[1:] for job in get_job_board("boarduser")}
+    assert board[jobs["board applied"]] == ("board applied", True, False)
+    assert board[jobs["board saved"]] == ("board saved", False, True)
+    assert board[jobs["board plain"]] == ("board plain", False, False)
+
+    print_job_board(
+        [job for job in get_job_board("boarduser") if job[0] in jobs.values()]
+    )
+    captured = capsys.readouterr()
+    assert f"#{jobs['board applied']} [Applied] board applied\n" in captured.out
+    assert f"#{jobs['board saved']} [] board saved [Saved]\n" in captured.out
+    assert f"#{jobs['board plain']} [] board plain\n" in captured.out
+
+    delete_application("boarduser", jobs["board applied"])
+    delete_saved_job("boarduser", jobs["board saved"])
+    for job_id in jobs.values():
+        delete_job(job_id)
+
+
+########### Pagination ########################################################
+
+
+def test_iter_job_board_matches_get_job_board():
+    jobs = {
+        title: create_job(title, "b", "c", "d", "e", "f", "g", "jobposter")
+        for title in ["paged one", "paged two", "paged three"]
+    }
+    create_application("pageuser", jobs["paged two"], "b", "c", "d")
+
+    assert list(iter_job_board("pageuser", page_size=2)) == get_job_board("pageuser")
+
+    delete_application("pageuser", jobs["paged two"])
+    for job_id in jobs.values():
+        delete_job(job_id)
+
+
+def test_print_paged_asks_before_next_page(monkeypatch, capsys):
+    monkeypatch.setattr("main.PAGE_SIZE", 2)
+    prompts = []
+
+    def answer(prompt):
+        prompts.append(prompt)
+        return "n"
+
+    monkeypatch.setattr("builtins.input", answer)
+    shown = print_paged(iter(range(5)), print, "Numbers:")
+
+    # The first page is shown, then the user declines the second
+    assert shown == 2
+    assert capsys.readouterr().out == "Numbers:\n0\n1\n"
+    assert len(prompts) == 1
+
+
+def test_print_paged_single_page(monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", Mock())
+
+    assert print_paged([], print, "Numbers:") == 0
+    assert print_paged(["a"], print, "Numbers:") == 1
+    assert capsys.readouterr().out == "Numbers:\na\n"
+
+
+########### Menu Dispatcher ###################################################
+
+
+def test_long_session_keeps_stack_flat(monkeypatch, capsys):
+    create_user("looper", "ValidPass1!", "Loop", "Er", "USF", "CS", 0, 0)
+
+    # Go to learn a skill and back to the menu more times than the recursion limit
+    visits = sys.getrecursionlimit() + 100
+    menu_choices = ["c"] * visits + ["i"]
+
+    def session_input(prompt):
+        if "Choose one of ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']: " in prompt:
+            return menu_choices.pop(0)
+        if "Enter integers from 1 to 6: " in prompt:
+            return "6"
+        if "Do you want to go back (Y / N)? " in prompt:
+            return "Y"
+        if "Do you want to log out (Y / N)? " in prompt:
+            return "Y"
+
+    monkeypatch.setattr("builtins.input", session_input)
+    choose_features("looper")
+
+    captured = capsys.readouterr()
+    assert menu_choices == []
+    assert captured.out.count("Not picking to learn a new skill?") == visits
+
+    # Notifications are shown once per session, not on every return to the menu
+    assert captured.out.count("NOTIFICATIONS") == 1
+
+    assert delete_user("looper") is True
+
+
+def test_screens_return_next_screen(monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda x: "Y")
+
+    assert single_skill("testuser", 1) is learn_skill
+    assert copyright_notice() is choose_incollege_important_links
+    assert logout("testuser") == 0
+
+
+########### Message IDs #######################################################
+
+
+def test_messages_have_ids_and_timestamps():
+    first = create_message("Same text", "idsender", "idreader")
+    second = create_message("Same text", "idsender", "idreader")
+    assert second > first
+
+    message = get_message_by_id("idreader", first)
+    assert message[:4] == ("Same text", "idsender", "idreader", first)
+    assert message[4] <= get_message_by_id("idreader", second)[4]
+
+    # A message can only be read by the user it was sent to
+    assert get_message_by_id("idsender", first) is None
+
+    # Deleting by id removes only that message, even with identical text
+    assert remove_message_by_id("idsender", first) is False
+    assert remove_message_by_id("idreader", first) is True
+    assert remove_message_by_id("idreader", first) is False
+    assert [row[3] for row in get_message("idreader")] == [second]
+
+    assert remove_message_by_id("idreader", second) is True
+
+
+def mock_delete_message_input(prompt):
+    if "\nPlease enter the ID of the message you wish to delete: " in prompt:
+        return str(get_message("deletereader")[0][3])
+    if (
+        "\nAre you sure you want to delete this message from deletesender? (y/n): "
+        in prompt
+    ):
+        return "y"
+
+
+def test_delete_message_by_id(monkeypatch, capsys):
+    create_message("Delete me", "deletesender", "deletereader")
+    create_message("Delete me", "deletesender", "deletereader")
+
+    monkeypatch.setattr("builtins.input", mock_delete_message_input)
+    assert delete_message("deletereader") is main_menu
+
+    captured = capsys.readouterr()
+    assert "\nMessage deleted!\n" in captured.out
+
+    # Only the chosen copy of the message is gone
+    remaining = get_message("deletereader")
+    assert len(remaining) == 1
+    assert remove_message_by_id("deletereader", remaining[0][3]) is True
+
+
+########### Unread Counters ###################################################
+
+
+def test_unread_counter_read_and_reset():
+    create_user("unreaduser", "ValidPass1!", "Un", "Read", "USF", "CS", 0, 0)
+    assert read_unread_messages("unreaduser") == 0
+
+    ids = [
+        create_message(f"unread {n}", "unreadsender", "unreaduser") for n in range(3)
+    ]
+    assert read_unread_messages("unreaduser") == 3
+    assert read_unread_messages("unreaduser") == 0
+
+    # Unknown users have nothing unread
+    assert read_unread_messages("nosuchunreaduser") == 0
+
+    for message_id in ids:
+        remove_message_by_id("unreaduser", message_id)
+    assert delete_user("unreaduser") is True
+
+
+def test_deleting_unread_message_updates_counter():
+    create_user("unreaduser", "ValidPass1!", "Un", "Read", "USF", "CS", 0, 0)
+    read_id = create_message("read", "unreadsender", "unreaduser")
+    assert read_unread_messages("unreaduser") == 1
+
+    unread_ids = [
+        create_message(f"unread {n}", "unreadsender", "unreaduser") for n in range(2)
+    ]
+    # Deleting a message they were already told about leaves the counter alone
+    assert remove_message_by_id("unreaduser", read_id) is True
+    # Deleting one they were never told about takes it off the counter
+    assert remove_message("unreaduser", "unreadsender", "unread 0") is True
+    assert read_unread_messages("unreaduser") == 1
+
+    remove_message_by_id("unreaduser", unread_ids[1])
+    assert delete_user("unreaduser") is True
+
+
+def test_message_ids_are_never_reused():
+    create_user("reuseuser", "ValidPass1!", "Re", "Use", "USF", "CS", 0, 0)
+    first = create_message("first", "reusesender", "reuseuser")
+    second = create_message("second", "reusesender", "reuseuser")
+    assert read_unread_messages("reuseuser") == 2
+
+    # A message sent after the newest one was deleted gets a new id
+    assert remove_message_by_id("reuseuser", second) is True
+    third = create_message("third", "reusesender", "reuseuser")
+    assert third > second
+
+    # so deleting it before it was read takes it off the counter
+    assert remove_message_by_id("reuseuser", third) is True
+    assert read_unread_messages("reuseuser") == 0
+
+    remove_message_by_id("reuseuser", first)
+    assert delete_user("reuseuser") is True
+
+
+def test_migrate_legacy_unread_messages(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+    legacy.executemany(
+        "INSERT INTO message VALUES (?, 'olduser', 'olduser')",
+        [("Old news",), ("New one",), ("New two",)],
+    )
+    legacy.executemany(
+        "INSERT INTO message_notification VALUES (?, 'olduser', 'olduser')",
+        [("New one",), ("New two",)],
+    )
+    legacy.commit()
+
+    migrate(legacy)
+    last_read = legacy.execute("SELECT last_read_message FROM accounts").fetchone()[0]
+    unread = legacy.execute(
+        "SELECT message FROM message WHERE id > ? ORDER BY id", (last_read,)
+    )
+    assert unread.fetchall() == [("New one",), ("New two",)]
+    legacy.close()
+
+
+def test_message_notification_table_dropped():
+    with get_cursor() as c:
+        c.execute("SELECT 1 FROM sqlite_master WHERE name = 'message_notification'")
+        assert c.fetchone() is None
+
+
+########### Notification Drain ################################################
+
+
+def test_drain_notifications():
+    create_user("drainer", "ValidPass1!", "Drain", "Er", "USF", "CS", 0, 0)
+    create_notification("first own", "System", "drainer")
+    create_broadcast("drain broadcast", "System")
+    create_notification("second own", "System", "drainer")
+
+    drained = drain_notifications("drainer")
+    assert [row[0] for row in drained] == [
+        "first own",
+        "second own",
+        "drain broadcast",
+    ]
+    assert drained[0] == ("first own", "System", "drainer", None)
+    assert drained[2][3] is not None
+
+    # Nothing is left for the next login
+    assert get_notification("drainer") == []
+    assert drain_notifications("drainer") == []
+
+    assert delete_user("drainer") is True
+
+
+def test_drain_notifications_rolls_back_on_error(monkeypatch):
+    create_user("halfdrained", "ValidPass1!", "Half", "Drained", "USF", "CS", 0, 0)
+    create_notification("kept", "System", "halfdrained")
+
+    # Fail after the delete, inside the same transaction
+    real_get_cursor = database_helper.get_cursor
+
+    @contextmanager
+    def failing_cursor():
+        with real_get_cursor() as c:
+            yield c
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr("database_helper.get_cursor", failing_cursor)
+    assert drain_notifications("halfdrained") == []
+    monkeypatch.undo()
+
+    assert get_notification("halfdrained") == [("kept", "System", "halfdrained", None)]
+    assert drain_notifications("halfdrained")[0][0] == "kept"
+    assert delete_user("halfdrained") is True
+
+
+########### Login Summary #####################################################
+
+
+def test_login_summary():
+    create_user("summaryuser", "ValidPass1!", "Sum", "Mary", "USF", "CS", 0, 8)
+    message_id = create_message("Hi there", "summarysender", "summaryuser")
+    create_notification("Summary note", "System", "summaryuser")
+
+    summary = get_login_summary("summaryuser")
+    assert summary["days"] == 8
+    assert summary["has_profile"] is False
+    assert summary["unread_messages"] == 1
+    assert ("Summary note", "System", "summaryuser", None) in summary["notifications"]
+
+    # Reading the summary marks the messages and notifications as read
+    again = get_login_summary("summaryuser")
+    assert again["unread_messages"] == 0
+    assert again["notifications"] == []
+
+    create_education("summaryuser", "USF", "BS", "4")
+    assert get_login_summary("summaryuser")["has_profile"] is True
+
+    delete_education("summaryuser")
+    remove_message_by_id("summaryuser", message_id)
+    assert delete_user("summaryuser") is True
+
+
+def test_unread_messages_are_read_under_the_write_lock(monkeypatch):
+    create_user("lockreader", "ValidPass1!", "Lock", "Reader", "USF", "CS", 0, 0)
+    create_message("one", "locksender", "lockreader")
+    other = sqlite3.connect(database_helper.pool.path, timeout=0)
+    blocked = []
+    mark_messages_read = database_helper.mark_messages_read
+
+    def send_meanwhile(cursor, username, unread):
+        # Another connection sends a message between the count and the update
+        try:
+            other.execute(
+                "INSERT INTO message (message, sender, receiver) VALUES ('late', 'locksender', 'lockreader')"
+            )
+            other.commit()
+        except sqlite3.OperationalError:
+            blocked.append(username)
+        mark_messages_read(cursor, username, unread)
+
+    monkeypatch.setattr("database_helper.mark_messages_read", send_meanwhile)
+    assert read_unread_messages("lockreader") == 1
+    create_message("two", "locksender", "lockreader")
+    assert get_login_summary("lockreader")["unread_messages"] == 1
+    assert blocked == ["lockreader", "lockreader"]
+    other.close()
+
+    for message in get_message("lockreader"):
+        remove_message_by_id("lockreader", message[3])
+    assert delete_user("lockreader") is True
+
+
+def test_notifications_on_login_reads_summary_once(monkeypatch, capsys):
+    create_user("summarylogin", "ValidPass1!", "Sum", "Login", "USF", "CS", 0, 0)
+    create_message("Hello!", "summarysender", "summarylogin")
+
+    get_days_mock = Mock()
+    get_profile_mock = Mock()
+    monkeypatch.setattr("main.get_days", get_days_mock)
+    monkeypatch.setattr("main.get_profile", get_profile_mock)
+    notifications_on_login("summarylogin")
+
+    captured = capsys.readouterr()
+    assert "Don't forget to create a profile!" in captured.out
+    assert "You have messages waiting for you!\n" in captured.out
+    get_days_mock.assert_not_called()
+    get_profile_mock.assert_not_called()
+
+    remove_message_by_id("summarylogin", get_message("summarylogin")[0][3])
+    assert delete_user("summarylogin") is True
+
+
+########### Conversations #####################################################
+
+
+def conversation_row(user, counterpart):
+    with get_cursor() as c:
+        c.execute(
+            "SELECT last_message_id, message_count FROM conversation WHERE user = ? AND counterpart = ?",
+            (user, counterpart),
+        )
+        return c.fetchone()
+
+
+def test_conversation_metadata_follows_messages():
+    first = create_message("Hi", "threadone", "threadtwo")
+    reply = create_message("Hi back", "threadtwo", "threadone")
+
+    # Both sides see the same conversation
+    assert conversation_row("threadone", "threadtwo") == (reply, 2)
+    assert conversation_row("threadtwo", "threadone") == (reply, 2)
+
+    # Deleting the latest message makes the one before it the latest
+    assert remove_message_by_id("threadone", reply) is True
+    assert conversation_row("threadone", "threadtwo") == (first, 1)
+
+    # The conversation goes away with its last message
+    assert remove_message_by_id("threadtwo", first) is True
+    assert conversation_row("threadone", "threadtwo") is None
+    assert conversation_row("threadtwo", "threadone") is None
+
+
+def test_thread_messages_window():
+    ids = [
+        create_message(f"window {n}", "windowfriend", "windowuser") for n in range(4)
+    ]
+    ids.append(create_message("my reply", "windowuser", "windowfriend"))
+    other = create_message("other thread", "windowother", "windowuser")
+
+    threads = get_thread_messages("windowuser", ["windowfriend", "windowother"], 3)
+    assert [row[0] for row in threads["windowfriend"]] == [
+        "window 2",
+        "window 3",
+        "my reply",
+    ]
+    assert [row[3] for row in threads["windowother"]] == [other]
+
+    # Most recently active conversation first, one conversation per page
+    threads = list(iter_threads("windowuser", per_thread=2, page_size=1))
+    assert [thread[0] for thread in threads] == ["windowother", "windowfriend"]
+    assert threads[1][2] == 5
+    assert len(threads[1][3]) == 2
+
+    for message_id in ids[:4] + [other]:
+        remove_message_by_id("windowuser", message_id)
+    remove_message_by_id("windowfriend", ids[4])
+    assert list(iter_threads("windowuser")) == []
+
+
+def mock_thread_inbox_input(prompt):
+    if "\nChoose one of ['a', 'b', 'c', 'd']:" in prompt:
+        return "c"
+    if "Do you want to go back (Y / N)? " in prompt:
+        return "Y"
+
+
+def test_inbox_groups_conversations(monkeypatch, capsys):
+    first = create_message("Thread hello", "inboxfriend", "inboxuser")
+    second = create_message("Thread again", "inboxfriend", "inboxuser")
+
+    monkeypatch.setattr("builtins.input", mock_thread_inbox_input)
+    inbox("inboxuser")
+
+    captured = capsys.readouterr()
+    assert "Conversation with inboxfriend (2 message(s)):" in captured.out
+    assert captured.out.index("Thread hello") < captured.out.index("Thread again")
+
+    remove_message_by_id("inboxuser", first)
+    remove_message_by_id("inboxuser", second)
+
+
+########### Message Search ####################################################
+
+
+def test_search_messages_ranks_matches():
+    plain = create_message("lunch tomorrow", "searchfriend", "searchuser")
+    best = create_message("lunch lunch lunch", "searchfriend", "searchuser")
+    other = create_message("lunch with me?", "searchother", "searchuser")
+    elsewhere = create_message("lunch for someone else", "searchfriend", "other")
+
+    # Every matching message of the receiver, best match first
+    results = search_messages("searchuser", "Lunch!")
+    assert results[0][3] == best
+    assert sorted(row[3] for row in results) == [plain, best, other]
+
+    # Only the sender's messages, and every word has to match
+    results = search_messages("searchuser", "lunch", "searchother")
+    assert [row[3] for row in results] == [other]
+    assert search_messages("searchuser", "lunch dinner") == []
+    assert search_messages("searchuser", "***") == []
+
+    # Deleted messages leave the index
+    remove_message_by_id("searchuser", best)
+    results = search_messages("searchuser", "lunch")
+    assert sorted(row[3] for row in results) == [plain, other]
+
+    for message_id in (plain, other):
+        remove_message_by_id("searchuser", message_id)
+    remove_message_by_id("other", elsewhere)
+    assert search_messages("searchuser", "lunch") == []
+    with get_cursor() as c:
+        c.execute(
+            "INSERT INTO message_search (message_search) VALUES ('integrity-check')"
+        )
+
+
+def mock_search_inbox_input(prompt):
+    if "\nChoose one of ['a', 'b', 'c', 'd']:" in prompt:
+        return "d"
+    if "Please enter the words to search for: " in prompt:
+        return "picnic"
+    if "Please enter the username of the sender" in prompt:
+        return ""
+    if "Do you want to go back (Y / N)? " in prompt:
+        return "Y"
+
+
+def test_search_inbox(monkeypatch, capsys):
+    message_id = create_message("Picnic on Sunday", "picnicfriend", "picnicuser")
+    create_message("Something else", "picnicfriend", "picnicuser")
+
+    monkeypatch.setattr("builtins.input", mock_search_inbox_input)
+    assert inbox("picnicuser") is main_menu
+
+    captured = capsys.readouterr()
+    assert "Found 1 matching message(s):" in captured.out
+    assert f"#{message_id} (" in captured.out
+
+    for row in get_message("picnicuser"):
+        remove_message_by_id("picnicuser", row[3])
+
+
+########### Outbound Queue ####################################################
+
+
+def test_outbox_delivers_in_batches(monkeypatch):
+    receivers = [f"bulkuser{n}" for n in range(120)]
+    outgoing = database_helper.MessageQueue(batch_size=50)
+
+    # Record the size of every transaction the worker writes
+    batches = []
+    deliver = outgoing.deliver
+
+    def record_batch(batch):
+        batches.append(len(batch))
+        return deliver(batch)
+
+    monkeypatch.setattr(outgoing, "deliver", record_batch)
+
+    assert outgoing.send("Bulk hello", "bulksender", receivers) == 120
+    outgoing.flush()
+
+    assert batches == [50, 50, 20]
+    for receiver in receivers:
+        messages = get_message(receiver)
+        assert [row[:3] for row in messages] == [("Bulk hello", "bulksender", receiver)]
+        remove_message_by_id(receiver, messages[0][3])
+
+
+def test_outbox_retries_when_locked(monkeypatch, capsys):
+    insert_message = database_helper.insert_message
+    attempts = []
+
+    # The first write finds the database locked
+    def locked_once(cursor, message, sender, receiver):
+        attempts.append(receiver)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return insert_message(cursor, message, sender, receiver)
+
+    monkeypatch.setattr(database_helper, "insert_message", locked_once)
+    monkeypatch.setattr(database_helper, "OUTBOX_RETRY_DELAY", 0)
+
+    outgoing = database_helper.MessageQueue()
+    outgoing.send("Try again", "retrysender", ["retryuser"])
+    outgoing.flush()
+
+    assert attempts == ["retryuser", "retryuser"]
+    messages = get_message("retryuser")
+    assert [row[0] for row in messages] == ["Try again"]
+    assert "Failed" not in capsys.readouterr().out
+    remove_message_by_id("retryuser", messages[0][3])
+
+
+def test_outbox_writes_around_a_failing_message(monkeypatch, capsys):
+    insert_message = database_helper.insert_message
+
+    # One send of the batch can never be written
+    def reject_one(cursor, message, sender, receiver):
+        if receiver == "rejectuser":
+            raise sqlite3.IntegrityError("rejected")
+        return insert_message(cursor, message, sender, receiver)
+
+    monkeypatch.setattr(database_helper, "insert_message", reject_one)
+
+    outgoing = database_helper.MessageQueue()
+    outgoing.send("Most of you", "partsender", ["partuser1", "rejectuser", "partuser2"])
+    outgoing.flush()
+
+    # The rest of the batch is still delivered
+    assert "Failed to deliver a queued message: rejected" in capsys.readouterr().out
+    assert get_message("rejectuser") == []
+    for receiver in ["partuser1", "partuser2"]:
+        messages = get_message(receiver)
+        assert [row[0] for row in messages] == ["Most of you"]
+        remove_message_by_id(receiver, messages[0][3])
+
+
+def test_outbox_requeues_while_locked(monkeypatch, capsys):
+    insert_message = database_helper.insert_message
+    attempts = []
+
+    # The database stays locked through every retry of the batch and of its first send
+    def locked_for_a_while(cursor, message, sender, receiver):
+        attempts.append(receiver)
+        if len(attempts) <= 4:
+            raise sqlite3.OperationalError("database is locked")
+        return insert_message(cursor, message, sender, receiver)
+
+    monkeypatch.setattr(database_helper, "insert_message", locked_for_a_while)
+    monkeypatch.setattr(database_helper, "OUTBOX_RETRIES", 1)
+    monkeypatch.setattr(database_helper, "OUTBOX_RETRY_DELAY", 0)
+
+    outgoing = database_helper.MessageQueue()
+    outgoing.send("Eventually", "waitsender", ["waituser1", "waituser2"])
+    outgoing.flush()
+
+    # Nothing queued is lost, it is written once the lock goes away
+    assert "trying again later" in capsys.readouterr().out
+    for receiver in ["waituser1", "waituser2"]:
+        messages = get_message(receiver)
+        assert [row[0] for row in messages] == ["Eventually"]
+        remove_message_by_id(receiver, messages[0][3])
+
+
+def test_main_flushes_outbox_on_exit(monkeypatch):
+    # The worker is slow enough that the message is still queued when the program exits
+    deliver = database_helper.outbox.deliver
+
+    def slow_deliver(batch):
+        time.sleep(0.2)
+        return deliver(batch)
+
+    def queue_and_exit():
+        queue_message("Last words", "exitsender", ["exitreader"])
+        sys.exit()
+
+    monkeypatch.setattr(database_helper.outbox, "deliver", slow_deliver)
+    monkeypatch.setattr("main.web_opening", Mock())
+    monkeypatch.setattr("main.run_screens", Mock())
+    monkeypatch.setattr("main.main_helper", queue_and_exit)
+
+    exited = False
+    try:
+        main()
+    except SystemExit:
+        exited = True
+
+    assert exited
+    messages = get_message("exitreader")
+    assert [row[0] for row in messages] == ["Last words"]
+    remove_message_by_id("exitreader", messages[0][3])
+
+
+def mock_plus_messenger_many_input(prompt):
+    if "list all users in the system" in prompt:
+        return "n"
+    if "Please enter the usernames of who you wish to send a message to" in prompt:
+        return "manyuser1, manyuser2, nobodyhere, manyuser1"
+    if "Enter your message: " in prompt:
+        return "Hello everyone"
+    if "\nAre you sure you want to send this message to 2 users? (y/n): " in prompt:
+        return "y"
+
+
+def test_plus_messenger_many_receivers(monkeypatch, capsys):
+    create_user("manyuser1", "ValidPass1!", "Many", "User", "USF", "CS", 0, 0)
+    create_user("manyuser2", "ValidPass1!", "Many", "User", "USF", "CS", 0, 0)
+
+    monkeypatch.setattr("builtins.input", mock_plus_messenger_many_input)
+    assert plus_messenger("manysender") is main_menu
+    flush_outbox()
+
+    captured = capsys.readouterr()
+    assert "These users don't exist and will be skipped: nobodyhere" in captured.out
+    assert "\nMessage sent!\n" in captured.out
+
+    for receiver in ("manyuser1", "manyuser2"):
+        messages = get_message(receiver)
+        assert [row[:2] for row in messages] == [("Hello everyone", "manysender")]
+        assert read_unread_messages(receiver) == 1
+        remove_message_by_id(receiver, messages[0][3])
+        assert delete_user(receiver) is True
+
+
+########### Friend Graph ######################################################
+
+
+def test_friend_graph_follows_friend_list():
+    assert add_to_friend_list("graphuser1", "graphuser2") is True
+    assert is_friend("graphuser1", "graphuser2")
+    assert does_friend_match("graphuser2", "graphuser1")
+    assert list_of_friends("graphuser1") == [("graphuser1", "graphuser2")]
+
+    assert delete_friend_from_list("graphuser1", "graphuser2") is True
+    assert not is_friend("graphuser1", "graphuser2")
+    assert not does_friend_match("graphuser2", "graphuser1")
+    assert list_of_friends("graphuser1") is False
+
+
+def test_friend_checks_do_not_query(monkeypatch):
+    add_to_friend_list("graphuser3", "graphuser4")
+    load_friend_graph()
+
+    # Once the graph is read, friend checks never touch the database
+    def no_database():
+        raise AssertionError("friend check queried the database")
+
+    monkeypatch.setattr("database_helper.get_cursor", no_database)
+    assert is_friend("graphuser4", "graphuser3")
+    assert not is_friend("graphuser4", "graphuser5")
+    assert list_of_friends("graphuser3") == [("graphuser3", "graphuser4")]
+    monkeypatch.undo()
+
+    delete_friend_from_list("graphuser3", "graphuser4")
+
+
+def test_friend_graph_waits_for_commit():
+    load_friend_graph()
+
+    # A friendship added inside a transaction that rolls back never reaches the graph
+    try:
+        with get_cursor():
+            assert add_to_friend_list("graphuser8", "graphuser9") is True
+            assert not is_friend("graphuser8", "graphuser9")
+            raise sqlite3.OperationalError("disk I/O error")
+    except sqlite3.OperationalError:
+        pass
+    assert not is_friend("graphuser8", "graphuser9")
+
+    # It shows up once the outer transaction commits
+    with get_cursor():
+        add_to_friend_list("graphuser8", "graphuser9")
+    assert is_friend("graphuser8", "graphuser9")
+
+    with get_cursor():
+        delete_friend_from_list("graphuser8", "graphuser9")
+        assert is_friend("graphuser8", "graphuser9")
+    assert not is_friend("graphuser8", "graphuser9")
+
+
+def test_friend_graph_load_does_not_hold_the_lock(monkeypatch):
+    import threading
+    import time
+
+    single = ConnectionPool(database_helper.pool.path, 1)
+    monkeypatch.setattr("database_helper.pool", single)
+    monkeypatch.setattr("database_helper.friend_graph", None)
+    add_to_friend_list("graphuser13", "graphuser14")
+    friends = []
+
+    def load_and_check():
+        with get_cursor():
+            # Another thread waits for the only connection while this one holds it
+            loader = threading.Thread(target=load_friend_graph, daemon=True)
+            loader.start()
+            time.sleep(0.2)
+            friends.append(friends_of("graphuser13"))
+            add_to_friend_list("graphuser13", "graphuser15")
+        loader.join(timeout=5)
+
+    worker = threading.Thread(target=load_and_check, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert friends == [{"graphuser14"}]
+    assert friends_of("graphuser13") == {"graphuser14", "graphuser15"}
+
+    delete_friend_from_list("graphuser13", "graphuser14")
+    delete_friend_from_list("graphuser13", "graphuser15")
+    single.close()
+
+
+def test_friends_of_returns_a_copy():
+    add_to_friend_list("graphuser10", "graphuser11")
+
+    # The friend list stays the same while the graph changes underneath it
+    friends = friends_of("graphuser10")
+    add_to_friend_list("graphuser10", "graphuser12")
+    assert friends == {"graphuser11"}
+
+    delete_friend_from_list("graphuser10", "graphuser11")
+    delete_friend_from_list("graphuser10", "graphuser12")
+
+
+def test_friend_graph_reloads_after_reconfigure(tmp_path):
+    add_to_friend_list("graphuser6", "graphuser7")
+    assert is_friend("graphuser6", "graphuser7")
+
+    # A different database file has its own friends
+    try:
+        configure_database(tmp_path / "other.db")
+        assert not is_friend("graphuser6", "graphuser7")
+    finally:
+        configure_database()
+
+    assert is_friend("graphuser6", "graphuser7")
+    delete_friend_from_list("graphuser6", "graphuser7")
+
+
+########### Friendship Storage ################################################
+
+
+def test_friendship_stored_once():
+    assert add_to_friend_list("pairuser2", "pairuser1") is True
+    assert add_to_friend_list("pairuser1", "pairuser2") is True
+
+    # One row, usernames in sorted order, whichever side accepted
+    with get_cursor() as c:
+        c.execute(
+            "SELECT user_a, user_b FROM friendship WHERE 'pairuser1' IN (user_a, user_b)"
+        )
+        assert c.fetchall() == [("pairuser1", "pairuser2")]
+
+    assert delete_friend_from_list("pairuser2", "pairuser1") is True
+    assert not does_friend_match("pairuser1", "pairuser2")
+    with get_cursor() as c:
+        c.execute("SELECT 1 FROM friendship WHERE user_a = 'pairuser1'")
+        assert c.fetchall() == []
+
+
+def test_duplicate_friend_requests_collapse():
+    assert add_friend("requester", "requested") is True
+    assert add_friend("requester", "requested") is True
+    assert pending_friend_request_list("requested") == [("requester", "requested")]
+
+    assert delete_friend_request("requested", "requester") is True
+    assert pending_friend_request_list("requested") is False
+
+
+def test_accept_friend_answers_both_requests():
+    # Both users asked the other before either accepted
+    add_friend("mutualasker1", "mutualasker2")
+    add_friend("mutualasker2", "mutualasker1")
+
+    assert accept_friend("mutualasker2", "mutualasker1") is True
+    assert does_friend_match("mutualasker1", "mutualasker2")
+    assert pending_friend_request_list("mutualasker1") is False
+    assert pending_friend_request_list("mutualasker2") is False
+
+    delete_friend_from_list("mutualasker1", "mutualasker2")
+
+
+def test_migrate_legacy_friendships(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+    legacy.executemany(
+        "INSERT INTO friends_list VALUES (?, ?)",
+        [("bob", "amy"), ("amy", "bob"), ("amy", "cat"), ("cat", "amy")],
+    )
+    legacy.executemany(
+        "INSERT INTO friends VALUES (?, ?)",
+        [("dan", "amy"), ("dan", "amy"), ("amy", "dan")],
+    )
+    legacy.commit()
+
+    migrate(legacy)
+    friendships = legacy.execute("SELECT * FROM friendship ORDER BY user_b")
+    assert friendships.fetchall() == [("amy", "bob"), ("amy", "cat")]
+    requests = legacy.execute("SELECT * FROM friend_request ORDER BY sender")
+    assert requests.fetchall() == [("amy", "dan"), ("dan", "amy")]
+    legacy.close()
+
+
+########### Friend Suggestions ################################################
+
+
+def test_suggest_friends_ranks_mutual_friends():
+    for name, university, major in [
+        ("suggestme", "USF", "CS"),
+        ("suggestfriend1", "UF", "Art"),
+        ("suggestfriend2", "UF", "Art"),
+        ("suggestboth", "UCF", "Art"),
+        ("suggestone", "USF", "Math"),
+        ("suggestasked", "UF", "Art"),
+    ]:
+        create_user(name, "ValidPass1!", "Sug", name, university, major, 0, 0)
+    add_to_friend_list("suggestme", "suggestfriend1")
+    add_to_friend_list("suggestme", "suggestfriend2")
+    add_to_friend_list("suggestboth", "suggestfriend1")
+    add_to_friend_list("suggestboth", "suggestfriend2")
+    add_to_friend_list("suggestone", "suggestfriend1")
+    add_to_friend_list("suggestasked", "suggestfriend1")
+    add_friend("suggestme", "suggestasked")
+
+    # Two mutual friends beat one mutual friend and a university in common
+    suggestions = suggest_friends("suggestme")
+    assert suggestions[:2] == [
+        ("suggestboth", "Sug", "suggestboth", 2, ()),
+        ("suggestone", "Sug", "suggestone", 1, ("university",)),
+    ]
+    # Friends and people already asked are not suggested
+    suggested = [row[0] for row in suggestions]
+    assert not {"suggestme", "suggestfriend1", "suggestasked"} & set(suggested)
+
+    # A new friendship changes the suggestions straight away
+    add_to_friend_list("suggestme", "suggestboth")
+    assert "suggestboth" not in [row[0] for row in suggest_friends("suggestme")]
+
+    delete_friend_request("suggestasked", "suggestme")
+    for name in ("suggestfriend1", "suggestfriend2", "suggestboth"):
+        delete_friend_from_list("suggestme", name)
+    for name in ("suggestboth", "suggestone", "suggestasked"):
+        delete_friend_from_list(name, "suggestfriend1")
+    delete_friend_from_list("suggestboth", "suggestfriend2")
+    for name in ("suggestme", "suggestfriend1", "suggestfriend2"):
+        assert delete_user(name) is True
+    for name in ("suggestboth", "suggestone", "suggestasked"):
+        assert delete_user(name) is True
+
+
+def test_suggest_friends_without_friends():
+    create_user("lonelyuser", "ValidPass1!", "Lonely", "User", "Lone U", "Poetry", 0, 0)
+    create_user("lonelypeer", "ValidPass1!", "Lonely", "Peer", "Lone U", "Poetry", 0, 0)
+
+    # Classmates fill in when there are no friends of friends
+    assert suggest_friends("lonelyuser") == [
+        ("lonelypeer", "Lonely", "Peer", 0, ("university", "major"))
+    ]
+
+    assert delete_user("lonelyuser") is True
+    assert delete_user("lonelypeer") is True
+
+
+def test_suggest_friends_prefers_closer_classmates():
+    create_user("rankuser", "ValidPass1!", "Rank", "User", "Rank U", "Art", 0, 0)
+    peers = [f"rankpeer{n}" for n in range(3)]
+    for peer in peers:
+        create_user(peer, "ValidPass1!", "Rank", "Peer", "Rank U", "Law", 0, 0)
+    create_user("rankwhole", "ValidPass1!", "Rank", "Whole", "Rank U", "Art", 0, 0)
+
+    # The classmate sharing both is picked even though they joined last
+    assert suggest_friends("rankuser", limit=1) == [
+        ("rankwhole", "Rank", "Whole", 0, ("university", "major"))
+    ]
+
+    for username in ["rankuser", "rankwhole"] + peers:
+        assert delete_user(username) is True
+
+
+def test_classmate_lookups_read_an_index():
+    queries = {
+        "university = 'a' AND major = 'b'": "idx_accounts_university_major",
+        "university = 'a'": "idx_accounts_university",
+        "major = 'b'": "idx_accounts_major",
+    }
+    with get_cursor() as c:
+        for condition, index in queries.items():
+            query = f"SELECT user FROM accounts WHERE {condition} ORDER BY id LIMIT 5"
+            plan = str(c.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
+            # Read in id order straight off the index, never sorted as a whole
+            assert f"INDEX {index} " in plan, condition
+            assert "TEMP B-TREE" not in plan, condition
+
+
+def mock_friend_suggestions_input(prompt):
+    if "Choose one of ['a', 'b', 'c', 'd', 'e']:" in prompt:
+        return "d"
+    if "Do you want to request to connect with someone from this list?" in prompt:
+        return "n"
+    if "Do you want to go back (Y / N)? " in prompt:
+        return "Y"
+
+
+def test_friend_suggestions_page(monkeypatch, capsys):
+    create_user("pageuser", "ValidPass1!", "Page", "User", "Page U", "Poetry", 0, 0)
+    create_user("pagepeer", "ValidPass1!", "Page", "Peer", "Page U", "Law", 0, 0)
+
+    monkeypatch.setattr("builtins.input", mock_friend_suggestions_input)
+    assert friend_search("pageuser") is main_menu
+
+    captured = capsys.readouterr()
+    assert "Page Peer (pagepeer) - same university" in captured.out
+
+    assert delete_user("pageuser") is True
+    assert delete_user("pagepeer") is True
+
+
+########### Authentication ####################################################
+
+
+def test_passwords_are_hashed():
+    create_user("hasheduser", "ValidPass1!", "Hashed", "User", "USF", "CS", 0, 0)
+
+    stored = get_user("hasheduser")["pass"]
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert "ValidPass1!" not in stored
+    assert verify_password("ValidPass1!", stored)
+    assert not verify_password("ValidPass2!", stored)
+    assert check_login("hasheduser", "ValidPass1!")
+
+    assert delete_user("hasheduser") is True
+
+
+def test_failed_logins_are_throttled(monkeypatch):
+    create_user("stuffeduser", "ValidPass1!", "Stuffed", "User", "USF", "CS", 0, 0)
+    for _ in range(database_helper.LOGIN_BURST):
+        assert not check_login("stuffeduser", "WrongPass1!")
+    assert is_login_throttled("stuffeduser")
+
+    # Once throttled, even the right password is refused without a query
+    def no_database():
+        raise AssertionError("throttled login queried the database")
+
+    monkeypatch.setattr("database_helper.get_cursor", no_database)
+    assert not check_login("stuffeduser", "ValidPass1!")
+    monkeypatch.undo()
+
+    # Other usernames are not affected
+    assert not is_login_throttled("someoneelse")
+
+    database_helper.login_buckets.pop("stuffeduser")
+    assert check_login("stuffeduser", "ValidPass1!")
+    assert delete_user("stuffeduser") is True
+
+
+def test_throttled_logins_survive_other_usernames(monkeypatch):
+    monkeypatch.setattr("database_helper.LOGIN_CACHE_SIZE", 8)
+    for _ in range(database_helper.LOGIN_BURST):
+        check_login("floodtarget", "WrongPass1!")
+    assert is_login_throttled("floodtarget")
+
+    # Guessing with lots of other usernames does not give the target its attempts back
+    for n in range(20):
+        check_login(f"flooduser{n}", "WrongPass1!")
+    assert is_login_throttled("floodtarget")
+    assert len(database_helper.login_buckets) <= 20 + 1
+
+    for name in ["floodtarget"] + [f"flooduser{n}" for n in range(20)]:
+        database_helper.login_buckets.pop(name, None)
+
+
+def test_login_buckets_are_capped(monkeypatch):
+    monkeypatch.setattr("database_helper.LOGIN_CACHE_SIZE", 4)
+    monkeypatch.setattr("database_helper.LOGIN_BUCKET_LIMIT", 10)
+    names = [f"capuser{n}" for n in range(30)]
+    for name in names:
+        check_login(name, "WrongPass1!")
+
+    # Past the limit the usernames counted longest ago are forgotten
+    assert len(database_helper.login_buckets) == 10
+    assert list(database_helper.login_buckets) == names[-10:]
+
+    # and so is any username that has had the time to get all its attempts back
+    refilled = database_helper.time.monotonic() + (
+        database_helper.LOGIN_BURST * database_helper.LOGIN_REFILL_SECONDS
+    )
+    with database_helper.login_lock:
+        database_helper.forget_full_buckets(refilled)
+    assert len(database_helper.login_buckets) == 0
+
+
+def test_missing_username_is_hashed(monkeypatch):
+    checked = []
+    verify = database_helper.verify_password
+
+    def record_verify(password, stored):
+        checked.append(stored)
+        return verify(password, stored)
+
+    # A username that doesn't exist costs a hash like a wrong password does
+    monkeypatch.setattr("database_helper.verify_password", record_verify)
+    assert not check_login("nosuchloginuser", "ValidPass1!")
+    assert checked == [database_helper.dummy_hash()]
+    database_helper.login_buckets.pop("nosuchloginuser")
+
+
+def test_verified_login_skips_hashing(monkeypatch):
+    create_user("cacheduser", "ValidPass1!", "Cached", "User", "USF", "CS", 0, 0)
+    assert check_login("cacheduser", "ValidPass1!")
+
+    # The same password again is trusted without hashing, a different one is not
+    monkeypatch.setattr("database_helper.verify_password", Mock(return_value=False))
+    assert check_login("cacheduser", "ValidPass1!")
+    assert not check_login("cacheduser", "ValidPass2!")
+    monkeypatch.undo()
+
+    assert delete_user("cacheduser") is True
+    assert not check_login("cacheduser", "ValidPass1!")
+
+
+def test_old_hashes_upgraded_at_login(monkeypatch):
+    create_user("upgradeuser", "ValidPass1!", "Upgrade", "User", "USF", "CS", 0, 0)
+
+    monkeypatch.setattr("database_helper.PASSWORD_ITERATIONS", 1200)
+    assert check_login("upgradeuser", "ValidPass1!")
+    assert get_user("upgradeuser")["pass"].startswith("pbkdf2_sha256$1200$")
+
+    assert delete_user("upgradeuser") is True
+
+
+def test_migrate_legacy_passwords(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+    migrate(legacy)
+
+    stored = legacy.execute("SELECT pass FROM accounts").fetchone()[0]
+    assert verify_password("ValidPass1!", stored)
+    # The upgrade uses the cheaper count, logging in rehashes with the full one
+    assert stored.split("$")[1] == str(database_helper.MIGRATION_HASH_ITERATIONS)
+    legacy.close()
+
+
+def mock_throttled_login_input(prompt):
+    if "Enter your username: " in prompt:
+        return "lockeduser"
+    if "Enter your password: " in prompt:
+        return "WrongPass1!"
+    if "Do you want to try again (Y / N)? " in prompt:
+        return "N"
+
+
+def test_login_reports_throttling(monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", mock_throttled_login_input)
+    for _ in range(database_helper.LOGIN_BURST + 1):
+        assert login() is None
+
+    captured = capsys.readouterr()
+    assert "Too many failed login attempts, please try again later" in captured.out
+    database_helper.login_buckets.pop("lockeduser")
+
+
+########### Session ###########################################################
+
+
+def test_load_session():
+    create_user("sessionuser", "ValidPass1!", "Sess", "Ion", "USF", "CS", 1, 3)
+
+    account = load_session("sessionuser")
+    assert (account.first, account.last, account.tier) == ("Sess", "Ion", 1)
+    assert not hasattr(account, "__dict__")
+    assert load_session("nosuchsessionuser") is None
+
+    assert delete_user("sessionuser") is True
+
+
+def mock_session_job_input(prompt):
+    if "Enter your username: " in prompt:
+        return "sessionposter"
+    if "Enter your password: " in prompt:
+        return "ValidPass1!"
+    if "Please enter the job's title: " in prompt:
+        return "Session Job"
+    return "x"
+
+
+def test_screens_read_the_session(monkeypatch):
+    create_user("sessionposter", "ValidPass1!", "Post", "Er", "USF", "CS", 1, 0)
+    monkeypatch.setattr("main.session", None)
+    monkeypatch.setattr("builtins.input", mock_session_job_input)
+    assert login() == "sessionposter"
+
+    # Once signed in, the account is never read again
+    monkeypatch.setattr("main.load_session", Mock(side_effect=AssertionError))
+    monkeypatch.setattr("main.reached_job_limit", Mock(return_value=False))
+    monkeypatch.setattr("main.plus_messenger", Mock(return_value=main_menu))
+    job_posting("sessionposter")
+    job_id = get_job_list_posted_by_user("sessionposter")[-1][0]
+    assert get_job(job_id)[5:] == ("Post", "Er")
+    assert send_message("sessionposter") is main_menu
+
+    delete_job(job_id)
+    assert delete_user("sessionposter") is True
+
+
+def test_screens_without_an_account(monkeypatch, capsys):
+    monkeypatch.setattr("main.session", None)
+    monkeypatch.setattr("main.reached_job_limit", Mock(return_value=False))
+    monkeypatch.setattr("builtins.input", Mock(side_effect=AssertionError))
+
+    # A deleted account gets an error instead of a crash
+    assert job_posting("nosuchsessionuser") is main_menu
+    assert display_user_profile("nosuchsessionuser") is display_profile_navigation
+    captured = capsys.readouterr()
+    assert captured.out.count("Your account could not be found") == 2
+
+
+########### Job Ownership #####################################################
+
+
+def test_jobs_belong_to_the_posting_account():
+    # Two accounts with the same name
+    create_user("samename1", "ValidPass1!", "Same", "Name", "USF", "CS", 0, 0)
+    create_user("samename2", "ValidPass1!", "Same", "Name", "USF", "CS", 0, 0)
+    job_id = create_job("Owned Job", "b", "c", "d", "e", "Same", "Name", "samename2")
+
+    assert get_job_list_posted_by_user("samename2") == [(job_id, "Owned Job")]
+    assert get_job_list_posted_by_user("samename1") == []
+    assert user_made_job("samename2", job_id)
+    assert not user_made_job("samename1", job_id)
+
+    # A job is never given to an account because of its name
+    orphan_id = create_job("Nameless Job", "b", "c", "d", "e", "Same", "Name", "nobody")
+    assert not user_made_job("samename1", orphan_id)
+    assert get_job_list_posted_by_user("samename1") == []
+
+    delete_job(orphan_id)
+    delete_job(job_id)
+    assert delete_user("samename1") is True
+    assert delete_user("samename2") is True
+
+
+def test_new_account_does_not_inherit_jobs():
+    create_user("oldposter", "ValidPass1!", "Old", "Poster", "USF", "CS", 0, 0)
+    job_id = create_job(
+        "Inherited Job", "b", "c", "d", "e", "Old", "Poster", "oldposter"
+    )
+    assert delete_user("oldposter") is True
+
+    # The new account may get the deleted account's id, but not its jobs
+    create_user("newposter", "ValidPass1!", "New", "Poster", "USF", "CS", 0, 0)
+    assert get_job_list_posted_by_user("newposter") == []
+    assert not user_made_job("newposter", job_id)
+
+    delete_job(job_id)
+    assert delete_user("newposter") is True
+
+
+def test_migrate_legacy_job_owners(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+    legacy.execute(
+        "INSERT INTO jobs VALUES ('Old Job', 'b', 'c', 'd', 'e', 'Old', 'User')"
+    )
+    legacy.execute(
+        "INSERT INTO jobs VALUES ('Orphan Job', 'b', 'c', 'd', 'e', 'No', 'One')"
+    )
+    legacy.commit()
+
+    migrate(legacy)
+    owners = legacy.execute(
+        """SELECT jobs.title, accounts.user FROM jobs
+           LEFT JOIN accounts ON accounts.id = jobs.owner_id ORDER BY jobs.id"""
+    )
+    assert owners.fetchall() == [("Old Job", "olduser"), ("Orphan Job", None)]
+    legacy.close()
+
+
+########### Job IDs ###########################################################
+
+
+def test_deleting_a_job_deletes_its_rows():
+    job_id = create_job("Cascade Job", "b", "c", "d", "e", "f", "g", "jobposter")
+    assert create_application("cascadeuser", job_id, "b", "c", "d") is True
+    assert save_job_for_user("cascadeuser", job_id) is True
+    assert search_application("cascadeuser", job_id)
+
+    assert delete_job(job_id) is True
+    assert applied_jobs_list("cascadeuser") == []
+    assert get_saved_jobs("cascadeuser") == []
+    with get_cursor() as c:
+        c.execute("SELECT 1 FROM job_applications WHERE user = 'cascadeuser'")
+        assert c.fetchall() == []
+        c.execute("SELECT 1 FROM jobs_saved WHERE user = 'cascadeuser'")
+        assert c.fetchall() == []
+
+
+def test_rows_need_an_existing_job(capsys):
+    job_id = create_job("Gone Job", "b", "c", "d", "e", "f", "g", "jobposter")
+    delete_job(job_id)
+
+    assert create_application("cascadeuser", job_id, "b", "c", "d") is False
+    assert save_job_for_user("cascadeuser", job_id) is False
+    assert "Failed" in capsys.readouterr().out
+
+
+def test_duplicate_titles_are_separate_jobs():
+    first = create_job("Twin Job", "first", "c", "d", "e", "f", "g", "jobposter")
+    second = create_job("Twin Job", "second", "c", "d", "e", "f", "g", "jobposter")
+    create_application("twinuser", second, "b", "c", "d")
+    save_job_for_user("twinuser", first)
+
+    # Only the job that was applied to shows as applied on the board
+    board = [job for job in get_job_board("twinuser") if job[1] == "Twin Job"]
+    assert board == [
+        (first, "Twin Job", False, True),
+        (second, "Twin Job", True, False),
+    ]
+    assert search_application("twinuser", second)
+    assert not search_application("twinuser", first)
+
+    # Deleting one of them leaves the other one alone
+    delete_job(first)
+    assert get_job(second)[1] == "second"
+    assert get_saved_jobs("twinuser") == []
+    delete_job(second)
+
+
+def test_migrate_legacy_job_rows(tmp_path):
+    legacy = create_legacy_database(tmp_path / "legacy.db")
+    legacy.execute("INSERT INTO jobs VALUES ('Old Job', 'b', 'c', 'd', 'e', 'f', 'g')")
+    legacy.executemany(
+        "INSERT INTO job_applications VALUES (?, 'olduser', 'b', 'c', 'd')",
+        [("Old Job",), ("Gone Job",)],
+    )
+    legacy.execute("INSERT INTO jobs_saved VALUES ('Old Job', 'olduser')")
+    legacy.commit()
+
+    migrate(legacy)
+    job_id = legacy.execute("SELECT id FROM jobs").fetchone()[0]
+    applications = legacy.execute("SELECT job_id, user FROM job_applications")
+    assert applications.fetchall() == [(job_id, "olduser")]
+    saved = legacy.execute("SELECT job_id, user FROM jobs_saved")
+    assert saved.fetchall() == [(job_id, "olduser")]
+
+    # Deleting the job takes its rows with it
+    legacy.execute("PRAGMA foreign_keys = ON")
+    legacy.execute("DELETE FROM jobs")
+    assert legacy.execute("SELECT COUNT(*) FROM job_applications").fetchone()[0] == 0
+    assert legacy.execute("SELECT COUNT(*) FROM jobs_saved").fetchone()[0] == 0
+    legacy.close()
+
+
+########### Job Retirement ####################################################
+
+
+def create_retiring_job():
+    create_user("retireposter", "ValidPass1!", "Retire", "Poster", "USF", "CS", 0, 0)
+    job_id = create_job("Retiring Job", "b", "c", "d", "e", "f", "g", "retireposter")
+    for n in range(3):
+        create_application(f"retireapplicant{n}", job_id, "b", "c", "d")
+    save_job_for_user("retiresaver", job_id)
+    return job_id
+
+
+def test_retire_job_in_one_commit(tmp_path):
+    # A pool with a single connection, so every statement goes through it
+    configure_database(tmp_path / "retire.db", size=1)
+    try:
+        job_id = create_retiring_job()
+        # Someone else's job with the same title is left alone
+        other_id = create_job(
+            "Retiring Job", "other", "c", "d", "e", "f", "g", "jobposter"
+        )
+        assert retire_job(other_id, "Gone", "retireposter") == []
+
+        statements = []
+        with database_helper.pool.connection() as connection:
+            connection.set_trace_callback(statements.append)
+        notified = retire_job(job_id, "Gone", "retireposter")
+
+        assert notified == [f"retireapplicant{n}" for n in range(3)]
+        assert [s for s in statements if s.strip() in ("BEGIN", "COMMIT")] == [
+            "BEGIN ",
+            "COMMIT",
+        ]
+        assert get_job(other_id)[1] == "other"
+        assert get_saved_jobs("retiresaver") == []
+        assert get_notification("retireapplicant0") == [
+            ("Gone", "System", "retireapplicant0", None)
+        ]
+    finally:
+        configure_database()
+
+
+def test_retire_job_is_all_or_nothing(monkeypatch, capsys):
+    job_id = create_retiring_job()
+    real_get_cursor = database_helper.get_cursor
+
+    @contextmanager
+    def failing_cursor():
+        with real_get_cursor() as c:
+            yield c
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr("database_helper.get_cursor", failing_cursor)
+    assert retire_job(job_id, "Gone", "retireposter") is None
+    monkeypatch.undo()
+
+    # Nothing was deleted and no one was notified
+    assert get_job_list_posted_by_user("retireposter") == [(job_id, "Retiring Job")]
+    assert get_saved_jobs("retiresaver") == [(job_id, "Retiring Job")]
+    assert get_notification("retireapplicant0") == []
+
+    assert retire_job(job_id, "Gone", "retireposter") == [
+        f"retireapplicant{n}" for n in range(3)
+    ]
+    for n in range(3):
+        drain_notifications(f"retireapplicant{n}")
+    assert delete_user("retireposter") is True